@@ -1,59 +1,333 @@
 # -*- coding:utf-8 -*-
 # AUTHOR: Sun
 
+"""
+@file app.py
+@brief 应用入口
+@details create_app 创建并配置应用；扩展对象在模块级创建、在 create_app 中绑定，视图注册在 page 蓝图上。
+         模块级的 app 在首次访问时才调用 create_app，gunicorn 的 app:app 与 flask --app app 均可直接使用，
+         配合 preload_app 时只在主进程中初始化一次，worker 由 fork 继承并以写时复制共享内存。
+"""
+
+from time import perf_counter
+
+# 启动计时：导入依赖所用的时间
+_import_started = perf_counter()
+
+import logging
 from datetime import datetime
+from threading import Lock
+
+import click
 
-from flask import Flask, request, url_for, abort
+from flask import Flask, Blueprint, request, url_for, abort, current_app
 from flask import render_template
 from flask_limiter import Limiter
 from flask_caching import Cache
+from markupsafe import Markup
 
-from constant import DB_URI
-from database.model import DB, Score, Web
+from constant import DB_URI, CACHE_SHARED, CACHE_MAX_BYTES, CACHE_DIR, CACHE_REDIS_URL, ENABLE_PROFILING, STATIC_EXPORT_DIR
+from database.model import DB, Web, Detail, Score
 from database.data import LibraryArgs
 from database.service import QueryService, ScoreListService, PaginationService, WebIDMap
+from database.snapshot import SnapshotHolder, LatestSnapshot
+from database.facet import FacetCounts
+from database.search_index import NGramIndex
+from database.downsample import GRANULARITIES, auto_granularity
+from database.ranking import RankingService
+from database.current import CurrentScoreService
+from database.history import HistoryService, ROLLUP_GRANULARITIES
+from database.detail import DetailService
+from database.version import DataVersion
+from database.export import ExportService
+from caching.coalesce import CoalescingCache
+from caching.fragment import FragmentCache
+from caching.compress import Compression
+from caching.warmup import CacheWarmer, is_warmup_request
+from monitoring.profiler import Profiler
 
 from route.errors import errors_bp
-from route.file import file_bp
+from route.file import file_bp, picture_store
+from route.export import export_bp
+from route.prerender import PrerenderedPages
+from route.conditional import ConditionalGet
+from route.assets import StaticAssets
+from route.common import current_season, real_user_ip, parse_ids
 
-app = Flask(__name__)
-app.register_blueprint(errors_bp)
-app.register_blueprint(file_bp)
+IMPORT_TIME = perf_counter() - _import_started
 
-app.config['SQLALCHEMY_DATABASE_URI'] = DB_URI
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,  # 每次使用连接前先ping一下，检查连接是否有效
-    'echo': False,  # 输出 SQL
-}
-
-DB.init_app(app)
-
-def get_real_user_ip():
-    if request.headers.get('X-Forwarded-For'):
-        # X-Forwarded-For 可能包含多个 IP，第一个是真实客户端 IP
-        return request.headers.get('X-Forwarded-For').split(',')[0].strip()
-    elif request.headers.get('X-Real-IP'):
-        return request.headers.get('X-Real-IP')
-    else:
-        return request.remote_addr
+logger = logging.getLogger(__name__)
 
-limiter = Limiter(get_real_user_ip, app=app)
-cache = Cache(app, config={'CACHE_TYPE': 'simple', 'CACHE_THRESHOLD': 16})
+# 页面视图与命令行，命令直接挂在 flask 命令下
+page_bp = Blueprint('page', __name__, cli_group=None)
 
+# 请求剖析：Server-Timing 响应头与 /metrics 指标
+profiler = Profiler() if ENABLE_PROFILING else None
 
-@cache.memoize(timeout=60*60)
+def get_real_user_ip():
+    return real_user_ip(request)
+
+limiter = Limiter(get_real_user_ip)
+cache = Cache()
+data_version = DataVersion()  # 数据版本水位，所有缓存键都带上该版本号
+compression = Compression()  # 页面在缓存填充时压缩一次，其余文本响应即时压缩
+coalesced = CoalescingCache(  # 缓存未命中时合并并发回源
+    cache,
+    version=data_version.get,
+    observer=profiler.record_cache if profiler else None,
+    encode=compression.encode,
+    decode=compression.decode,
+)
+assets = StaticAssets()  # 构建后的 CSS / JS 使用带哈希的文件名与预压缩版本
+snapshot_holder = SnapshotHolder()
+facet_holder = SnapshotHolder(FacetCounts.load)  # 动漫库各筛选项的计数
+search_index = NGramIndex()
+
+# 当前数据版本已导出的静态页面直接返回
+prerendered = PrerenderedPages(root=STATIC_EXPORT_DIR, version=data_version.get)
+
+# 页面未变化时直接返回 304；默认季度的 /library 取决于当前时间，不参与
+conditional = ConditionalGet(
+    version=data_version.get,
+    latest_date=lambda: data_version.latest_date,
+    endpoints=(
+        'page.index', 'page.library', 'page.search', 'page.detail', 'page.details', 'page.score',
+        'export.catalog', 'export.scores',
+    ),
+    build_paths=('static/dist/manifest.json',),
+)
+
+# 部署与数据版本变化后在后台预热热点页面，预热请求不受限流；只在服务请求的 worker 中由 warm_caches 启用
+warmer = CacheWarmer(workers=4, track_endpoints=('page.search',))
+limiter.request_filter(is_warmup_request)
+
+# 导出与页面共用最新评分日期与缓存的平台映射
+export_service = ExportService(
+    latest_date=lambda: data_version.latest_date,
+    web_id_map=lambda: get_web_id_map(),
+)
+
+# 按动画缓存渲染好的卡片，列表页只需拼接
+card_cache = FragmentCache(
+    render=lambda anime: current_app.jinja_env.get_template('macros.html').module.render_anime_card(anime),
+    key=lambda anime: anime.id,
+    version=data_version.get,
+)
+
+
+def create_app() -> Flask:
+    """
+    @brief 创建并配置应用
+    @details 只创建引擎对象，不建立数据库连接；各阶段耗时记录在 app.extensions['startup_timing'] 中
+    @return Flask 应用
+    """
+    timing: dict[str, float] = {'imports': IMPORT_TIME}
+    started = phase_started = perf_counter()
+
+    def mark(phase: str):
+        nonlocal phase_started
+        now = perf_counter()
+        timing[phase] = now - phase_started
+        phase_started = now
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = DB_URI
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_pre_ping': True,  # 每次使用连接前先ping一下，检查连接是否有效
+        'echo': False,  # 输出 SQL
+    }
+    mark('config')
+
+    DB.init_app(app)
+    mark('database')
+
+    # 注册顺序即 before_request 的执行顺序：剖析计时最先开始，预生成页面先于条件请求
+    if profiler:
+        profiler.init_app(app, DB)
+    limiter.init_app(app)
+    cache.init_app(app, config={
+        'CACHE_TYPE': 'caching.backend.TieredCache' if CACHE_SHARED else 'caching.backend.LRUCache',
+        'CACHE_THRESHOLD': 4096,
+        'CACHE_MAX_BYTES': CACHE_MAX_BYTES,  # 进程内 LRU 的字节上限
+        'CACHE_SHARED': CACHE_SHARED,
+        'CACHE_DIR': CACHE_DIR,
+        'CACHE_REDIS_URL': CACHE_REDIS_URL,
+    })
+    compression.init_app(app)
+    assets.init_app(app)
+    prerendered.init_app(app)
+    conditional.init_app(app)
+    warmer.init_app(app)
+    export_service.init_app(app)
+    mark('extensions')
+
+    app.register_blueprint(errors_bp)
+    app.register_blueprint(file_bp)
+    app.register_blueprint(page_bp)
+    # 导出为整表扫描，单独限流
+    limiter.limit('6/minute; 100/day')(export_bp)
+    app.register_blueprint(export_bp)
+    mark('routes')
+
+    timing['total'] = perf_counter() - started + IMPORT_TIME
+    app.extensions['startup_timing'] = timing
+    logger.info(startup_report(app))
+
+    return app
+
+
+def startup_report(app: Flask) -> str:
+    """
+    @brief 启动各阶段耗时的报告
+    @param app Flask 应用
+    @return 形如 'startup: imports 420.0ms, config 0.3ms, ...' 的字符串
+    """
+    timing = app.extensions.get('startup_timing', {})
+    return 'startup: ' + ', '.join(f'{phase} {seconds * 1000:.1f}ms' for phase, seconds in timing.items())
+
+
+def dispose_engines(app: Flask):
+    """
+    @brief fork 之后丢弃从父进程继承的连接池
+    @details close=False 不关闭父进程仍在使用的连接，子进程在首次查询时建立自己的连接
+    @param app Flask 应用
+    """
+    with app.app_context():
+        for engine in DB.engines.values():
+            engine.dispose(close=False)
+
+
+def warm_caches(app: Flask):
+    # 每个 worker 启动时调用一次：此后数据版本变化时重新预热。
+    # 命令行命令同样会读取数据版本，监听器不在 create_app 中注册，避免命令执行期间在后台渲染页面
+    data_version.add_listener(warmer.trigger)
+    with app.app_context():
+        warmer.trigger(data_version.get())
+
+
+_app: Flask | None = None
+_app_lock = Lock()
+
+
+def __getattr__(name: str):
+    # 模块级的 app 在首次访问时创建
+    global _app
+    if name != 'app':
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = create_app()
+    return _app
+
+
+@page_bp.app_template_global()
+def anime_cards(anime_list) -> Markup:
+    # 由 macros.html 的 render_anime_list 调用
+    return card_cache.join(anime_list)
+
+
+@coalesced.memoize()
 def get_web_id_map() -> WebIDMap:
     return WebIDMap(Web.query.all())
 
 
-@cache.cached(timeout=5*60)
 def get_latest_date():
-    return DB.session.query(DB.func.max(Score.date)).scalar()
+    # 最新日期随数据版本一起检查，无需单独缓存
+    return data_version.latest_date
+
+
+@coalesced.memoize(timeout=60)
+def is_ranking_built(latest_date) -> bool:
+    # 排名表尚未创建时视为未生成；排名可能在新日期出现后才生成，因此只短暂缓存
+    try:
+        return RankingService.is_built(latest_date)
+    except Exception:
+        DB.session.rollback()
+        return False
+
+
+@coalesced.memoize(timeout=60)
+def is_current_score_built(latest_date) -> bool:
+    # 与排名相同，最新评分表可能在新日期出现后才刷新
+    try:
+        return CurrentScoreService.is_built(latest_date)
+    except Exception:
+        DB.session.rollback()
+        return False
+
+
+def latest_query(latest_date):
+    """
+    @brief 最新评分日期的三表联结查询
+    @details 最新评分表已刷新到该日期时从其出发，否则按日期过滤完整的评分表
+    @param latest_date 最新评分日期
+    @return tuple(查询对象, 仍需传给 apply_filters 的 on_date)
+    """
+    if is_current_score_built(latest_date):
+        return QueryService.base_query(current_date=latest_date), None
+    return QueryService.base_query(), latest_date
+
+
+def get_facets(latest_date) -> FacetCounts | None:
+    # 每个最新日期只分组计数一次，不可用时返回 None
+    return facet_holder.get(latest_date)
+
+
+def get_library_count(latest_date, year: int | None, season: str | None, vote: int) -> int:
+    # 最低投票数为分档下界时由分面计数相加得出，否则执行一次 COUNT
+    facets = get_facets(latest_date)
+    count = facets.count(year, season, vote) if facets else None
+    if count is None:
+        count = count_library(latest_date, year, season, vote)
+    return count
+
+
+@coalesced.memoize()
+def count_library(latest_date, year: int | None, season: str | None, vote: int) -> int:
+    # 同一评分日期内总数不变，日期作为缓存键的一部分
+    if is_ranking_built(latest_date):
+        return QueryService.count_ranked(latest_date, year=year, season=season, min_vote=vote)
+
+    query, on_date = latest_query(latest_date)
+    query = QueryService.apply_filters(query, year=year, season=season, min_vote=vote, on_date=on_date)
+    return QueryService.count(query)
+
+
+@warmer.url_source
+def warmup_urls(library_pages: int = 3, details: int = 50) -> list[str]:
+    # 首页、当前季度动漫库的前几页与投票数最多的详情页，热门搜索由 warmer 统计
+    latest_date = get_latest_date()
+    if not latest_date:
+        return []
+
+    year, season = current_season()
+    urls = ['/', '/library', f'/library/{year}/{season}/0']
+    urls += [f'/library/{year}/{season}/0?page={page}' for page in range(1, library_pages + 1)]
+
+    query, on_date = latest_query(latest_date)
+    query = QueryService.apply_filters(query, on_date=on_date)
+    query = query.order_by(Score.vote.desc()).with_entities(Detail.id).limit(details)
+    urls += [f'/detail/{aid}' for (aid,) in query]
+
+    return urls
+
 
+def get_snapshot(latest_date) -> LatestSnapshot | None:
+    # 最新日期变化时自动重建，快照不可用时返回 None，由调用方回退到 SQL
+    return snapshot_holder.get(latest_date)
 
-@app.route('/')
-@cache.cached(timeout=300)
+
+def get_search_index(latest_date) -> NGramIndex | None:
+    # 首次使用时在后台全量构建，最新日期变化时在后台增量刷新；构建完成之前或构建失败时回退到 LIKE 查询
+    search_index.ensure(latest_date, current_app._get_current_object())
+    return search_index if search_index.ready else None
+
+
+@page_bp.route('/')
+@coalesced.cached()
 def index():
     # 参数
     min_vote = 1000
@@ -65,40 +339,43 @@ def index():
         # 无评分数据时直接返回空
         return render_template('index.html', hot_animes=[])
 
-    # 单次联表查询：按评分倒序，限制数量
-    query = QueryService.base_query()
-    query = QueryService.apply_filters(query, on_date=latest_date, min_vote=min_vote)
-    query = QueryService.order_by_score_desc(query)
+    snapshot = get_snapshot(latest_date)
+    if snapshot:
+        # 直接从内存快照中筛选
+        hot_animes = snapshot.select(min_vote=min_vote)[:max_number]
+        return render_template('index.html', hot_animes=hot_animes)
+
+    if is_ranking_built(latest_date):
+        # 按物化排名读取前 N 名，无需排序
+        query = QueryService.ranked_query(latest_date)
+        query = QueryService.apply_ranked_filters(query, min_vote=min_vote)
+        query = QueryService.order_by_rank(query)
+    else:
+        # 单次联表查询：按评分倒序，限制数量
+        query, on_date = latest_query(latest_date)
+        query = QueryService.apply_filters(query, on_date=on_date, min_vote=min_vote)
+        query = QueryService.order_by_score_desc(query)
 
+    # 只选取卡片所需的列
+    query = QueryService.project_brief(query)
     rows = query.limit(max_number).all()
     hot_animes = QueryService.to_brief_list(rows)
 
     return render_template('index.html', hot_animes=hot_animes)
 
 
-@app.route('/library')
+@page_bp.route('/library')
 @limiter.limit('30/minute; 2000/day')
-@cache.cached(timeout=60)
+@coalesced.cached(timeout=60*60)  # 默认季度取决于当前时间，不能只依赖数据版本
 def library_default():
-    time_object: datetime = datetime.now()
-    year: int = time_object.year
-
-    season: str = 'all'
-    if 1 < time_object.month < 4:
-        season = 'winter'
-    elif 4 <= time_object.month < 7:
-        season = 'spring'
-    elif 7 <= time_object.month < 10:
-        season = 'summer'
-    elif 10 <= time_object.month < 12:
-        season = 'autumn'
+    # 调用未经缓存装饰的视图，返回字符串页面由本视图的缓存统一压缩
+    year, season = current_season()
+    return library.uncached(str(year), season)
 
-    return library(str(year), season)
 
-
-@app.route('/library/<year>/<season>/<int:vote>')
+@page_bp.route('/library/<year>/<season>/<int:vote>')
 @limiter.limit('30/minute; 2000/day')
-@cache.cached(timeout=60, query_string=True)
+@coalesced.cached(query_string=True)
 def library(year: str = None, season: str = None, vote: int = 0):
     # 归一化参数
     if year and year.lower() == 'all':
@@ -123,33 +400,70 @@ def library(year: str = None, season: str = None, vote: int = 0):
 
     latest_date = get_latest_date()
 
-    # 构建查询
-    query = QueryService.base_query()
-    query = QueryService.apply_filters(query, year=norm_year, season=season, min_vote=vote, on_date=latest_date)
-    query = QueryService.order_by_score_desc(query)
-
-    rows, total_count, total_pages = PaginationService.paginate(query, page, per_page)
-    anime = QueryService.to_brief_list(rows)
+    snapshot = get_snapshot(latest_date)
+    next_cursor = None
+    if snapshot:
+        # 内存快照中完成筛选、排序与分页
+        items = snapshot.select(year=norm_year, season=season, min_vote=vote)
+        anime, total_count, total_pages = PaginationService.paginate_list(items, page, per_page)
+    else:
+        # 游标分页：总数来自缓存，顺序翻页时无需OFFSET扫描
+        cursor = PaginationService.decode_cursor(
+            request.args.get('cursor'), latest_date, (norm_year, season, vote, page)
+        )
+        total_count = get_library_count(latest_date, norm_year, season, vote)
+
+        if is_ranking_built(latest_date):
+            # 按物化排名读取区间
+            query = QueryService.ranked_query(latest_date)
+            query = QueryService.apply_ranked_filters(query, year=norm_year, season=season, min_vote=vote)
+            query = QueryService.order_by_rank(query)
+            query = QueryService.project_brief(query)
+
+            rows, total_count, total_pages, last_key = PaginationService.paginate_ranked(
+                query, page, per_page, total_count, cursor
+            )
+        else:
+            # 构建查询
+            query, on_date = latest_query(latest_date)
+            query = QueryService.apply_filters(query, year=norm_year, season=season, min_vote=vote, on_date=on_date)
+            query = QueryService.order_by_score_desc(query)
+            query = QueryService.project_brief(query)
+
+            rows, total_count, total_pages, last_key = PaginationService.paginate_keyset(
+                query, page, per_page, total_count, cursor
+            )
+        anime = QueryService.to_brief_list(rows)
+
+        if last_key and latest_date:
+            next_cursor = PaginationService.encode_cursor(latest_date, (norm_year, season, vote, page + 1), *last_key)
 
     # 分页链接构造器
     def build_url(p: int):
         y = year if year else 'all'
         s = season if season else 'all'
-        return f'/library/{y}/{s}/{vote}?page={p}'
+        url = f'/library/{y}/{s}/{vote}?page={p}'
+        if next_cursor and p == page + 1:
+            url += f'&cursor={next_cursor}'
+        return url
 
     pagination = PaginationService.build_pagination_links(total_pages, page, build_url)
 
+    # 各筛选项的数量
+    facets = get_facets(latest_date)
+
     return render_template(
         'library.html',
         library_args=LibraryArgs(norm_year, season, vote),
         animes=anime,
-        pagination=pagination
+        pagination=pagination,
+        facets=facets.view(norm_year, season, vote) if facets else None
     )
 
 
-@app.route('/search')
+@page_bp.route('/search')
 @limiter.limit('3/second; 20/minute; 2000/day')
-@cache.cached(timeout=60, query_string=True)
+@coalesced.cached(query_string=True)
 def search():
     keyword: str = request.args.get('keyword', '').strip()
     page: int = request.args.get('page', 1, type=int)
@@ -160,14 +474,30 @@ def search():
 
     latest_date = get_latest_date()
 
-    query = QueryService.base_query()
-    query = QueryService.apply_filters(query, keyword=keyword, on_date=latest_date)
+    # 优先使用倒排索引匹配关键字
+    index = get_search_index(latest_date)
+    aids = index.search(keyword) if index else None
+
+    snapshot = get_snapshot(latest_date)
+    if snapshot:
+        # 过滤与分页在内存中完成
+        if aids is None:
+            aids = QueryService.keyword_detail_ids(keyword)
+        items = snapshot.select(aids=aids)
+        anime, total_count, total_pages = PaginationService.paginate_list(items, page, per_page)
+    else:
+        query, on_date = latest_query(latest_date)
+        if aids is None:
+            query = QueryService.apply_filters(query, keyword=keyword, on_date=on_date)
+        else:
+            query = QueryService.apply_filters(query, aids=aids, on_date=on_date)
+        query = QueryService.project_brief(query)
 
-    rows, total_count, total_pages = PaginationService.paginate(query, page, per_page)
-    anime = QueryService.to_brief_list(rows)
+        rows, total_count, total_pages = PaginationService.paginate(query, page, per_page)
+        anime = QueryService.to_brief_list(rows)
 
     def build_url(p: int):
-        return url_for('search', keyword=keyword, page=p)
+        return url_for('.search', keyword=keyword, page=p)
 
     pagination = PaginationService.build_pagination_links(total_pages, page, build_url)
 
@@ -179,52 +509,188 @@ def search():
     )
 
 
-@app.route('/detail/<int:aid>')
-@cache.cached(timeout=60)
+@page_bp.route('/detail/<int:aid>')
+@coalesced.cached()
 def detail(aid: int):
-    # 使用QueryService进行基础三表联查
-    query = QueryService.base_query()
-    query = QueryService.apply_filters(query, aid=aid)
-    result = query.first()
+    # 详情、最新评分与最近7天的评分走势共两次查询
+    loaded = DetailService.load(aid, 7, get_web_id_map())
 
     # 如果找不到结果，返回404
-    if not result:
+    if not loaded:
         abort(404)
 
-    detail_obj, score_obj, web_obj = result
-    web_map = get_web_id_map()
+    detail_info, score_list = loaded
+    return render_template('detail.html', detail=detail_info, score_list=score_list)
 
-    # 使用QueryService将结果转换为DetailInfo对象
-    detail_info = QueryService.to_detail_object(detail_obj, score_obj, web_obj, web_map)
 
-    query = ScoreListService.base_query(aid)
-    query = ScoreListService.from_delay_days(query, aid, 7)
-    query = ScoreListService.order_by_date_desc(query)
+@page_bp.route('/details')
+@limiter.limit('3/second; 60/minute; 2000/day')
+def details():
+    # 一次请求获取多部动画的详情与评分走势，ids 以逗号分隔，最多 100 个
+    try:
+        ids = parse_ids(request.args.get('ids', ''), 100)
+    except ValueError:
+        abort(400, description='Invalid ids parameter')
 
-    # 转换为ScoreList对象
+    delay: int = request.args.get('delay', 7, type=int)
+    if not 1 <= delay <= 90:
+        abort(400, description='Invalid delay parameter')
+
+    # 每部动画单独缓存，未命中的部分共两次 IN 查询
     web_map = get_web_id_map()
-    score_list = ScoreListService.to_score_list(query, web_map)
+    loaded = coalesced.get_or_set_many(
+        f'detail:{delay}', ids, lambda missing: DetailService.load_many(missing, delay, web_map)
+    )
 
-    return render_template('detail.html', detail=detail_info, score_list=score_list)
+    return {
+        'items': [
+            {'id': aid, 'detail': loaded[aid][0], 'scores': loaded[aid][1]} for aid in ids if aid in loaded
+        ],
+        'missing': [aid for aid in ids if aid not in loaded],
+    }
 
 
-@app.route('/score/<int:aid>/<int:delay>')
+@page_bp.route('/score/<int:aid>/<int:delay>')
+@limiter.limit('3/second; 60/minute; 2000/day')
+@coalesced.cached(query_string=True)
 def score(aid: int, delay: int=30):
-    abort(404)
-
-    if delay > 120:
+    # 最长支持十年的评分走势
+    if not 1 <= delay <= 3650:
         abort(400, description='Invalid date parameter')
 
-    # 获取评分列表
-    query = ScoreListService.base_query(aid)
-    query = ScoreListService.from_delay_days(query, aid, date)
-    query = ScoreListService.order_by_date_desc(query)
+    granularity: str = request.args.get('granularity', 'auto')
+    if granularity == 'auto':
+        granularity = auto_granularity(delay)
+    if granularity not in GRANULARITIES:
+        abort(400, description='Invalid granularity parameter')
 
-    # 转换为ScoreList对象
+    points: int = request.args.get('points', 0, type=int)
+    if not 0 <= points <= 1000:
+        abort(400, description='Invalid points parameter')
+
+    # 获取评分列表：周、月粒度优先读取汇总，日粒度读取每日记录，最新日期在同一次查询中确定
     web_map = get_web_id_map()
-    score_list = ScoreListService.to_score_list(query, web_map)
+    score_list = ScoreListService.load_history(aid, delay, granularity, web_map)
+    score_list = ScoreListService.downsample(score_list, granularity, points)
+
+    # 直接返回列表，缓存填充时由 Compression.encode 序列化为 JSON 并预先压缩
+    return score_list
+
+
+@page_bp.cli.command('build-ranking')
+def build_ranking():
+    """生成最新评分日期的物化排名，应在每日评分写入后执行"""
+    data_version.invalidate()
+    latest_date = get_latest_date()
+    if not latest_date:
+        print('No score data')
+        return
+
+    count = RankingService.materialize(latest_date)
+    print(f'Ranking for {latest_date} materialized: {count} rows')
+
+
+@page_bp.cli.command('refresh-current-score')
+def refresh_current_score():
+    """以最新评分日期刷新最新评分表，应在每日评分写入后执行"""
+    data_version.invalidate()
+    latest_date = get_latest_date()
+    if not latest_date:
+        print('No score data')
+        return
+
+    count = CurrentScoreService.refresh(latest_date)
+    print(f'Current score for {latest_date} refreshed: {count} rows')
+
+
+@page_bp.cli.command('compact-scores')
+@click.option('--granularity', type=click.Choice(('all',) + ROLLUP_GRANULARITIES), default='all', help='汇总粒度')
+@click.option('--rebuild', is_flag=True, help='删除已有汇总并从现存最早的评分重新汇总，更早的汇总保留')
+def compact_scores(granularity: str, rebuild: bool):
+    """将已结束的周、月评分汇总到 score_rollup 表，应在每日评分写入后执行"""
+    data_version.invalidate()
+    latest_date = get_latest_date()
+    if not latest_date:
+        print('No score data')
+        return
+
+    for item in ROLLUP_GRANULARITIES if granularity == 'all' else (granularity,):
+        periods, rows = HistoryService.compact(item, latest_date, rebuild=rebuild)
+        print(f'{item} rollup until {HistoryService.compacted_until(item)}: {periods} periods, {rows} rows')
+
+
+@page_bp.cli.command('score-partitions')
+@click.option('--months-ahead', default=3, help='提前创建的月份数')
+@click.option('--drop-before', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='删除早于该日期且已汇总的整月分区')
+@click.option('--execute', is_flag=True, help='执行 DDL，默认只输出')
+def score_partitions(months_ahead: int, drop_before: datetime | None, execute: bool):
+    """按月分区 score 表并预先创建未来的分区，仅支持 MySQL"""
+    statements = HistoryService.partition_statements(
+        months_ahead, drop_before.date() if drop_before else None
+    )
+    if not statements:
+        print('Nothing to do')
+        return
+
+    for statement in statements:
+        print(f'{statement};')
+    if execute:
+        HistoryService.execute(statements)
+
+
+@page_bp.cli.command('export-static')
+@click.option('--years', default=3, help='导出最近几年的动漫库，另含全部年份')
+@click.option('--votes', default='0,100,1000', help='导出的最低投票数，逗号分隔')
+@click.option('--pages', default=5, help='每个动漫库组合导出的页数')
+@click.option('--details', default=500, help='导出评分最高的详情页数量')
+def export_static(years: int, votes: str, pages: int, details: int):
+    """导出首页、常用动漫库组合与热门详情页的静态页面，应在每日评分写入后执行"""
+    data_version.invalidate()
+    latest_date = get_latest_date()
+    if not latest_date:
+        print('No score data')
+        return
+
+    # 导出请求全部来自本进程
+    limiter.enabled = False
+
+    urls = ['/']
+    for year in ['all'] + [str(latest_date.year - i) for i in range(years)]:
+        for season in ('all', 'spring', 'summer', 'autumn', 'winter'):
+            for vote in (int(v) for v in votes.split(',') if v.strip()):
+                total_count = get_library_count(
+                    latest_date, None if year == 'all' else int(year), None if season == 'all' else season, vote
+                )
+                for page in range(1, min(pages, max((total_count + 19) // 20, 1)) + 1):
+                    urls.append(f'/library/{year}/{season}/{vote}?page={page}')
+
+    query, on_date = latest_query(latest_date)
+    query = QueryService.apply_filters(query, on_date=on_date)
+    query = QueryService.order_by_score_desc(query)
+    for (aid,) in query.with_entities(Detail.id).limit(details):
+        urls.append(f'/detail/{aid}')
+
+    version, count = prerendered.export(current_app.test_client(), urls)
+    print(f'Exported {count} pages for {version}')
+
+
+@page_bp.cli.command('prewarm-pictures')
+@click.option('--workers', default=4, help='并行生成的线程数')
+def prewarm_pictures(workers: int):
+    """为全部封面生成各尺寸的 JPEG / WebP 缩略图，需要安装 Pillow"""
+    if not picture_store.formats:
+        print('Pillow is not installed')
+        return
+
+    count = picture_store.prewarm(workers=workers)
+    print(f'{count} thumbnails ready in {picture_store.cache_dir}')
+
 
-    return str(score_list)
+@page_bp.cli.command('startup-report')
+def startup_report_command():
+    """输出应用启动各阶段的耗时"""
+    print(startup_report(current_app))
 
 
 if __name__ == '__main__':
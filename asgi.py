@@ -0,0 +1,390 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file asgi.py
+@brief 只读页面的异步(ASGI)服务入口
+@details app.py 基于阻塞的 PyMySQL，每个等待数据库的请求都占用一个线程。
+         本模块使用 Quart 与 aiomysql 提供 index / library / search / detail / picture 的异步版本，
+         单个进程即可同时挂起数百个等待数据库或磁盘的请求。查询语句与转换逻辑复用
+         QueryService / ScoreListService，默认季度、数据版本号与客户端地址的计算与 app.py 共用，
+         模板与静态文件也与 app.py 共用。评分走势接口与 build-ranking 等命令仍由 app.py 提供。
+
+         与 app.py 的差异：
+         - 动漫库与搜索只使用 COUNT + OFFSET 分页，不使用内存快照、物化排名、最新评分表与游标分页，
+           结果顺序相同，但深分页较慢；
+         - 搜索不使用 n-gram 索引，以 QueryService.keyword_query 对 name_map 执行 LIKE，与 app.py
+           索引尚未就绪时的回退路径相同；只出现在 Detail.all 而不在 name_map 中的别名搜不到；
+         - 缓存为进程内 LRU，并发回源由协程版本的 get_or_set 合并，不与 app.py 的共享缓存互通。
+         启动方式: hypercorn -c config_asgi.py asgi:app
+"""
+
+import asyncio
+import logging
+import os
+from datetime import date, timedelta
+from hashlib import md5
+from time import monotonic
+
+from quart import Quart, request, abort, render_template, send_from_directory, url_for
+from quart_rate_limiter import RateLimiter, RateLimit, rate_limit
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from werkzeug.exceptions import HTTPException
+
+from constant import ASYNC_DB_URI, ASYNC_POOL_SIZE, ASYNC_MAX_OVERFLOW, CACHE_MAX_BYTES
+from constant import ENABLE_INNER_PICTURE, PICTURE_PATH
+from database.model import Web
+from database.data import LibraryArgs
+from database.service import QueryService, ScoreListService, PaginationService, WebIDMap
+from database.detail import DetailService
+from database.version import DataVersion
+from caching.backend import LRUCache
+from route.assets import StaticAssets
+from route.common import current_season, real_user_ip
+
+logger = logging.getLogger(__name__)
+
+app = Quart(__name__)
+
+# ASYNC_DB_URI 未单独设置时由 DB_URI 得出，只有 MySQL 会替换为异步驱动
+if not make_url(ASYNC_DB_URI).get_dialect().is_async:
+    raise RuntimeError(
+        f'ASYNC_DB_URI must use an async driver (e.g. mysql+aiomysql), got {make_url(ASYNC_DB_URI).drivername!r}; '
+        'set ASYNC_DB_URI explicitly'
+    )
+
+# 连接池：请求在等待连接时只挂起协程，不占用线程，池大小决定同时执行的查询数
+engine = create_async_engine(
+    ASYNC_DB_URI,
+    pool_size=ASYNC_POOL_SIZE,
+    max_overflow=ASYNC_MAX_OVERFLOW,
+    pool_timeout=30,  # 等待空闲连接的最长时间(秒)
+    pool_recycle=3600,  # 避免使用被 MySQL wait_timeout 断开的连接
+    pool_pre_ping=True,  # 每次使用连接前先ping一下，检查连接是否有效
+    echo=False,  # 输出 SQL
+)
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+# 静态资源：已构建时引用 static/dist 下的哈希文件，由 Quart 的 static 路由提供
+assets = StaticAssets(root=os.path.join(app.root_path, 'static', 'dist'))
+assets.load()
+
+
+@app.template_global()
+def asset_url(filename: str) -> str:
+    hashed = assets.manifest.get(filename)
+    return url_for('static', filename=f'dist/{hashed}' if hashed else filename)
+
+
+# 渲染结果缓存，键带有最新评分日期，数据变化时自动切换
+page_cache = LRUCache(max_bytes=CACHE_MAX_BYTES, threshold=4096, default_timeout=2 * 24 * 60 * 60)
+
+
+async def get_real_user_ip() -> str:
+    return real_user_ip(request)
+
+
+limiter = RateLimiter(app, key_function=get_real_user_ip)
+
+
+class AsyncDataVersion(object):
+    """
+    @class AsyncDataVersion
+    @brief database.version.DataVersion 的协程版本
+    @details 查询与版本号格式复用 DataVersion，检查间隔内直接返回上一次的结果，同一时间只有一个协程执行检查
+    """
+
+    def __init__(self, check_interval: float = 30):
+        self.check_interval = check_interval
+
+        self.token: str | None = None
+        self.latest_date: date | None = None
+        self._checked = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> str:
+        """
+        @brief 获取当前数据版本号，超过检查间隔时重新计算
+        @return 版本号
+        """
+        if self.token is not None and monotonic() - self._checked < self.check_interval:
+            return self.token
+
+        async with self._lock:
+            if self.token is None or monotonic() - self._checked >= self.check_interval:
+                latest_statement, web_statement = DataVersion.statements()
+                async with Session() as session:
+                    latest_date = await session.scalar(latest_statement)
+                    webs = (await session.execute(web_statement)).all()
+
+                self.latest_date = latest_date
+                self.token = DataVersion.make_token(latest_date, webs)
+                self._checked = monotonic()
+
+        return self.token
+
+
+data_version = AsyncDataVersion()
+
+# 正在回源的缓存键 -> 结果，合并同一键上的并发请求
+_inflight: dict[str, asyncio.Future] = {}
+
+
+async def get_or_set(key: str, fn, timeout: int | None = None):
+    """
+    @brief 读取缓存，未命中时合并回源
+    @param key 不含版本号的缓存键
+    @param fn 无参协程函数，返回 None 时不缓存
+    @param timeout 过期时间(秒)，None 表示缓存到数据版本变化为止
+    @return 缓存值或计算结果
+    """
+    key = f'{await data_version.get()}:{key}'
+
+    value = page_cache.get(key)
+    if value is not None:
+        return value
+
+    future = _inflight.get(key)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = _inflight[key] = asyncio.get_running_loop().create_future()
+    try:
+        value = await fn()
+        if value is not None:
+            page_cache.set(key, value, timeout=timeout)
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        future.set_exception(e)
+        # 没有等待者时避免 "exception was never retrieved" 警告
+        future.exception()
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+def request_key(query_string: bool = False) -> str:
+    # 与 CoalescingCache.request_key 相同的键格式
+    if not query_string:
+        return f'view:{request.path}'
+
+    args = sorted(request.args.items(multi=True))
+    return f'view:{request.path}:{md5(str(args).encode()).hexdigest()}'
+
+
+async def get_web_id_map(session: AsyncSession) -> WebIDMap:
+    async def load():
+        return WebIDMap((await session.execute(select(Web))).scalars().all())
+
+    return await get_or_set('memo:web_id_map', load)
+
+
+async def get_count(session: AsyncSession, key: str, statement) -> int:
+    # 同一数据版本内总数不变
+    async def load():
+        return await session.scalar(QueryService.count_select(statement))
+
+    return await get_or_set(f'count:{key}', load)
+
+
+async def paginate(session: AsyncSession, key: str, statement, page: int, per_page: int):
+    """
+    @brief 异步版本的 PaginationService.paginate
+    @param session 异步会话
+    @param key 计数的缓存键
+    @param statement 已筛选排序的select语句
+    @param page 页码，从1开始
+    @param per_page 每页显示数量
+    @return tuple(items, total_count, total_pages) 分页结果元组
+    """
+    if page < 1:
+        page = 1
+    offset = (page - 1) * per_page
+    total_count = await get_count(session, key, statement)
+    items = (await session.execute(statement.offset(offset).limit(per_page))).all()
+    total_pages = (total_count + per_page - 1) // per_page
+    return items, total_count, total_pages
+
+
+@app.errorhandler(HTTPException)
+async def handle_http_exception(error: HTTPException):
+    return await render_template('error.html', code=error.code, message=error.description), error.code
+
+
+@app.route('/')
+async def index():
+    # 参数
+    min_vote = 1000
+    max_number = 20
+
+    async def render():
+        latest_date = data_version.latest_date
+        if not latest_date:
+            # 无评分数据时直接返回空
+            return await render_template('index.html', hot_animes=[])
+
+        statement = QueryService.base_select()
+        statement = QueryService.apply_filters(statement, on_date=latest_date, min_vote=min_vote)
+        statement = QueryService.order_by_score_desc(statement)
+        statement = QueryService.project_brief(statement)
+
+        async with Session() as session:
+            rows = (await session.execute(statement.limit(max_number))).all()
+
+        return await render_template('index.html', hot_animes=QueryService.to_brief_list(rows))
+
+    return await get_or_set(request_key(), render)
+
+
+@app.route('/library')
+@rate_limit(limits=[RateLimit(30, timedelta(minutes=1)), RateLimit(2000, timedelta(days=1))])
+async def library_default():
+    year, season = current_season()
+    return await library(str(year), season)
+
+
+@app.route('/library/<year>/<season>/<int:vote>')
+@rate_limit(limits=[RateLimit(30, timedelta(minutes=1)), RateLimit(2000, timedelta(days=1))])
+async def library(year: str = None, season: str = None, vote: int = 0):
+    # 归一化参数
+    if year and year.lower() == 'all':
+        year = None
+    if season and season.lower() == 'all':
+        season = None
+
+    if season not in ('spring', 'summer', 'autumn', 'winter', None):
+        abort(400, description='Invalid season parameter')
+
+    norm_year = None
+    if year:
+        try:
+            norm_year = int(year)
+        except ValueError:
+            abort(400, description='Invalid year parameter')
+
+    page: int = request.args.get('page', 1, type=int)
+    per_page = 20
+
+    async def render():
+        latest_date = data_version.latest_date
+
+        statement = QueryService.base_select()
+        statement = QueryService.apply_filters(statement, year=norm_year, season=season, min_vote=vote, on_date=latest_date)
+        statement = QueryService.order_by_score_desc(statement)
+        statement = QueryService.project_brief(statement)
+
+        async with Session() as session:
+            rows, total_count, total_pages = await paginate(
+                session, f'library:{norm_year}:{season}:{vote}', statement, page, per_page
+            )
+        anime = QueryService.to_brief_list(rows)
+
+        def build_url(p: int):
+            y = year if year else 'all'
+            s = season if season else 'all'
+            return f'/library/{y}/{s}/{vote}?page={p}'
+
+        pagination = PaginationService.build_pagination_links(total_pages, page, build_url)
+
+        return await render_template(
+            'library.html',
+            library_args=LibraryArgs(norm_year, season, vote),
+            animes=anime,
+            pagination=pagination
+        )
+
+    # 默认季度取决于当前时间，以实际参数作为缓存键
+    return await get_or_set(f'view:/library/{norm_year}/{season}/{vote}:{page}', render)
+
+
+@app.route('/search')
+@rate_limit(limits=[
+    RateLimit(3, timedelta(seconds=1)),
+    RateLimit(20, timedelta(minutes=1)),
+    RateLimit(2000, timedelta(days=1)),
+])
+async def search():
+    keyword: str = request.args.get('keyword', '').strip()
+    page: int = request.args.get('page', 1, type=int)
+    per_page = 20
+
+    if not 2 <= len(keyword) <= 64:
+        abort(400, description='Invalid keyword parameter')
+
+    async def render():
+        latest_date = data_version.latest_date
+
+        statement = QueryService.base_select()
+        statement = QueryService.apply_filters(statement, keyword=keyword, on_date=latest_date)
+        statement = QueryService.project_brief(statement)
+
+        async with Session() as session:
+            rows, total_count, total_pages = await paginate(
+                session, f'search:{md5(keyword.encode()).hexdigest()}', statement, page, per_page
+            )
+        anime = QueryService.to_brief_list(rows)
+
+        def build_url(p: int):
+            return url_for('search', keyword=keyword, page=p)
+
+        pagination = PaginationService.build_pagination_links(total_pages, page, build_url)
+
+        return await render_template(
+            'search.html',
+            query=keyword,
+            animes=anime,
+            pagination=pagination
+        )
+
+    return await get_or_set(request_key(query_string=True), render)
+
+
+@app.route('/detail/<int:aid>')
+async def detail(aid: int):
+    async def render():
+        # 详情、最新评分与最近7天的评分走势共两次查询
+        async with Session() as session:
+            details = (await session.execute(DetailService.detail_select([aid]))).all()
+            history_rows = (await session.execute(DetailService.history_select([aid], 7))).all() if details else []
+            web_map = await get_web_id_map(session)
+
+        loaded = DetailService.assemble(details, history_rows, 7, web_map).get(aid)
+
+        # 如果找不到结果，返回404
+        if not loaded:
+            abort(404)
+
+        detail_info, score_list = loaded
+        return await render_template('detail.html', detail=detail_info, score_list=score_list)
+
+    return await get_or_set(request_key(), render)
+
+
+@app.route('/picture/<int:pid>')
+async def picture(pid: int):
+    if not ENABLE_INNER_PICTURE:
+        abort(404)
+
+    # 文件读取在线程池中完成，不阻塞事件循环
+    return await send_from_directory(PICTURE_PATH, str(pid) + '.jpg')
+
+
+@app.before_serving
+async def warm_version():
+    # 启动时确定数据版本，首个请求无需等待
+    try:
+        await data_version.get()
+    except Exception:
+        logger.exception('failed to read data version')
+
+
+@app.after_serving
+async def close_engine():
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    pass
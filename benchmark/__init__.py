@@ -0,0 +1,26 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file __init__.py
+@brief 基准测试包
+@details seed 向本地数据库写入合成数据，run 通过 Flask 测试客户端与 HTTP 压测驱动页面并输出延迟、吞吐与查询数。
+"""
+
+import os
+
+
+def prepare_env(db_uri: str):
+    """
+    @brief 在导入 app 之前设置基准测试所需的环境变量
+    @details constant.py 在 posix 系统上从环境变量读取配置，未设置的项使用本地默认值
+    @param db_uri 基准测试使用的数据库连接串
+    """
+    os.environ['DB_URI'] = db_uri
+    os.environ.setdefault('ENABLE_INNER_PICTURE', 'false')
+    os.environ.setdefault('PICTURE_PATH', 'picture')
+    os.environ.setdefault('SERVER_PORT', '8000')
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,265 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file run.py
+@brief 基准测试驱动
+@details 对 index / library(深分页) / search / detail 分别发起请求，输出 p50/p95/p99 延迟、吞吐与每请求查询数。
+         client 模式通过 Flask 测试客户端串行请求，测量单个请求的处理耗时；
+         http 模式在本进程内启动多线程 HTTP 服务，或使用 --target 指向已启动的 gunicorn，
+         由多个线程并发请求，测量并发下的延迟与吞吐。
+         用法: python -m benchmark.run --db sqlite:///bench.db --mode both --requests 500 --concurrency 16
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import urlopen
+
+from sqlalchemy import event
+
+from benchmark import prepare_env
+
+
+@dataclass
+class SeedInfo(object):
+    max_aid: int  # 最大 Detail.id
+    pages: int  # 全部动画的分页数
+    years: list[int]  # 库中的年份
+    keywords: list[str]  # 搜索关键字样本
+
+
+@dataclass
+class Result(object):
+    scenario: str
+    mode: str
+    requests: int = 0
+    errors: int = 0
+    seconds: float = 0.0  # 墙钟时间
+    queries: int | None = None  # SQL 语句总数，外部服务时为 None
+    latencies: list[float] = field(default_factory=list, repr=False)  # 毫秒
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+    def summary(self) -> dict:
+        data = asdict(self)
+        data.pop('latencies')
+        data.update(
+            p50=round(self.percentile(50), 2),
+            p95=round(self.percentile(95), 2),
+            p99=round(self.percentile(99), 2),
+            rps=round(self.requests / self.seconds, 1) if self.seconds else 0.0,
+            queries_per_request=round(self.queries / self.requests, 2) if self.queries is not None and self.requests else None,
+        )
+        return data
+
+
+class QueryCounter(object):
+    """
+    @brief 统计引擎执行的 SQL 语句数
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.count += 1
+
+
+def scenario_urls(info: SeedInfo, rng: random.Random) -> dict:
+    """
+    @brief 各场景的请求地址生成器
+    @details library 场景集中在深分页，search 与 detail 随机取样以覆盖缓存未命中的情况
+    @param info 数据概况
+    @param rng 随机数生成器
+    @return 场景名 -> 无参函数，返回请求地址
+    """
+    return {
+        'index': lambda: '/',
+        'library': lambda: f'/library/all/all/0?page={rng.randint(max(info.pages // 2, 1), max(info.pages, 1))}',
+        'library_filtered': lambda: f'/library/{rng.choice(info.years)}/{rng.choice(("spring", "summer", "autumn", "winter"))}/100',
+        'search': lambda: f'/search?keyword={quote(rng.choice(info.keywords))}',
+        'detail': lambda: f'/detail/{rng.randint(1, info.max_aid)}',
+    }
+
+
+def load_info(app, rng: random.Random) -> SeedInfo:
+    """
+    @brief 读取数据概况，用于生成请求地址
+    """
+    from database.model import DB, Detail, NameMap
+
+    with app.app_context():
+        max_aid = DB.session.query(DB.func.max(Detail.id)).scalar() or 1
+        years = [row[0] for row in DB.session.query(Detail.year).distinct() if row[0]]
+        names = [row[0] for row in DB.session.query(NameMap.name).order_by(DB.func.random()).limit(200)]
+
+    # 关键字取名称中的一个词，与用户输入相似
+    keywords = [word for word in (rng.choice(name.split()) for name in names) if len(word) >= 2]
+    return SeedInfo(max_aid=max_aid, pages=(max_aid + 19) // 20, years=years or [2024], keywords=keywords or ['Sword'])
+
+
+def run_client(app, appmod, counter: QueryCounter, name: str, next_url, requests: int, cold: bool) -> Result:
+    """
+    @brief 通过测试客户端串行请求
+    @param cold 每次请求前清空缓存，测量回源路径
+    """
+    result = Result(scenario=name, mode='client', queries=0)
+    client = app.test_client()
+
+    started = perf_counter()
+    for _ in range(requests):
+        url = next_url()
+        if cold:
+            appmod.cache.clear()
+
+        before = counter.count
+        t0 = perf_counter()
+        response = client.get(url)
+        response.get_data()
+        result.latencies.append((perf_counter() - t0) * 1000)
+        result.queries += counter.count - before
+
+        result.requests += 1
+        if response.status_code >= 400 and response.status_code != 404:
+            result.errors += 1
+    result.seconds = perf_counter() - started
+
+    return result
+
+
+def run_http(base_url: str, counter: QueryCounter | None, name: str, next_url, requests: int, concurrency: int) -> Result:
+    """
+    @brief 多线程并发请求 HTTP 服务
+    @param base_url 服务地址，例如 http://127.0.0.1:8000
+    @param counter 本进程服务的查询计数器，外部服务时为 None
+    """
+    result = Result(scenario=name, mode='http', queries=None if counter is None else 0)
+    lock = threading.Lock()
+    urls = [next_url() for _ in range(requests)]
+
+    def fetch(url: str):
+        t0 = perf_counter()
+        error = False
+        try:
+            with urlopen(base_url + url, timeout=60) as response:
+                response.read()
+        except HTTPError as e:
+            error = e.code != 404
+        except OSError:
+            error = True
+        elapsed = (perf_counter() - t0) * 1000
+
+        with lock:
+            result.latencies.append(elapsed)
+            result.requests += 1
+            result.errors += error
+
+    before = counter.count if counter else 0
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fetch, urls))
+    result.seconds = perf_counter() - started
+    if counter:
+        result.queries = counter.count - before
+
+    return result
+
+
+def print_table(results: list[Result]):
+    header = f'{"scenario":<18}{"mode":<8}{"req":>6}{"err":>5}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"req/s":>9}{"q/req":>8}'
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        s = result.summary()
+        qpr = '-' if s['queries_per_request'] is None else f'{s["queries_per_request"]:.2f}'
+        print(f'{s["scenario"]:<18}{s["mode"]:<8}{s["requests"]:>6}{s["errors"]:>5}'
+              f'{s["p50"]:>10.2f}{s["p95"]:>10.2f}{s["p99"]:>10.2f}{s["rps"]:>9.1f}{qpr:>8}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='页面基准测试')
+    parser.add_argument('--db', default='sqlite:///bench.db', help='由 benchmark.seed 生成的数据库')
+    parser.add_argument('--mode', choices=('client', 'http', 'both'), default='both')
+    parser.add_argument('--scenarios', default='index,library,library_filtered,search,detail', help='逗号分隔的场景')
+    parser.add_argument('--requests', type=int, default=200, help='每个场景的请求数')
+    parser.add_argument('--concurrency', type=int, default=8, help='http 模式的并发线程数')
+    parser.add_argument('--warmup', type=int, default=5, help='每个场景正式计时前的预热请求数')
+    parser.add_argument('--cold', action='store_true', help='client 模式下每次请求前清空缓存')
+    parser.add_argument('--target', help='http 模式请求已启动的服务，例如 http://127.0.0.1:8000')
+    parser.add_argument('--json', help='将结果写入 JSON 文件，便于比较两次运行')
+    parser.add_argument('--random-seed', type=int, default=0)
+    args = parser.parse_args()
+
+    prepare_env(args.db)
+
+    import app as appmod
+    from database.model import DB
+
+    app = appmod.app
+    appmod.limiter.enabled = False  # 压测请求来自同一地址，关闭限流
+
+    counter = QueryCounter()
+    with app.app_context():
+        event.listen(DB.engine, 'before_cursor_execute', counter)
+
+    rng = random.Random(args.random_seed)
+    info = load_info(app, rng)
+    generators = scenario_urls(info, rng)
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    for name in names:
+        if name not in generators:
+            parser.error(f'unknown scenario: {name}')
+
+    # 预热：构建快照、搜索索引等一次性结构，不计入结果
+    client = app.test_client()
+    for name in names:
+        for _ in range(args.warmup):
+            client.get(generators[name]())
+
+    results: list[Result] = []
+    if args.mode in ('client', 'both'):
+        for name in names:
+            results.append(run_client(app, appmod, counter, name, generators[name], args.requests, args.cold))
+
+    if args.mode in ('http', 'both'):
+        server = None
+        base_url = args.target
+        if not base_url:
+            from werkzeug.serving import make_server
+            logging.getLogger('werkzeug').setLevel(logging.WARNING)  # 不输出访问日志
+            server = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f'http://127.0.0.1:{server.server_port}'
+
+        try:
+            for name in names:
+                results.append(run_http(
+                    base_url, None if args.target else counter, name, generators[name], args.requests, args.concurrency
+                ))
+        finally:
+            if server:
+                server.shutdown()
+
+    print_table(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([result.summary() for result in results], f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
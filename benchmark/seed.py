@@ -0,0 +1,165 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file seed.py
+@brief 基准测试数据生成
+@details 通过 database/model.py 向本地数据库写入合成数据：Detail、每部动画的每日评分以及 NameMap 别名。
+         数据分布近似线上：评分集中在 6~8 分，投票数呈长尾分布，新番的评分历史较短，
+         最新评分日期覆盖全部动画。SQLite 不支持 MySQL 的 YEAR / TINYINT，建表时映射为 INTEGER。
+         用法: python -m benchmark.seed --db sqlite:///bench.db --details 50000 --days 730
+"""
+
+import argparse
+import logging
+import random
+from datetime import date, timedelta
+from time import perf_counter
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.mysql import YEAR, TINYINT
+from sqlalchemy.ext.compiler import compiles
+
+from benchmark import prepare_env
+
+logger = logging.getLogger(__name__)
+
+SEASONS = ('spring', 'summer', 'autumn', 'winter')
+WORDS = (
+    'Sword', 'Magic', 'School', 'Love', 'Star', 'Dragon', 'Girl', 'Hero', 'Night', 'Sky',
+    '进击', '巨人', '魔法', '少女', '学园', '物语', '勇者', '星空', '恋爱', '战记',
+    'ソード', 'まほう', 'ほし', 'こい',
+)
+
+CHUNK_SIZE = 10000
+
+
+@compiles(YEAR, 'sqlite')
+def _compile_year(type_, compiler, **kw):
+    return 'INTEGER'
+
+
+@compiles(TINYINT, 'sqlite')
+def _compile_tinyint(type_, compiler, **kw):
+    return 'INTEGER'
+
+
+def fake_name(rng: random.Random, aid: int) -> str:
+    """
+    @brief 生成动画名称，名称中带有编号以满足 NameMap.name 唯一约束
+    @param rng 随机数生成器
+    @param aid Detail.id
+    @return 名称
+    """
+    return f'{" ".join(rng.sample(WORDS, rng.randint(2, 4)))} {aid}'
+
+
+def seed(details: int, days: int, latest: date, aliases: int, rng: random.Random):
+    """
+    @brief 写入合成数据，需在应用上下文中调用
+    @param details Detail 行数
+    @param days 评分历史的最长天数
+    @param latest 最新评分日期
+    @param aliases 每部动画的平均别名数
+    @param rng 随机数生成器
+    """
+    from database.model import DB, Detail, Score, Web, NameMap
+
+    DB.create_all()
+    if DB.engine.dialect.name == 'sqlite':
+        # 一次性数据，关闭日志与同步以加快写入
+        DB.session.execute(DB.text('PRAGMA journal_mode=OFF'))
+        DB.session.execute(DB.text('PRAGMA synchronous=OFF'))
+
+    DB.session.execute(insert(Web), [
+        {'id': 1, 'name': 'Bangumi', 'host': 'bgm.tv', 'format': '/subject/{}', 'priority': 1},
+        {'id': 2, 'name': 'MyAnimeList', 'host': 'myanimelist.net', 'format': '/anime/{}', 'priority': 2},
+    ])
+
+    started = perf_counter()
+    detail_rows, name_rows, score_rows = [], [], []
+    score_count = 0
+
+    def flush(force: bool = False):
+        for model, rows in ((Detail, detail_rows), (NameMap, name_rows), (Score, score_rows)):
+            if rows and (force or len(rows) >= CHUNK_SIZE):
+                DB.session.execute(insert(model), rows)
+                rows.clear()
+
+    for aid in range(1, details + 1):
+        name = fake_name(rng, aid)
+        all_names = [name] + [f'{fake_name(rng, aid)} alt{i}' for i in range(rng.randint(0, aliases * 2))]
+        year = latest.year - rng.randint(0, 10)
+
+        detail_rows.append({
+            'id': aid,
+            'name': name,
+            'translation': f'译名 {aid}',
+            'all': all_names,
+            'year': year,
+            'season': rng.choice(SEASONS),
+            'time': date(year, rng.randint(1, 12), 1),
+            'tag': rng.sample(WORDS, 3),
+            'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 200))),
+            'web': rng.randint(1, 2),
+            'webId': aid,
+            'picture': f'lain.bgm.tv/pic/cover/l/{aid}.jpg',
+        })
+        for n in all_names:
+            name_rows.append({'name': n, 'detailId': aid})
+
+        # 评分在 6~8 分附近随机游走，投票数长尾分布并缓慢增长
+        score = min(max(rng.gauss(7.0, 0.8), 3.0), 9.6)
+        vote = int(rng.lognormvariate(5.5, 1.8))
+        history = rng.randint(1, days)
+        for d in range(history - 1, -1, -1):
+            score = min(max(score + rng.gauss(0, 0.02), 1.0), 9.9)
+            vote += rng.randint(0, max(vote // 500, 1))
+            score_rows.append({
+                'detailId': aid,
+                'detailScore': {'1': [round(score, 2), vote], '2': [round(score + 0.3, 2), vote * 3]},
+                'score': round(score, 2),
+                'vote': vote,
+                'date': latest - timedelta(days=d),
+            })
+            score_count += 1
+
+        flush()
+        if aid % 5000 == 0:
+            logger.info('%d details, %d scores, %.0fs', aid, score_count, perf_counter() - started)
+
+    flush(force=True)
+    DB.session.commit()
+    logger.info('seeded %d details, %d scores in %.0fs', details, score_count, perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='向本地数据库写入基准测试数据')
+    parser.add_argument('--db', default='sqlite:///bench.db', help='数据库连接串，需为空库')
+    parser.add_argument('--details', type=int, default=50000, help='Detail 行数')
+    parser.add_argument('--days', type=int, default=730, help='评分历史的最长天数')
+    parser.add_argument('--latest', type=date.fromisoformat, default=date.today(), help='最新评分日期')
+    parser.add_argument('--aliases', type=int, default=2, help='每部动画的平均别名数')
+    parser.add_argument('--ranking', action='store_true', help='写入后生成物化排名')
+    parser.add_argument('--current-score', action='store_true', help='写入后刷新最新评分表')
+    parser.add_argument('--random-seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    prepare_env(args.db)
+
+    from app import app
+    with app.app_context():
+        seed(args.details, args.days, args.latest, args.aliases, random.Random(args.random_seed))
+
+        if args.ranking:
+            from database.ranking import RankingService
+            RankingService.materialize(args.latest)
+
+        if args.current_score:
+            from database.current import CurrentScoreService
+            CurrentScoreService.refresh(args.latest)
+
+
+if __name__ == '__main__':
+    main()
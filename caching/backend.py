@@ -0,0 +1,328 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file backend.py
+@brief Flask-Caching 缓存后端
+@details LRUCache 为按字节数计量容量的进程内 LRU 缓存；TieredCache 在其之上增加
+         多个 gunicorn worker 共享的二级缓存（文件系统或兼容 Redis 协议的服务）。
+         两者均可通过 CACHE_TYPE 配置为 'caching.backend.LRUCache' / 'caching.backend.TieredCache'。
+         使用 Redis 作为共享缓存时需要另外安装 redis 包。
+"""
+
+import logging
+import os
+import pickle
+import struct
+from collections import OrderedDict
+from threading import RLock
+from time import time
+
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.filesystemcache import FileSystemCache
+from flask_caching.backends.rediscache import RedisCache
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache(BaseCache):
+    """
+    @class LRUCache
+    @brief 按字节数限制容量的进程内 LRU 缓存
+    @details 值以 pickle 字节串保存，既与其他后端的隔离语义一致，也便于精确统计占用；
+             超出字节上限或条目上限时淘汰最久未访问的条目
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, threshold: int = 4096, default_timeout: int = 300):
+        """
+        @brief 初始化缓存
+        @param max_bytes 缓存值占用的字节上限
+        @param threshold 条目数上限
+        @param default_timeout 默认过期时间(秒)，0 表示永不过期
+        """
+        BaseCache.__init__(self, default_timeout=default_timeout)
+
+        self.max_bytes = max_bytes
+        self.threshold = threshold
+
+        # key -> (过期时间戳, pickle 字节串)
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._lock = RLock()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            dict(
+                max_bytes=config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024),
+                threshold=config['CACHE_THRESHOLD'],
+            )
+        )
+        return cls(*args, **kwargs)
+
+    @property
+    def size_bytes(self) -> int:
+        """
+        @brief 当前缓存值占用的字节数
+        """
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expires(self, timeout: int | None) -> float:
+        timeout = self._normalize_timeout(timeout)
+        return time() + timeout if timeout > 0 else 0
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+        return entry
+
+    def _live(self, key: str) -> tuple[float, bytes] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires, data = entry
+        if expires and expires <= time():
+            self._pop(key)
+            return None
+
+        return entry
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            data = entry[1]
+
+        try:
+            return pickle.loads(data)
+        except (pickle.PickleError, EOFError, AttributeError, ImportError):
+            return None
+
+    def set(self, key: str, value, timeout: int | None = None) -> bool:
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+        # 单个值超过总容量时不缓存，避免清空整个缓存
+        if len(data) > self.max_bytes:
+            return False
+
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (self._expires(timeout), data)
+            self._bytes += len(data)
+
+            while self._bytes > self.max_bytes or len(self._entries) > self.threshold:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+        return True
+
+    def add(self, key: str, value, timeout: int | None = None) -> bool:
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            return self.set(key, value, timeout)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._pop(key) is not None
+
+    def has(self, key: str) -> bool:
+        with self._lock:
+            return self._live(key) is not None
+
+    def clear(self) -> bool:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        return True
+
+
+class LeaseFileSystemCache(FileSystemCache):
+    """
+    @class LeaseFileSystemCache
+    @brief add 为原子操作的文件系统缓存
+    @details FileSystemCache.add 先检查文件是否存在再写入，多个进程可能同时判断为不存在并都写入成功，
+             不能作为互斥租约。这里以 O_CREAT | O_EXCL 创建缓存文件，同一时刻只有一个进程能够创建成功；
+             文件格式与 FileSystemCache 相同，get / delete 照常使用。已过期的文件在 add 时回收，
+             回收前确认文件未被其他进程替换，回收与重新创建之间仍可能与另一个回收者重叠，此时两者都取得租约
+    """
+
+    def _expired(self, filename: str) -> bool:
+        try:
+            with open(filename, 'rb') as f:
+                expires = struct.unpack('I', f.read(4))[0]
+        except FileNotFoundError:
+            return True
+        except (OSError, struct.error):
+            # 其他进程正在写入，按未过期处理
+            return False
+        return expires != 0 and expires < time()
+
+    def add(self, key: str, value, timeout: int | None = None) -> bool:
+        filename = self._get_filename(key)
+        expires = self._normalize_timeout(timeout)
+
+        for _ in range(2):
+            try:
+                fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, self._mode)
+            except FileExistsError:
+                try:
+                    inode = os.stat(filename).st_ino
+                except FileNotFoundError:
+                    continue
+                if not self._expired(filename):
+                    return False
+                # 只删除检查过的那个文件，避免删掉其他进程刚刚创建的租约
+                try:
+                    if os.stat(filename).st_ino == inode:
+                        os.remove(filename)
+                except FileNotFoundError:
+                    pass
+                continue
+
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(struct.pack('I', expires))
+                    self.serializer.dump(value, f)
+            except OSError:
+                logger.warning('failed to write cache file %s', filename, exc_info=True)
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+                return False
+
+            self._update_count(delta=1)
+            return True
+
+        return False
+
+
+class TieredCache(BaseCache):
+    """
+    @class TieredCache
+    @brief 两级缓存：进程内 LRU + 多进程共享缓存
+    @details 读取时先查本地 LRU，未命中再查共享缓存并回填本地；写入同时写两级。
+             add 只在共享缓存上执行，从而可以作为跨进程的互斥租约使用
+    """
+
+    def __init__(self, local: BaseCache, shared: BaseCache, local_timeout: int = 60, default_timeout: int = 300):
+        """
+        @brief 初始化两级缓存
+        @param local 进程内缓存
+        @param shared 共享缓存
+        @param local_timeout 从共享缓存回填到本地时使用的过期时间(秒)
+        @param default_timeout 默认过期时间(秒)
+        """
+        BaseCache.__init__(self, default_timeout=default_timeout)
+
+        self.local = local
+        self.shared = shared
+        self.local_timeout = local_timeout
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        local = LRUCache.factory(app, config, [], dict(kwargs))
+
+        backend = config.get('CACHE_SHARED', 'filesystem')
+        if backend == 'redis':
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError('CACHE_SHARED=redis requires the redis package: pip install redis') from e
+            shared = RedisCache.factory(app, config, [], dict(kwargs))
+        elif backend == 'filesystem':
+            shared = LeaseFileSystemCache.factory(app, config, [], dict(kwargs))
+        else:
+            raise ValueError(f'Unsupported shared cache backend: {backend}')
+
+        return cls(local, shared, config.get('CACHE_LOCAL_TIMEOUT', 60), *args, **kwargs)
+
+    def get(self, key: str):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        try:
+            value = self.shared.get(key)
+        except Exception:
+            logger.exception('shared cache get failed')
+            return None
+
+        if value is not None:
+            self.local.set(key, value, timeout=self.local_timeout)
+        return value
+
+    def get_many(self, *keys: str) -> list:
+        # 本地未命中的键一次性从共享缓存读取，Redis 下为一次 MGET
+        values = self.local.get_many(*keys)
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if not missing:
+            return values
+
+        try:
+            found = dict(zip(missing, self.shared.get_many(*missing)))
+        except Exception:
+            logger.exception('shared cache get_many failed')
+            return values
+
+        for key, value in found.items():
+            if value is not None:
+                self.local.set(key, value, timeout=self.local_timeout)
+        return [found.get(key) if value is None else value for key, value in zip(keys, values)]
+
+    def set(self, key: str, value, timeout: int | None = None) -> bool:
+        self.local.set(key, value, timeout=timeout)
+        try:
+            return self.shared.set(key, value, timeout=timeout)
+        except Exception:
+            logger.exception('shared cache set failed')
+            return False
+
+    def set_many(self, mapping: dict, timeout: int | None = None) -> list:
+        # Redis 下为一次 pipeline
+        self.local.set_many(mapping, timeout=timeout)
+        try:
+            return self.shared.set_many(mapping, timeout=timeout)
+        except Exception:
+            logger.exception('shared cache set_many failed')
+            return []
+
+    def add(self, key: str, value, timeout: int | None = None) -> bool:
+        try:
+            return self.shared.add(key, value, timeout=timeout)
+        except Exception:
+            logger.exception('shared cache add failed')
+            return self.local.add(key, value, timeout=timeout)
+
+    def delete(self, key: str) -> bool:
+        self.local.delete(key)
+        try:
+            return self.shared.delete(key)
+        except Exception:
+            logger.exception('shared cache delete failed')
+            return False
+
+    def has(self, key: str) -> bool:
+        if self.local.has(key):
+            return True
+        try:
+            return self.shared.has(key)
+        except Exception:
+            logger.exception('shared cache has failed')
+            return False
+
+    def clear(self) -> bool:
+        self.local.clear()
+        return self.shared.clear()
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,294 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file coalesce.py
+@brief 合并并发回源请求的缓存装饰器
+@details 缓存过期的瞬间，同一页面的并发请求会同时回源执行相同的联表查询。
+         SingleFlight 保证同一进程内同一键只有一个调用者执行计算，其余调用者等待并共享结果；
+         CoalescingCache 进一步借助共享缓存上的 add 租约，让多个 worker 之间也只回源一次。
+         缓存键带有数据版本号，数据未变化时缓存无需过期，数据变化时所有缓存同时失效。
+"""
+
+import functools
+import logging
+from hashlib import md5
+from threading import Event, Lock
+from time import monotonic, sleep
+from typing import Any, Callable, Hashable, Iterable
+
+from flask import request
+from flask_caching import Cache
+
+logger = logging.getLogger(__name__)
+
+
+class _Call(object):
+    """
+    @brief 一次正在进行的计算
+    """
+
+    def __init__(self):
+        self.event = Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(object):
+    """
+    @class SingleFlight
+    @brief 进程内的请求合并
+    @details 同一键上并发的调用只有第一个真正执行，其余调用阻塞等待并获得相同的结果或异常
+    """
+
+    def __init__(self):
+        self._calls: dict[str, _Call] = {}
+        self._lock = Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        @brief 执行或等待同一键上的计算
+        @param key 合并使用的键
+        @param fn 无参计算函数
+        @return 计算结果
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+
+class CoalescingCache(object):
+    """
+    @class CoalescingCache
+    @brief 带请求合并的缓存装饰器
+    @details 提供与 Flask-Caching 相似的 cached / memoize 装饰器，
+             未命中时通过 SingleFlight 与共享缓存租约保证同一键只回源一次。
+             timeout 为 0 表示缓存到数据版本变化为止
+    """
+
+    def __init__(self, cache: Cache, version: Callable[[], str] | None = None, version_timeout: int = 2 * 24 * 60 * 60,
+                 lock_timeout: int = 30, lock_wait: float = 5.0, observer: Callable[[str, bool], None] | None = None,
+                 encode: Callable[[Any], Any] | None = None, decode: Callable[[Any], Any] | None = None):
+        """
+        @brief 初始化
+        @param cache Flask-Caching 的 Cache 对象
+        @param version 返回当前数据版本号的函数，版本号会加入所有缓存键
+        @param version_timeout timeout 为 0 时实际使用的过期时间(秒)，让旧版本的条目最终从共享缓存中清除
+        @param lock_timeout 跨进程租约的过期时间(秒)，防止持有者崩溃后永久占用
+        @param lock_wait 未拿到租约时等待其他进程填充缓存的最长时间(秒)
+        @param observer 每次读取后以(视图或函数名, 是否命中)调用，用于统计命中率
+        @param encode 视图返回值写入缓存前的转换，例如预先压缩页面
+        @param decode 从缓存读出的视图返回值的转换，与 encode 对应
+        """
+        self.cache = cache
+        self.version = version
+        self.version_timeout = version_timeout
+        self.flight = SingleFlight()
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+        self.observer = observer
+        self.encode = encode
+        self.decode = decode
+
+    def versioned_key(self, key: str) -> str:
+        """
+        @brief 为缓存键加上当前数据版本号
+        @param key 原始缓存键
+        @return 带版本号的缓存键
+        """
+        if self.version is None:
+            return key
+        return f'{self.version()}:{key}'
+
+    def _get(self, key: str):
+        try:
+            return self.cache.get(key)
+        except Exception:
+            logger.exception('cache get failed')
+            return None
+
+    def _set(self, key: str, value, timeout: int | None):
+        try:
+            self.cache.set(key, value, timeout=timeout)
+        except Exception:
+            logger.exception('cache set failed')
+
+    def _fill(self, key: str, fn: Callable[[], Any], timeout: int | None):
+        # 可能刚由上一个领头者填充
+        value = self._get(key)
+        if value is not None:
+            return value
+
+        lock_key = f'lock:{key}'
+        try:
+            leased = self.cache.add(lock_key, 1, timeout=self.lock_timeout)
+        except Exception:
+            leased = True
+
+        if not leased:
+            # 其他进程正在回源，短暂等待其结果
+            deadline = monotonic() + self.lock_wait
+            while monotonic() < deadline:
+                sleep(0.05)
+                value = self._get(key)
+                if value is not None:
+                    return value
+
+        try:
+            value = fn()
+            if value is not None:
+                self._set(key, value, timeout)
+            return value
+        finally:
+            if leased:
+                try:
+                    self.cache.delete(lock_key)
+                except Exception:
+                    logger.exception('cache delete failed')
+
+    def _observe(self, name: str | None, hit: bool):
+        if self.observer is None or name is None:
+            return
+        try:
+            self.observer(name, hit)
+        except Exception:
+            logger.exception('cache observer failed')
+
+    def get_or_set(self, key: str, fn: Callable[[], Any], timeout: int | None = None, name: str | None = None):
+        """
+        @brief 读取缓存，未命中时合并回源
+        @param key 缓存键
+        @param fn 无参计算函数，返回 None 时不缓存
+        @param timeout 过期时间(秒)，0 或 None 表示缓存到数据版本变化为止
+        @param name 统计命中率时使用的名称
+        @return 缓存值或计算结果
+        """
+        if not timeout:
+            timeout = self.version_timeout
+
+        value = self._get(key)
+        self._observe(name, value is not None)
+        if value is not None:
+            return value
+
+        return self.flight.do(key, lambda: self._fill(key, fn, timeout))
+
+    def get_or_set_many(self, name: str, ids: Iterable[Hashable],
+                        fn: Callable[[list], dict], timeout: int | None = None) -> dict:
+        """
+        @brief 按条目批量读取缓存，未命中的条目一次性计算
+        @details 所有条目以一次 get_many 读取，未命中的 id 交给 fn 一次计算后以一次 set_many 写回。
+                 fn 结果中不存在的 id 记为 False 一并缓存，重复请求不存在的 id 不会再次回源。
+                 批量计算不经过 SingleFlight 与租约，并发的批量请求可能重复计算同一条目
+        @param name 条目所属的名称，与 id 一起组成缓存键，同时用于统计命中率
+        @param ids 条目 id 列表
+        @param fn 以未命中的 id 列表调用，返回 id -> 值
+        @param timeout 过期时间(秒)，0 或 None 表示缓存到数据版本变化为止
+        @return id -> 值，不存在的 id 不在结果中
+        """
+        if not timeout:
+            timeout = self.version_timeout
+
+        keys = {item_id: self.versioned_key(f'item:{name}:{item_id}') for item_id in ids}
+        if not keys:
+            return {}
+
+        try:
+            values = dict(zip(keys, self.cache.get_many(*keys.values())))
+        except Exception:
+            logger.exception('cache get_many failed')
+            values = dict.fromkeys(keys)
+
+        missing = [item_id for item_id, value in values.items() if value is None]
+        for item_id in keys:
+            self._observe(f'item:{name}', values[item_id] is not None)
+
+        if missing:
+            computed = fn(missing)
+            filled = {item_id: computed.get(item_id, False) for item_id in missing}
+            values.update(filled)
+            try:
+                self.cache.set_many({keys[item_id]: value for item_id, value in filled.items()}, timeout=timeout)
+            except Exception:
+                logger.exception('cache set_many failed')
+
+        return {item_id: value for item_id, value in values.items() if value is not False}
+
+    @staticmethod
+    def request_key(query_string: bool = False) -> str:
+        """
+        @brief 由当前请求生成视图缓存键
+        @param query_string 是否将查询参数纳入缓存键，参数顺序不影响结果
+        @return 缓存键
+        """
+        if not query_string:
+            return f'view:{request.path}'
+
+        args = sorted(request.args.items(multi=True))
+        return f'view:{request.path}:{md5(str(args).encode()).hexdigest()}'
+
+    def cached(self, timeout: int = 0, query_string: bool = False):
+        """
+        @brief 视图缓存装饰器
+        @param timeout 过期时间(秒)，0 表示缓存到数据版本变化为止
+        @param query_string 是否将查询参数纳入缓存键
+        """
+        def decorator(f):
+            name = f'view:{f.__name__}'
+
+            def compute(*args, **kwargs):
+                value = f(*args, **kwargs)
+                return self.encode(value) if self.encode else value
+
+            @functools.wraps(f)
+            def decorated_function(*args, **kwargs):
+                key = self.versioned_key(self.request_key(query_string))
+                value = self.get_or_set(key, lambda: compute(*args, **kwargs), timeout, name)
+                return self.decode(value) if self.decode else value
+
+            decorated_function.uncached = f
+            return decorated_function
+
+        return decorator
+
+    def memoize(self, timeout: int = 0):
+        """
+        @brief 函数结果缓存装饰器，以函数名和参数作为缓存键
+        @param timeout 过期时间(秒)，0 表示缓存到数据版本变化为止
+        """
+        def decorator(f):
+            name = f'{f.__module__}.{f.__qualname__}'
+
+            @functools.wraps(f)
+            def decorated_function(*args, **kwargs):
+                params = repr((args, sorted(kwargs.items())))
+                key = self.versioned_key(f'memo:{name}:{md5(params.encode()).hexdigest()}')
+                return self.get_or_set(key, lambda: f(*args, **kwargs), timeout, f'memo:{f.__name__}')
+
+            decorated_function.uncached = f
+            return decorated_function
+
+        return decorator
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,190 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file compress.py
+@brief 动态响应的 gzip / brotli 压缩
+@details 页面缓存命中时若仍逐次压缩，压缩就会成为命中路径上最大的开销。Compression.encode 在缓存填充时
+         把页面压缩为 CompressedPage 一并写入缓存，之后每次命中只需按 Accept-Encoding 选择已有的字节串；
+         被缓存的 JSON 视图(返回 dict / list)同样在填充时序列化并压缩；未经页面缓存的文本响应
+         (错误页、由逐条缓存拼装的 /details 等)在 after_request 中即时压缩。
+         安装 brotli 时优先使用 br，否则只使用 gzip。
+"""
+
+import gzip
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 值得压缩的响应类型
+COMPRESSIBLE = frozenset((
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson', 'image/svg+xml',
+))
+
+
+def available_encodings() -> tuple[str, ...]:
+    """
+    @brief 可用的压缩编码，按优先级排列
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    """
+    @brief 以指定编码压缩
+    @param body 原始内容
+    @param encoding 'br' 或 'gzip'
+    @param level 压缩级别，gzip 为 1~9，brotli 为 0~11
+    @return 压缩后的内容
+    """
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def negotiate(encodings) -> str | None:
+    """
+    @brief 根据当前请求的 Accept-Encoding 选择编码
+    @param encodings 候选编码，按优先级排列
+    @return 编码名；客户端不接受任何候选编码时返回 None
+    """
+    for encoding in encodings:
+        if request.accept_encodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+class CompressedPage(object):
+    """
+    @class CompressedPage
+    @brief 保存在页面缓存中的已压缩页面
+    """
+
+    __slots__ = ('body', 'encoded', 'mimetype')
+
+    def __init__(self, body: bytes, encoded: dict[str, bytes], mimetype: str = 'text/html'):
+        """
+        @brief 初始化
+        @param body 未压缩的内容，供不支持压缩的客户端使用
+        @param encoded 编码名 -> 压缩后的内容
+        @param mimetype 内容类型
+        """
+        self.body = body
+        self.encoded = encoded
+        self.mimetype = mimetype
+
+    def __getstate__(self):
+        return self.body, self.encoded, self.mimetype
+
+    def __setstate__(self, state):
+        self.body, self.encoded, self.mimetype = state
+
+    def to_response(self) -> Response:
+        """
+        @brief 按当前请求选择编码并生成响应
+        """
+        encoding = negotiate(self.encoded)
+        response = Response(self.encoded[encoding] if encoding else self.body, mimetype=self.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+class Compression(object):
+    """
+    @class Compression
+    @brief 响应压缩扩展
+    @details 用法: compression = Compression(app)，并将 compression.encode / compression.decode
+             交给页面缓存，使页面在缓存填充时只压缩一次
+    """
+
+    def __init__(self, app: Flask | None = None, min_size: int = 512,
+                 cached_levels: dict[str, int] | None = None, dynamic_levels: dict[str, int] | None = None):
+        """
+        @brief 初始化
+        @param app Flask 应用
+        @param min_size 小于该字节数的响应不压缩
+        @param cached_levels 写入缓存时的压缩级别，只执行一次，可取较高级别
+        @param dynamic_levels 即时压缩的压缩级别，每次请求都会执行，取较低级别
+        """
+        self.min_size = min_size
+        self.cached_levels = cached_levels or {'br': 9, 'gzip': 9}
+        self.dynamic_levels = dynamic_levels or {'br': 4, 'gzip': 6}
+        self.encodings = available_encodings()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.after_request(self._after_request)
+
+    def encode(self, value):
+        """
+        @brief 缓存填充时压缩视图返回的页面
+        @param value 视图返回值
+        @return 字符串页面返回 CompressedPage；dict / list 按 Flask 的 JSON 响应序列化后返回 JSON 类型的
+                CompressedPage；不足 min_size 的内容与其他返回值原样返回
+        @exception TypeError 视图返回了 Response 对象。其内容已按某个请求的 Accept-Encoding 编码，
+                   缓存后会原样发给所有请求，被缓存的视图只能返回字符串或可序列化的数据
+        """
+        if isinstance(value, Response):
+            raise TypeError('cached views must not return a Response object')
+
+        if isinstance(value, str):
+            body, mimetype = value.encode(), 'text/html'
+        elif isinstance(value, (dict, list)):
+            # 与视图直接返回 dict / list 时 Flask 生成的响应内容一致
+            response = current_app.json.response(value)
+            body, mimetype = response.get_data(), response.mimetype
+        else:
+            return value
+
+        if len(body) < self.min_size:
+            return value
+
+        return CompressedPage(body, {
+            encoding: compress(body, encoding, self.cached_levels[encoding]) for encoding in self.encodings
+        }, mimetype)
+
+    @staticmethod
+    def decode(value):
+        """
+        @brief 将缓存中的 CompressedPage 转换为响应
+        @param value 缓存值
+        @return 响应或原样返回的值
+        """
+        if isinstance(value, CompressedPage):
+            return value.to_response()
+        return value
+
+    def _after_request(self, response: Response) -> Response:
+        if (
+            response.direct_passthrough or
+            response.is_streamed or
+            response.status_code < 200 or response.status_code in (204, 206, 304) or
+            'Content-Encoding' in response.headers or
+            response.mimetype not in COMPRESSIBLE
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        encoding = negotiate(self.encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(compress(body, encoding, self.dynamic_levels[encoding]))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,94 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file fragment.py
+@brief 按条目缓存的 HTML 片段
+@details 同一部动画会出现在首页、多个动漫库分页与搜索结果中，卡片内容只取决于该动画在当前数据版本下的数据。
+         FragmentCache 以 (数据版本, 条目键) 缓存渲染好的片段，页面缓存未命中时只需渲染未缓存过的卡片，
+         其余直接拼接。数据版本变化时整体清空。
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, Iterable
+
+from markupsafe import Markup
+
+
+class FragmentCache(object):
+    """
+    @class FragmentCache
+    @brief 进程内的片段 LRU 缓存
+    @details 片段为已转义的 Markup，直接以字符串保存，读取时无需反序列化
+    """
+
+    def __init__(self, render: Callable[[Any], str], key: Callable[[Any], Hashable],
+                 version: Callable[[], str] | None = None, max_entries: int = 10000):
+        """
+        @brief 初始化
+        @param render 渲染单个条目的函数，通常为模板宏
+        @param key 条目的缓存键，例如动画 id
+        @param version 返回当前数据版本号的函数，版本变化时清空缓存
+        @param max_entries 缓存条目上限
+        """
+        self.render = render
+        self.key = key
+        self.version = version
+        self.max_entries = max_entries
+
+        self._version: str | None = None
+        self._entries: OrderedDict[tuple[str | None, Hashable], str] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self) -> str | None:
+        if self.version is None:
+            return None
+
+        version = self.version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._entries.clear()
+                    self._version = version
+        return version
+
+    def join(self, items: Iterable[Any]) -> Markup:
+        """
+        @brief 渲染并拼接多个条目
+        @details 已缓存的片段直接复用，未缓存的条目渲染后写入缓存
+        @param items 条目列表
+        @return 拼接后的 Markup
+        """
+        # 版本号也放入键中，避免切换版本的瞬间写入旧数据渲染的片段
+        version = self._check_version()
+
+        fragments = []
+        for item in items:
+            key = (version, self.key(item))
+            with self._lock:
+                fragment = self._entries.get(key)
+                if fragment is not None:
+                    self._entries.move_to_end(key)
+
+            if fragment is None:
+                fragment = str(self.render(item))
+                with self._lock:
+                    self._entries[key] = fragment
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+            fragments.append(fragment)
+
+        return Markup(''.join(fragments))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+if __name__ == '__main__':
+    pass
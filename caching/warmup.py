@@ -0,0 +1,159 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file warmup.py
+@brief 缓存预热
+@details 部署或每日评分写入后，所有缓存同时失效，最先到达的访问者会同时回源执行联表查询。
+         CacheWarmer 在 worker 启动与数据版本变化时于后台线程中以有限并发请求热点页面，
+         请求经过完整的路由栈，页面缓存、函数缓存、快照与卡片片段会一并填充。
+         热点页面由调用方枚举，另外统计最近访问最多的搜索等地址一并预热。
+"""
+
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Callable, Iterable
+
+from flask import Flask, Response, request
+
+logger = logging.getLogger(__name__)
+
+# 预热请求在 WSGI environ 中带有该标记，外部请求无法伪造，可据此跳过限流
+WARMUP_ENVIRON_KEY = 'anime.warmup'
+
+
+def is_warmup_request() -> bool:
+    """
+    @brief 当前请求是否为预热请求
+    """
+    return bool(request.environ.get(WARMUP_ENVIRON_KEY))
+
+
+class CacheWarmer(object):
+    """
+    @class CacheWarmer
+    @brief 缓存预热扩展
+    @details 用法: warmer = CacheWarmer(app, track_endpoints=('search',))，以 @warmer.url_source 注册热点地址，
+             并在数据版本变化时调用 warmer.trigger(version)
+    """
+
+    def __init__(self, app: Flask | None = None, urls: Callable[[], Iterable[str]] | None = None,
+                 workers: int = 4, track_endpoints: Iterable[str] = (), track_top: int = 20,
+                 track_limit: int = 10000):
+        """
+        @brief 初始化
+        @param app Flask 应用
+        @param urls 返回需要预热的地址的函数，在后台线程的应用上下文中调用
+        @param workers 并发请求数
+        @param track_endpoints 统计访问次数的端点，最常访问的地址一并预热
+        @param track_top 每次预热的统计地址数量
+        @param track_limit 统计的地址数上限，超出时只保留访问最多的一半
+        """
+        self.app = app
+        self.urls = urls
+        self.workers = workers
+        self.track_endpoints = frozenset(track_endpoints)
+        self.track_top = track_top
+        self.track_limit = track_limit
+
+        self._counter: Counter[str] = Counter()
+        self._lock = Lock()
+        self._running: str | None = None
+        self._pending: str | None = None
+        self._warmed: str | None = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        self.app = app
+        app.extensions['cache_warmer'] = self
+        if self.track_endpoints:
+            app.after_request(self._track)
+
+    def _track(self, response: Response) -> Response:
+        if (
+            request.endpoint in self.track_endpoints and
+            response.status_code == 200 and
+            not is_warmup_request()
+        ):
+            with self._lock:
+                self._counter[request.full_path.rstrip('?')] += 1
+                if len(self._counter) > self.track_limit:
+                    self._counter = Counter(dict(self._counter.most_common(self.track_limit // 2)))
+        return response
+
+    def url_source(self, f: Callable[[], Iterable[str]]):
+        """
+        @brief 装饰器：注册返回热点地址的函数
+        """
+        self.urls = f
+        return f
+
+    def popular(self) -> list[str]:
+        """
+        @brief 访问最多的统计地址
+        """
+        with self._lock:
+            return [url for url, _ in self._counter.most_common(self.track_top)]
+
+    def trigger(self, version: str | None = None) -> bool:
+        """
+        @brief 在后台线程中开始预热
+        @details 同一版本只预热一次；正在预热时记下新版本，当前一轮结束后再预热
+        @param version 触发预热的数据版本号
+        @return 是否开始了新的预热
+        """
+        with self._lock:
+            if version is not None and version in (self._warmed, self._running):
+                return False
+            if self._running is not None:
+                self._pending = version
+                return False
+            self._running = version or ''
+
+        Thread(target=self._run, args=(version,), name='cache-warmup', daemon=True).start()
+        return True
+
+    def _warm(self, version: str | None):
+        started = perf_counter()
+        with self.app.app_context():
+            urls = list(dict.fromkeys([*(self.urls() if self.urls else ()), *self.popular()]))
+
+        client = self.app.test_client()
+        environ = {WARMUP_ENVIRON_KEY: True}
+
+        def warm(url: str) -> bool:
+            try:
+                response = client.get(url, environ_base=environ)
+                response.close()
+                return response.status_code < 500
+            except Exception:
+                logger.exception('warmup %s failed', url)
+                return False
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            succeeded = sum(executor.map(warm, urls))
+
+        logger.info('warmed %d/%d pages for %s in %.1fs', succeeded, len(urls), version, perf_counter() - started)
+
+    def _run(self, version: str | None):
+        while True:
+            try:
+                self._warm(version)
+            except Exception:
+                logger.exception('cache warmup failed')
+
+            with self._lock:
+                self._warmed = version
+                version, self._pending = self._pending, None
+                if version is None or version == self._warmed:
+                    self._running = None
+                    return
+                self._running = version
+
+
+if __name__ == '__main__':
+    pass
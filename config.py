@@ -9,6 +9,14 @@ debug = False
 # 使用异步工作模式提高性能
 worker_class = "gevent"
 
+# 在主进程中加载应用，worker 由 fork 继承已导入的模块与已初始化的应用，增加 worker 或重启只需毫秒级
+preload_app = True
+
+if preload_app and worker_class == "gevent":
+    # 应用在打补丁之前导入时，创建的锁不会让出协程；主进程加载应用前先打补丁
+    from gevent import monkey
+    monkey.patch_all()
+
 # 访问地址
 bind = f"0.0.0.0:{SERVER_PORT}"
 
@@ -31,5 +39,29 @@ accesslog = "/app/access.txt"
 errorlog = "/app/error.txt"
 
 
+def when_ready(server):
+    # 报告主进程中应用的启动耗时
+    if preload_app:
+        from app import startup_report
+        server.log.info(startup_report(server.app.wsgi()))
+
+        if worker_class == "gevent":
+            # 加载应用时启动的短时定时器(限流存储的过期清理)在 fork 之前运行结束，worker 不继承运行中的协程
+            import gevent
+            gevent.sleep(0.1)
+
+
+def post_fork(server, worker):
+    # 连接池不能跨进程共享，子进程丢弃从主进程继承的连接
+    from app import dispose_engines
+    dispose_engines(worker.app.wsgi())
+
+
+def post_worker_init(worker):
+    # worker 启动后在后台预热热点页面
+    from app import warm_caches
+    warm_caches(worker.wsgi)
+
+
 if __name__ == '__main__':
     pass
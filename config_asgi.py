@@ -0,0 +1,37 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+# hypercorn 配置，用于异步服务: hypercorn -c config_asgi.py asgi:app
+
+from constant import SERVER_PORT
+
+# 访问地址
+bind = [f"0.0.0.0:{SERVER_PORT}"]
+
+# 工作进程数，单进程即可承载大量并发请求
+workers = 1
+
+# 使用 asyncio 事件循环
+worker_class = "asyncio"
+
+# 监听队列长度，突发连接在此排队
+backlog = 1024
+
+# 保持连接的超时时间
+keep_alive_timeout = 5
+
+# 优雅关闭的等待时间
+graceful_timeout = 30
+
+# 输出日志级别
+loglevel = 'info'
+
+# 存放日志路径
+accesslog = "/app/access.txt"
+
+# 存放日志路径
+errorlog = "/app/error.txt"
+
+
+if __name__ == '__main__':
+    pass
@@ -1,6 +1,7 @@
 # -*- coding:utf-8 -*-
 # AUTHOR: Sun
 
+import re
 from os import name, getenv
 
 def set_constant[T](env_name: str, default: T) -> T:
@@ -11,12 +12,23 @@ def set_constant[T](env_name: str, default: T) -> T:
     else:
         raise Exception('Unsupported OS')
 
+def set_optional_constant[T](env_name: str, default: T) -> T:
+    # 可选配置，未设置环境变量时在任何系统上都使用默认值
+    return getenv(env_name, default)
+
 USERNAME = set_constant('USERNAME', 'root')
 PASSWORD = set_constant('PASSWORD', '123456')
 HOST = set_constant('HOST', 'localhost')
 PORT = set_constant('PORT', '3306')
 
-DB_URI: str = f'mysql+pymysql://{USERNAME}:{PASSWORD}@{HOST}:{PORT}/anime'
+# DB_URI 可直接指定完整连接串，例如基准测试使用的本地 SQLite
+DB_URI: str = set_optional_constant('DB_URI', '') or f'mysql+pymysql://{USERNAME}:{PASSWORD}@{HOST}:{PORT}/anime'
+
+# 异步服务(asgi.py)使用的连接与连接池大小，单进程即可同时挂起数百个等待数据库的请求
+# 未单独指定时由 DB_URI 得出，MySQL 驱动替换为 aiomysql，与同步服务连接同一个数据库
+ASYNC_DB_URI: str = set_optional_constant('ASYNC_DB_URI', '') or re.sub(r'^mysql(\+\w+)?://', 'mysql+aiomysql://', DB_URI)
+ASYNC_POOL_SIZE: int = int(set_optional_constant('ASYNC_POOL_SIZE', 32))
+ASYNC_MAX_OVERFLOW: int = int(set_optional_constant('ASYNC_MAX_OVERFLOW', 64))
 
 ENABLE_INNER_PICTURE: str = set_constant('ENABLE_INNER_PICTURE', 'false')
 if ENABLE_INNER_PICTURE.lower() == 'true':
@@ -28,8 +40,24 @@ else:
 
 PICTURE_PATH: str = set_constant('PICTURE_PATH', 'picture')
 
+# 缩略图目录与热点图片的进程内缓存上限，缩略图需要安装 Pillow
+PICTURE_CACHE_DIR: str = set_optional_constant('PICTURE_CACHE_DIR', 'cache/picture')
+PICTURE_HOT_BYTES: int = int(set_optional_constant('PICTURE_HOT_BYTES', 32 * 1024 * 1024))
+
 SERVER_PORT: int = set_constant('SERVER_PORT', 80)
 
+# 缓存配置：CACHE_SHARED 为空时仅使用进程内 LRU，可选 'filesystem' / 'redis' 作为多 worker 共享的二级缓存
+CACHE_SHARED: str = set_optional_constant('CACHE_SHARED', '')
+CACHE_MAX_BYTES: int = int(set_optional_constant('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+CACHE_DIR: str = set_optional_constant('CACHE_DIR', 'cache')
+CACHE_REDIS_URL: str = set_optional_constant('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+# 预生成页面的导出目录，由 flask --app app export-static 写入
+STATIC_EXPORT_DIR: str = set_optional_constant('STATIC_EXPORT_DIR', 'export')
+
+# 请求剖析：开启时每个响应带有 Server-Timing 头，并提供 /metrics 指标；两者会暴露内部耗时，默认关闭
+ENABLE_PROFILING: bool = set_optional_constant('ENABLE_PROFILING', 'false').lower() == 'true'
+
 
 if __name__ == '__main__':
     pass
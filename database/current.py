@@ -0,0 +1,86 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file current.py
+@brief 最新评分表维护模块
+@details score 表每天为每部动画增加一行，列表查询以 Score.date == 最新日期 过滤完整的历史表，
+         联结与计数的代价随历史增长。current_score 表每部动画只有一行，指向其最新评分日期的 Score 行，
+         QueryService.base_query(current_date=...) 从该表出发按主键连接 Score，列表查询只与目录规模有关。
+         CurrentScoreService 在每天评分写入后刷新该表。
+"""
+
+import logging
+from datetime import date
+
+from sqlalchemy import insert
+
+from database.model import DB, Score, CurrentScore
+
+logger = logging.getLogger(__name__)
+
+# 每次批量写入的行数
+CHUNK_SIZE = 5000
+
+
+class CurrentScoreService(object):
+    """
+    @class CurrentScoreService
+    @brief 最新评分表服务类
+    """
+
+    @staticmethod
+    def is_built(on_date: date | None) -> bool:
+        """
+        @brief 判断最新评分表是否已刷新到指定日期
+        @param on_date 评分日期
+        @return 是否已刷新
+        """
+        if not on_date:
+            return False
+
+        return DB.session.query(
+            DB.session.query(CurrentScore.detailId).filter(CurrentScore.date == on_date).exists()
+        ).scalar()
+
+    @staticmethod
+    def refresh(on_date: date) -> int:
+        """
+        @brief 以指定日期的评分重建最新评分表
+        @details 与按 Score.date == on_date 过滤的结果一致：当天没有评分的动画不在表中。
+                 删除与写入在同一事务中完成，读取方不会看到半张表
+        @param on_date 评分日期
+        @return 写入的行数
+        """
+        CurrentScore.__table__.create(DB.engine, checkfirst=True)
+
+        rows = (
+            DB.session.query(Score.detailId, Score.id)
+            .filter(Score.date == on_date)
+            .order_by(Score.detailId, Score.id)
+            .all()
+        )
+
+        DB.session.query(CurrentScore).delete(synchronize_session=False)
+
+        # 同一天重复抓取时保留最后写入的一行
+        latest: dict[int, int] = {aid: sid for aid, sid in rows}
+
+        chunk = []
+        for aid, sid in latest.items():
+            chunk.append({'detailId': aid, 'scoreId': sid, 'date': on_date})
+            if len(chunk) >= CHUNK_SIZE:
+                DB.session.execute(insert(CurrentScore), chunk)
+                chunk = []
+
+        if chunk:
+            DB.session.execute(insert(CurrentScore), chunk)
+
+        DB.session.commit()
+        logger.info('current score refreshed for %s with %d rows', on_date, len(latest))
+
+        return len(latest)
+
+
+if __name__ == '__main__':
+    pass
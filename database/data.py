@@ -1,8 +1,79 @@
 # -*- coding:utf-8 -*-
 # AUTHOR: Sun
 
+import sys
 from dataclasses import dataclass
 from datetime import date
+from typing import Any, Iterable
+
+# 去重池的条目上限，超出后整体清空
+DETAIL_SCORE_POOL_LIMIT = 65536
+
+
+def _freeze(value):
+    # 平台评分 [score, vote] 转为元组，旧格式的 {'score': ..., 'vote': ...} 保持不变
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def _pool_key(value):
+    if isinstance(value, dict):
+        return tuple(sorted(value.items()))
+    return value
+
+
+class DetailScore(dict):
+    """
+    @class DetailScore
+    @brief 不可变的各平台评分，示例: {'Bangumi': (8.3, 13284), 'MyAnimeList': (8.73, 1464542)}
+    @details 平台名经过 sys.intern，相同内容的对象通过 of() 在进程内共享同一个实例。
+             同一部动画相邻日期的评分往往完全相同，共享实例既节省缓存内存，
+             也让 pickle 在同一载荷中只写入一次；反序列化时重新去重。
+             仍是 dict 子类，模板与 JSON 序列化无需修改。
+    """
+    __slots__ = ()
+
+    _pool: dict[tuple, 'DetailScore'] = {}
+
+    @classmethod
+    def of(cls, items: Iterable[tuple[str | None, Any]]) -> 'DetailScore':
+        """
+        @brief 创建或复用相同内容的实例
+        @param items (平台名, 评分)迭代器
+        @return DetailScore对象
+        """
+        pairs = tuple(
+            (sys.intern(name) if isinstance(name, str) else name, _freeze(value))
+            for name, value in items
+        )
+        if not pairs:
+            return EMPTY_DETAIL_SCORE
+
+        try:
+            key = tuple((name, _pool_key(value)) for name, value in pairs)
+            shared = cls._pool.get(key)
+        except TypeError:
+            # 含有无法哈希的值时不参与去重
+            return cls(pairs)
+
+        if shared is None:
+            if len(cls._pool) >= DETAIL_SCORE_POOL_LIMIT:
+                cls._pool.clear()
+            shared = cls._pool[key] = cls(pairs)
+        return shared
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('DetailScore is immutable')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return DetailScore.of, (tuple(self.items()),)
+
+
+EMPTY_DETAIL_SCORE = DetailScore()
 
 
 @dataclass
@@ -18,7 +89,7 @@ class LibraryArgs(object):
     vote: int | None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class BriefInfo(object):
     id: int  # 主键ID，自增
 
@@ -27,7 +98,7 @@ class BriefInfo(object):
 
     description: str | None  # 动画描述信息
 
-    detail_score: dict[str, dict[str, int | float]]  # 详细评分信息
+    detail_score: DetailScore  # 详细评分信息
     score: float  # 总评分
     vote: int  # 投票人数
 
@@ -35,31 +106,31 @@ class BriefInfo(object):
     picture: str  # 封面图片URL
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DetailInfo(object):
     id: int  # 主键ID，自增
 
     name: str  # 动画名称
     translation: str | None  # 动画译名
-    all: list[str] | None  # 所有名称组成的字符串数组
+    all: tuple[str, ...] | None  # 所有名称
 
     time: date | None  # 发布日期
-    tag: list[str] | None  # 标签信息，以字符串数组格式存储
+    tag: tuple[str, ...] | None  # 标签信息
     description: str | None  # 动画描述信息
 
     url: str  # 目标网站URL
     picture: str | None  # 封面图片URL
 
-    # 详细评分信息，存储各平台评分和投票人数，示例: {'Bangumi': [8.3, 13284], 'MyAnimeList': [8.73, 1464542]}
-    detail_score: dict[str, dict[str, int | float]] | None
+    # 详细评分信息，存储各平台评分和投票人数，示例: {'Bangumi': (8.3, 13284), 'MyAnimeList': (8.73, 1464542)}
+    detail_score: DetailScore
     score: float | None  # 总评分
     vote: int | None  # 投票人数
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ScoreListItem(object):
-    # 详细评分信息，存储各平台评分和投票人数，示例: {'Bangumi': [8.3, 13284], 'MyAnimeList': [8.73, 1464542]}
-    detail_score: dict[str, dict[str, int | float]] | None
+    # 详细评分信息，存储各平台评分和投票人数，示例: {'Bangumi': (8.3, 13284), 'MyAnimeList': (8.73, 1464542)}
+    detail_score: DetailScore
     score: float | None  # 总评分
     vote: int | None  # 投票人数
 
@@ -0,0 +1,136 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file detail.py
+@brief 详情页数据加载
+@details 详情页需要动画信息、最新评分与最近几天的评分走势。DetailService 用两次查询取得全部数据：
+         一次取 Detail 与 Web，一次按日期倒序取每部动画最近的评分记录，其中第一条即为最新评分。
+         load_many 对多个 id 同样只执行两次查询，评分记录通过 ROW_NUMBER 窗口函数按动画分组截取，
+         用于缓存预热与批量接口。
+"""
+
+from typing import Iterable
+
+from sqlalchemy import desc, func, select
+
+from database.model import DB, Detail, Score, Web
+from database.data import DetailInfo, ScoreListItem
+from database.service import QueryService, ScoreListService, WebIDMap
+from monitoring.profiler import measure_orm
+
+
+class DetailService(object):
+    """
+    @class DetailService
+    @brief 详情数据服务类
+    """
+
+    @staticmethod
+    def history_select(ids: list[int], delay: int):
+        """
+        @brief 每部动画最近delay+1条评分记录的语句
+        @details 与 ScoreListService.from_delay_days 相同，按条数截取后再由 trim_delay_days 按日期去除范围外的记录
+        @param ids Detail.id 列表
+        @param delay 天数
+        @return 按 (detailId, date 降序) 排列的语句，结果行带有 detailId、detailScore、score、vote、date 列
+        """
+        if len(ids) == 1:
+            # 单个 id 直接沿 idx_score_detail_date 倒序读取
+            return (
+                select(Score.detailId, Score.detailScore, Score.score, Score.vote, Score.date)
+                .where(Score.detailId == ids[0])
+                .order_by(desc(Score.date))
+                .limit(delay + 1)
+            )
+
+        ranked = (
+            select(
+                Score.detailId, Score.detailScore, Score.score, Score.vote, Score.date,
+                func.row_number().over(partition_by=Score.detailId, order_by=desc(Score.date)).label('rn'),
+            )
+            .where(Score.detailId.in_(ids))
+            .subquery()
+        )
+        return (
+            select(ranked.c.detailId, ranked.c.detailScore, ranked.c.score, ranked.c.vote, ranked.c.date)
+            .where(ranked.c.rn <= delay + 1)
+            .order_by(ranked.c.detailId, desc(ranked.c.date))
+        )
+
+    @staticmethod
+    def detail_select(ids: list[int]):
+        """
+        @brief Detail 与 Web 的语句
+        @param ids Detail.id 列表
+        @return select(Detail, Web) 语句
+        """
+        return select(Detail, Web).join(Web, Detail.web == Web.id).where(Detail.id.in_(ids))
+
+    @staticmethod
+    def assemble(details, history_rows, delay: int,
+                 web_id_map: WebIDMap) -> dict[int, tuple[DetailInfo, list[ScoreListItem]]]:
+        """
+        @brief 由两次查询的结果组装详情与评分走势
+        @details 同步与异步服务共用，异步服务以 detail_select、history_select 自行执行查询
+        @param details detail_select 的结果行
+        @param history_rows history_select 的结果行
+        @param delay 评分走势的天数
+        @param web_id_map WebIDMap对象，用于将Web ID转换为名称
+        @return Detail.id -> (DetailInfo, 按日期降序的评分列表)；没有评分的 id 不在结果中
+        """
+        histories: dict[int, list] = {}
+        for row in history_rows:
+            histories.setdefault(row.detailId, []).append(row)
+
+        result = {}
+        for detail, web in details:
+            rows = histories.get(detail.id)
+            if not rows:
+                continue
+
+            # 按日期倒序，第一条即为最新评分
+            info = QueryService.to_detail_object(detail, rows[0], web, web_id_map)
+            score_list = ScoreListService.rows_to_score_list(rows, web_id_map)
+            result[detail.id] = info, ScoreListService.trim_delay_days(score_list, delay)
+
+        return result
+
+    @staticmethod
+    @measure_orm
+    def load_many(ids: Iterable[int], delay: int,
+                  web_id_map: WebIDMap) -> dict[int, tuple[DetailInfo, list[ScoreListItem]]]:
+        """
+        @brief 批量加载详情与评分走势
+        @param ids Detail.id 列表
+        @param delay 评分走势的天数
+        @param web_id_map WebIDMap对象，用于将Web ID转换为名称
+        @return Detail.id -> (DetailInfo, 按日期降序的评分列表)；不存在或没有评分的 id 不在结果中
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+
+        details = DB.session.execute(DetailService.detail_select(ids)).all()
+        if not details:
+            return {}
+
+        history_rows = DB.session.execute(
+            DetailService.history_select([detail.id for detail, _ in details], delay)
+        ).all()
+        return DetailService.assemble(details, history_rows, delay, web_id_map)
+
+    @staticmethod
+    def load(aid: int, delay: int, web_id_map: WebIDMap) -> tuple[DetailInfo, list[ScoreListItem]] | None:
+        """
+        @brief 加载单个详情与评分走势
+        @param aid Detail.id
+        @param delay 评分走势的天数
+        @param web_id_map WebIDMap对象，用于将Web ID转换为名称
+        @return (DetailInfo, 按日期降序的评分列表)；不存在或没有评分时返回 None
+        """
+        return DetailService.load_many([aid], delay, web_id_map).get(aid)
+
+
+if __name__ == '__main__':
+    pass
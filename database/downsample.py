@@ -0,0 +1,183 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file downsample.py
+@brief 评分历史降采样模块
+@details 长时间范围的评分走势动辄上千个点，直接下发既浪费带宽也让图表难以阅读。
+         aggregate 将每日评分按周或按月聚合，lttb 使用 Largest-Triangle-Three-Buckets
+         算法在保留走势形状的前提下把点数压缩到指定数量。
+"""
+
+from datetime import date, timedelta
+
+from database.data import ScoreListItem, DetailScore
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def auto_granularity(delay: int) -> str:
+    """
+    @brief 根据时间跨度选择聚合粒度
+    @param delay 时间跨度(天)
+    @return 'day' / 'week' / 'month'
+    """
+    if delay <= 120:
+        return 'day'
+    if delay <= 730:
+        return 'week'
+    return 'month'
+
+
+def period_start(day: date, granularity: str) -> date:
+    """
+    @brief 计算日期所在周期的起始日
+    @param day 日期
+    @param granularity 聚合粒度
+    @return 周期起始日，周以周一开始
+    """
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_period_start(day: date, granularity: str) -> date:
+    """
+    @brief 计算日期所在周期的下一个周期的起始日
+    @param day 日期
+    @param granularity 聚合粒度
+    @return 下一个周期的起始日
+    """
+    start = period_start(day, granularity)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def _pair(value) -> tuple[float | None, int | None]:
+    # 平台评分可能为 [score, vote] 或 {'score': ..., 'vote': ...}
+    if isinstance(value, dict):
+        return value.get('score'), value.get('vote')
+    if isinstance(value, (list, tuple)) and value:
+        return value[0], value[1] if len(value) > 1 else None
+    return None, None
+
+
+def _mean(values: list[float]) -> float | None:
+    return round(sum(values) / len(values), 2) if values else None
+
+
+def _merge(group: list[ScoreListItem]) -> ScoreListItem:
+    """
+    @brief 合并同一周期内的评分
+    @details 评分取平均值，投票数取周期内最后一天的值，日期也取最后一天，
+             使最新的点与每日数据保持一致
+    @param group 按日期升序排列的同一周期评分
+    @return 合并后的ScoreListItem
+    """
+    last = group[-1]
+
+    platforms: dict[str, list] = {}
+    for item in group:
+        for platform, value in (item.detail_score or {}).items():
+            platforms.setdefault(platform, []).append(value)
+
+    detail_score = []
+    for platform, values in platforms.items():
+        pairs = [_pair(value) for value in values]
+        scores = [float(score) for score, _ in pairs if score is not None]
+        detail_score.append((platform, (_mean(scores), pairs[-1][1])))
+
+    return ScoreListItem(
+        detail_score=DetailScore.of(detail_score),
+        score=_mean([item.score for item in group if item.score is not None]),
+        vote=last.vote,
+        date=last.date
+    )
+
+
+def aggregate(items: list[ScoreListItem], granularity: str) -> list[ScoreListItem]:
+    """
+    @brief 按周期聚合评分
+    @param items 按日期升序排列的每日评分
+    @param granularity 聚合粒度
+    @return 按日期升序排列的聚合结果
+    """
+    if granularity == 'day':
+        return list(items)
+
+    result = []
+    group: list[ScoreListItem] = []
+    current = None
+    for item in items:
+        start = period_start(item.date, granularity)
+        if group and start != current:
+            result.append(_merge(group))
+            group = []
+        current = start
+        group.append(item)
+
+    if group:
+        result.append(_merge(group))
+
+    return result
+
+
+def lttb(items: list[ScoreListItem], threshold: int) -> list[ScoreListItem]:
+    """
+    @brief Largest-Triangle-Three-Buckets 降采样
+    @details 以日期为横轴、总评分为纵轴，首尾两点固定保留，中间每个桶选取
+             与前一选中点及下一桶均值构成三角形面积最大的点。
+             无需降采样时(threshold 小于 3 或点数不超过 threshold)原样返回，总评分为 None 的行保留为图表中的缺口；
+             需要降采样时只在有总评分的行中选点，None 行无法计算面积，不出现在结果中
+    @param items 按日期升序排列的评分
+    @param threshold 目标点数，不小于 3 时生效
+    @return 降采样后的评分列表
+    """
+    if threshold < 3 or len(items) <= threshold:
+        return list(items)
+
+    points = [item for item in items if item.score is not None]
+    if len(points) <= threshold:
+        return points
+
+    xs = [item.date.toordinal() for item in points]
+    ys = [item.score for item in points]
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # 下一桶的平均点，最后一个桶使用末尾点
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, len(points))
+        if next_start >= next_end:
+            avg_x, avg_y = xs[-1], ys[-1]
+        else:
+            count = next_end - next_start
+            avg_x = sum(xs[next_start:next_end]) / count
+            avg_y = sum(ys[next_start:next_end]) / count
+
+        best, best_area = start, -1.0
+        for j in range(start, min(end, len(points) - 1)):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,121 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file export.py
+@brief 目录与评分历史的批量导出
+@details 下游分析任务需要全部数据时，逐页抓取动漫库意味着成千上万次计数与 OFFSET 查询。
+         ExportService 以服务端游标(stream_results)按索引顺序顺序扫描，每次只取 yield_per 行，
+         逐行产出普通字典，内存占用与数据量无关。最新评分日期与平台映射由应用传入，
+         与页面共用数据版本中的最新日期和已缓存的 WebIDMap，导出时不再单独查询。
+"""
+
+from datetime import date
+from typing import Callable, Iterator
+
+from flask import Flask
+from sqlalchemy import select
+
+from database.model import DB, Detail, Score, Web
+from database.service import WebIDMap
+
+# 每次从服务端游标读取的行数
+YIELD_PER = 1000
+
+# 目录导出的列，CSV 表头按此顺序输出
+CATALOG_FIELDS: tuple[str, ...] = (
+    'id', 'name', 'translation', 'year', 'season', 'time', 'tag', 'web', 'webId',
+    'score', 'vote', 'detailScore', 'date',
+)
+
+# 评分历史导出的列
+SCORE_FIELDS: tuple[str, ...] = ('detailId', 'date', 'score', 'vote', 'detailScore')
+
+
+class ExportService(object):
+    """
+    @class ExportService
+    @brief 批量导出服务类
+    @details 用法: export_service = ExportService(latest_date=..., web_id_map=...)，init_app 后
+             导出接口通过 app.extensions['export_service'] 取得
+    """
+
+    def __init__(self, app: Flask | None = None, latest_date: Callable[[], date | None] | None = None,
+                 web_id_map: Callable[[], WebIDMap] | None = None):
+        """
+        @brief 初始化
+        @param app Flask 应用
+        @param latest_date 返回最新评分日期的函数
+        @param web_id_map 返回 WebIDMap 的函数
+        """
+        self.latest_date = latest_date
+        self.web_id_map = web_id_map
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.extensions['export_service'] = self
+
+    @staticmethod
+    def _stream(statement):
+        # 服务端游标，PyMySQL 下使用 SSCursor 逐批读取
+        return DB.session.execute(statement.execution_options(stream_results=True, yield_per=YIELD_PER))
+
+    @staticmethod
+    def _detail_score(value, web_id_map: WebIDMap) -> dict:
+        return {web_id_map.get_name_by_id(key): score for key, score in (value or {}).items()}
+
+    @staticmethod
+    def catalog_rows(on_date: date, web_id_map: WebIDMap) -> Iterator[dict]:
+        """
+        @brief 某一评分日的全部动画及其评分
+        @details 按 Detail.id 顺序扫描，每部动画一行
+        @param on_date 评分日期
+        @param web_id_map WebIDMap对象，用于将平台 ID 转换为名称
+        @return 行字典的迭代器，键为 CATALOG_FIELDS
+        """
+        statement = (
+            select(
+                Detail.id, Detail.name, Detail.translation, Detail.year, Detail.season, Detail.time,
+                Detail.tag, Web.name.label('web'), Detail.webId,
+                Score.score, Score.vote, Score.detailScore, Score.date,
+            )
+            .join(Score, Detail.id == Score.detailId)
+            .join(Web, Detail.web == Web.id)
+            .where(Score.date == on_date)
+            .order_by(Detail.id)
+        )
+
+        for row in ExportService._stream(statement):
+            item = row._asdict()
+            item['score'] = float(row.score) if row.score is not None else None
+            item['detailScore'] = ExportService._detail_score(row.detailScore, web_id_map)
+            yield item
+
+    @staticmethod
+    def score_rows(web_id_map: WebIDMap, aid: int | None = None, since: date | None = None) -> Iterator[dict]:
+        """
+        @brief 评分历史
+        @details 按 (detailId, date) 顺序沿 idx_score_detail_date 扫描。只导出 score 表中的每日记录，
+                 score-partitions 删除旧分区后，保留期之前的历史只存在于周、月汇总中，不在导出范围内
+        @param web_id_map WebIDMap对象，用于将平台 ID 转换为名称
+        @param aid 只导出该动画，为 None 时导出全部
+        @param since 只导出该日期及之后的记录
+        @return 行字典的迭代器，键为 SCORE_FIELDS
+        """
+        statement = select(Score.detailId, Score.date, Score.score, Score.vote, Score.detailScore)
+        if aid is not None:
+            statement = statement.where(Score.detailId == aid)
+        if since is not None:
+            statement = statement.where(Score.date >= since)
+        statement = statement.order_by(Score.detailId, Score.date)
+
+        for row in ExportService._stream(statement):
+            item = row._asdict()
+            item['score'] = float(row.score) if row.score is not None else None
+            item['detailScore'] = ExportService._detail_score(row.detailScore, web_id_map)
+            yield item
+
+
+if __name__ == '__main__':
+    pass
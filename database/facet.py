@@ -0,0 +1,117 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file facet.py
+@brief 动漫库筛选项的分面计数
+@details 动漫库的每个(年份, 季度, 最低投票数)组合都需要一次 COUNT 才能得出分页总数，
+         用户选择筛选项时也无从得知各选项下有多少动画。FacetCounts 在每个最新评分日期只执行一次
+         GROUP BY，得出每个(年份, 季度, 投票数分档)的动画数量并常驻内存；最低投票数为分档下界时，
+         任意组合的总数都由这些计数相加得出，无需查询数据库。
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+
+from sqlalchemy import case, func
+
+from database.model import Detail, Score
+from database.service import QueryService
+from database.ranking import VOTE_BUCKETS
+from monitoring.profiler import measure_orm
+
+SEASONS: tuple[str, ...] = ('spring', 'summer', 'autumn', 'winter')
+
+
+@dataclass(slots=True, frozen=True)
+class FacetView(object):
+    # 在其余筛选条件不变时，选择各选项后的结果数量；键为 None 表示“全部”
+    years: dict[int | None, int] = field(default_factory=dict)
+    seasons: dict[str | None, int] = field(default_factory=dict)
+    votes: dict[int, int] = field(default_factory=dict)  # 投票数分档下界 -> 数量
+
+
+class FacetCounts(object):
+    """
+    @class FacetCounts
+    @brief 最新评分日的分面计数
+    @details 与 QueryService.apply_filters 语义一致：年份、季度为空表示不限，
+             投票数为空的评分归入第 0 档，只在不限投票数时计入
+    """
+
+    def __init__(self, on_date: date, rows):
+        """
+        @brief 由分组计数构建
+        @param on_date 对应的评分日期
+        @param rows (year, season, 投票数分档, 数量)迭代器
+        """
+        self.date = on_date
+        self.counts: dict[tuple[int | None, str | None, int], int] = {}
+        for year, season, bucket, count in rows:
+            key = (int(year) if year else None, season, int(bucket))
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def count(self, year: int | None = None, season: str | None = None, min_vote: int | None = None) -> int | None:
+        """
+        @brief 筛选条件下的动画数量
+        @param year 年份过滤条件
+        @param season 季度过滤条件
+        @param min_vote 最小投票数过滤条件
+        @return 数量；min_vote 不是分档下界时无法由分档得出，返回 None
+        """
+        if min_vote and min_vote not in VOTE_BUCKETS:
+            return None
+
+        bucket = VOTE_BUCKETS.index(min_vote) if min_vote else 0
+        return sum(
+            count for (y, s, b), count in self.counts.items()
+            if (not year or y == year) and (not season or s == season) and b >= bucket
+        )
+
+    def view(self, year: int | None = None, season: str | None = None, min_vote: int | None = None) -> FacetView:
+        """
+        @brief 当前筛选条件下各筛选项的数量，供动漫库页面展示
+        @details 最低投票数不是分档下界时，只给出各投票数分档的数量；没有动画的年份不在结果中
+        @param year 当前年份
+        @param season 当前季度
+        @param min_vote 当前最小投票数
+        @return FacetView对象
+        """
+        votes = {low: self.count(year, season, low) for low in VOTE_BUCKETS}
+        if self.count(year, season, min_vote) is None:
+            return FacetView(votes=votes)
+
+        return FacetView(
+            years={y: self.count(y, season, min_vote) for y in (None, *sorted({y for y, _, _ in self.counts if y}))},
+            seasons={s: self.count(year, s, min_vote) for s in (None, *SEASONS)},
+            votes=votes,
+        )
+
+    @classmethod
+    @measure_orm
+    def load(cls, on_date: date) -> 'FacetCounts':
+        """
+        @brief 以一次分组查询计算指定日期的分面计数
+        @param on_date 评分日期
+        @return FacetCounts对象
+        """
+        bucket = case(
+            *[(Score.vote >= low, index) for index, low in reversed(list(enumerate(VOTE_BUCKETS))) if low],
+            else_=0,
+        )
+
+        query = QueryService.base_query()
+        query = QueryService.apply_filters(query, on_date=on_date)
+        query = (
+            query.with_entities(Detail.year, Detail.season, bucket, func.count())
+            .group_by(Detail.year, Detail.season, bucket)
+        )
+
+        return cls(on_date, query.all())
+
+
+if __name__ == '__main__':
+    pass
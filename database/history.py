@@ -0,0 +1,262 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file history.py
+@brief 评分历史的分区与汇总存储
+@details score 表为每部动画每天保存一行完整的评分快照，是数据库中最大的表。
+         HistoryService 负责两件事：
+         - 将 score 表按月进行 RANGE 分区(仅 MySQL)，按日期的查询只扫描相关分区，过期的月份可以整区删除；
+         - 将已经结束的周、月汇总写入 score_rollup 表，长时间范围的评分走势直接读取汇总，
+           汇总与 downsample.aggregate 的结果一致。
+         两者都由命令行在每日评分写入后执行。
+         删除旧分区后，早于保留期的历史只存在于汇总中：按周、按月的评分走势不受影响，
+         直接读取每日记录的功能(日粒度的评分走势、/export/scores 导出)只能返回保留期内的数据。
+"""
+
+import logging
+from datetime import date
+
+from sqlalchemy import func, insert, text
+
+from database.model import DB, Score, ScoreRollup
+from database.data import DetailScore, ScoreListItem
+from database.downsample import aggregate, period_start, next_period_start
+
+logger = logging.getLogger(__name__)
+
+# 汇总的粒度
+ROLLUP_GRANULARITIES = ('week', 'month')
+
+# 每次批量写入的行数
+CHUNK_SIZE = 5000
+
+
+def partition_name(month: date) -> str:
+    """
+    @brief 保存该月评分的分区名
+    @param month 月份中的任意一天
+    @return 形如 'p202505' 的分区名
+    """
+    return f'p{month.year:04d}{month.month:02d}'
+
+
+def partition_month(name: str) -> date | None:
+    """
+    @brief 由分区名解析月份
+    @param name 分区名
+    @return 月份的第一天，pmax 等非月份分区返回 None
+    """
+    try:
+        return date(int(name[1:5]), int(name[5:7]), 1)
+    except (ValueError, IndexError):
+        return None
+
+
+class HistoryService(object):
+    """
+    @class HistoryService
+    @brief 评分历史存储服务类
+    """
+
+    @staticmethod
+    def compacted_until(granularity: str) -> date | None:
+        """
+        @brief 汇总已覆盖到的日期
+        @param granularity 汇总粒度
+        @return 最后一个已汇总周期之后的第一天，尚未汇总时返回 None
+        """
+        try:
+            period = (
+                DB.session.query(func.max(ScoreRollup.period))
+                .filter(ScoreRollup.granularity == granularity)
+                .scalar()
+            )
+        except Exception:
+            # 汇总表尚未创建
+            DB.session.rollback()
+            return None
+
+        return next_period_start(period, granularity) if period else None
+
+    @staticmethod
+    def rollup_period(start: date, granularity: str) -> int:
+        """
+        @brief 汇总一个周期内全部动画的评分
+        @details 重复执行时先删除该周期已有的汇总
+        @param start 周期起始日
+        @param granularity 汇总粒度
+        @return 写入的行数
+        """
+        end = next_period_start(start, granularity)
+        rows = (
+            DB.session.query(Score.detailId, Score.detailScore, Score.score, Score.vote, Score.date)
+            .filter(Score.date >= start, Score.date < end)
+            .order_by(Score.detailId, Score.date)
+            .all()
+        )
+
+        DB.session.query(ScoreRollup).filter(
+            ScoreRollup.granularity == granularity, ScoreRollup.period == start
+        ).delete(synchronize_session=False)
+
+        groups: dict[int, list[ScoreListItem]] = {}
+        for row in rows:
+            # 保留平台 ID 作为键，读取时再由 WebIDMap 转换为名称
+            groups.setdefault(row.detailId, []).append(ScoreListItem(
+                detail_score=DetailScore.of((row.detailScore or {}).items()),
+                score=float(row.score) if row.score else None,
+                vote=row.vote,
+                date=row.date
+            ))
+
+        chunk = []
+        for aid, items in groups.items():
+            merged = aggregate(items, granularity)[0]
+            chunk.append({
+                'detailId': aid,
+                'granularity': granularity,
+                'period': start,
+                'detailScore': dict(merged.detail_score),
+                'score': merged.score,
+                'vote': merged.vote,
+                'date': merged.date,
+                'days': len(items),
+            })
+            if len(chunk) >= CHUNK_SIZE:
+                DB.session.execute(insert(ScoreRollup), chunk)
+                chunk = []
+
+        if chunk:
+            DB.session.execute(insert(ScoreRollup), chunk)
+
+        DB.session.commit()
+        return len(groups)
+
+    @staticmethod
+    def compact(granularity: str, until: date, rebuild: bool = False) -> tuple[int, int]:
+        """
+        @brief 汇总 until 所在周期之前全部已结束的周期
+        @details 从上次汇总到的周期继续，每个周期单独提交，中断后可以重复执行。
+                 重新汇总时只删除起始日不早于 score 表最早日期的周期：更早周期的每日评分可能已随分区删除，
+                 重新汇总会丢失这部分历史，因此保留原有汇总
+        @param granularity 汇总粒度
+        @param until 最新评分日期，其所在的周期尚未结束，不汇总
+        @param rebuild 是否删除已有汇总并从现存最早的评分重新汇总
+        @return tuple(汇总的周期数, 写入的行数)
+        """
+        ScoreRollup.__table__.create(DB.engine, checkfirst=True)
+
+        first = DB.session.query(func.min(Score.date)).scalar()
+        if first is None:
+            return 0, 0
+
+        if rebuild:
+            query = DB.session.query(ScoreRollup).filter(ScoreRollup.granularity == granularity)
+            kept = query.filter(ScoreRollup.period < first).count()
+            if kept:
+                logger.warning('%s rollup: keeping %d rows before %s, daily scores may have been dropped',
+                               granularity, kept, first)
+            query.filter(ScoreRollup.period >= first).delete(synchronize_session=False)
+            DB.session.commit()
+
+        start = HistoryService.compacted_until(granularity) or period_start(first, granularity)
+
+        cutoff = period_start(until, granularity)
+
+        periods = rows = 0
+        while start < cutoff:
+            count = HistoryService.rollup_period(start, granularity)
+            logger.info('%s rollup for %s: %d rows', granularity, start, count)
+            periods += 1
+            rows += count
+            start = next_period_start(start, granularity)
+
+        return periods, rows
+
+    @staticmethod
+    def partition_statements(months_ahead: int = 3, drop_before: date | None = None) -> list[str]:
+        """
+        @brief 生成 score 表按月分区的 DDL
+        @details 尚未分区时，主键改为 (id, date) 后按 RANGE COLUMNS(date) 分区；已分区时从 pmax 中拆出
+                 未来 months_ahead 个月的分区。drop_before 给出时，删除该日期之前、且周与月汇总都已覆盖的整月分区。
+                 仅支持 MySQL，其他数据库返回空列表
+        @param months_ahead 提前创建的月份数
+        @param drop_before 删除早于该日期的分区
+        @return DDL 语句列表，按顺序执行
+        """
+        if DB.engine.dialect.name != 'mysql':
+            return []
+
+        existing = [
+            name for (name,) in DB.session.execute(text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'score' AND PARTITION_NAME IS NOT NULL "
+                "ORDER BY PARTITION_ORDINAL_POSITION"
+            ))
+        ]
+        months = sorted(month for month in map(partition_month, existing) if month)
+
+        latest = DB.session.query(func.max(Score.date)).scalar() or date.today()
+        last = period_start(latest, 'month')
+        for _ in range(months_ahead):
+            last = next_period_start(last, 'month')
+
+        def partitions(first: date) -> list[str]:
+            # 每个分区保存一个月，上界为下个月的第一天
+            result = []
+            month = first
+            while month <= last:
+                upper = next_period_start(month, 'month')
+                result.append(f"PARTITION {partition_name(month)} VALUES LESS THAN ('{upper.isoformat()}')")
+                month = upper
+            return result
+
+        statements = []
+        if not existing:
+            first = DB.session.query(func.min(Score.date)).scalar() or latest
+            # 分区键必须包含在每个唯一索引中
+            statements.append('ALTER TABLE score MODIFY date DATE NOT NULL, DROP PRIMARY KEY, ADD PRIMARY KEY (id, date)')
+            statements.append(
+                'ALTER TABLE score PARTITION BY RANGE COLUMNS(date) ('
+                + ', '.join(partitions(period_start(first, 'month')) + ['PARTITION pmax VALUES LESS THAN (MAXVALUE)'])
+                + ')'
+            )
+            return statements
+
+        first = next_period_start(months[-1], 'month') if months else period_start(latest, 'month')
+        added = partitions(first)
+        if added:
+            statements.append(
+                'ALTER TABLE score REORGANIZE PARTITION pmax INTO ('
+                + ', '.join(added + ['PARTITION pmax VALUES LESS THAN (MAXVALUE)'])
+                + ')'
+            )
+
+        if drop_before:
+            covered = [HistoryService.compacted_until(granularity) for granularity in ROLLUP_GRANULARITIES]
+            if all(covered):
+                limit = min(drop_before, *covered)
+                dropped = [
+                    partition_name(month) for month in months
+                    if next_period_start(month, 'month') <= limit
+                ]
+                if dropped:
+                    statements.append(f'ALTER TABLE score DROP PARTITION {", ".join(dropped)}')
+
+        return statements
+
+    @staticmethod
+    def execute(statements: list[str]):
+        """
+        @brief 依次执行 partition_statements 生成的 DDL
+        @param statements DDL 语句列表
+        """
+        for statement in statements:
+            logger.info('executing %s', statement)
+            DB.session.execute(text(statement))
+        DB.session.commit()
+
+
+if __name__ == '__main__':
+    pass
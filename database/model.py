@@ -55,6 +55,59 @@ class Score(DB.Model):
     )
 
 
+class ScoreRollup(DB.Model):
+    __tablename__ = 'score_rollup'
+
+    id = DB.Column(DB.Integer, primary_key=True, autoincrement=True)  # 主键ID，自增
+    detailId = DB.Column(DB.Integer, nullable=False)  # 关联的Detail表ID
+
+    granularity = DB.Column(DB.Enum('week', 'month'), nullable=False)  # 聚合粒度
+    period = DB.Column(DB.Date, nullable=False)  # 周期起始日，周以周一开始
+
+    detailScore = DB.Column(DB.JSON)  # 各平台评分的平均值与周期内最后一天的投票数
+    score = DB.Column(DB.DECIMAL(4, 2))  # 周期内总评分的平均值
+    vote = DB.Column(DB.Integer)  # 周期内最后一天的投票人数
+
+    date = DB.Column(DB.Date, nullable=False)  # 周期内最后一个评分日期
+    days = DB.Column(DB.SmallInteger, nullable=False)  # 周期内的评分天数
+
+    __table_args__ = (
+        DB.Index('idx_rollup_detail_period', 'detailId', 'granularity', 'period'),
+        DB.Index('idx_rollup_period', 'granularity', 'period'),
+    )
+
+
+class Ranking(DB.Model):
+    __tablename__ = 'ranking'
+
+    id = DB.Column(DB.Integer, primary_key=True, autoincrement=True)  # 主键ID，自增
+
+    date = DB.Column(DB.Date, nullable=False)  # 评分日期
+    rank = DB.Column(DB.Integer, nullable=False)  # 当日排名，按评分、投票数倒序，从1开始
+    detailId = DB.Column(DB.Integer, nullable=False)  # 关联的Detail表ID
+    scoreId = DB.Column(DB.Integer, nullable=False)  # 当日排名所用的Score表ID，同一天重复抓取时为ID最大的一行
+
+    year = DB.Column(YEAR)  # 发布年份，冗余自Detail表
+    season = DB.Column(DB.Enum('spring', 'summer', 'autumn', 'winter'))  # 发布季节，冗余自Detail表
+    vote = DB.Column(DB.Integer)  # 投票人数，冗余自Score表
+    voteBucket = DB.Column(TINYINT)  # 投票数分档，用于按档计数
+
+    # 排名放在等值条件之后，按排名读取时无需排序
+    __table_args__ = (
+        DB.Index('idx_ranking_date_rank', 'date', 'rank', 'vote'),
+        DB.Index('idx_ranking_year_season', 'date', 'year', 'season', 'rank'),
+        DB.Index('idx_ranking_season', 'date', 'season', 'rank'),
+    )
+
+
+class CurrentScore(DB.Model):
+    __tablename__ = 'current_score'
+
+    detailId = DB.Column(DB.Integer, primary_key=True, autoincrement=False)  # 关联的Detail表ID，每部动画一行
+    scoreId = DB.Column(DB.Integer, nullable=False)  # 该动画最新评分日期的Score表ID
+    date = DB.Column(DB.Date, nullable=False)  # 刷新时的最新评分日期
+
+
 class Web(DB.Model):
     __tablename__ = 'web'
 
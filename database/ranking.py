@@ -0,0 +1,146 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file ranking.py
+@brief 每日排名物化模块
+@details idx_score_rank (score, vote) 不包含 date，列表查询只能先按 idx_score_date 过滤再 filesort。
+         RankingService 在每天评分写入后将当天的排名一次性写入 ranking 表，
+         QueryService 按 (date, ..., rank) 索引顺序读取前 N 名或任意区间，请求时无需排序。
+"""
+
+import logging
+from bisect import bisect_right
+from datetime import date
+
+from sqlalchemy import insert, inspect
+
+from database.model import DB, Detail, Score, Ranking
+from database.service import QueryService
+
+logger = logging.getLogger(__name__)
+
+# 投票数分档的下界
+VOTE_BUCKETS: tuple[int, ...] = (0, 100, 500, 1000, 5000, 10000, 50000)
+
+# 每次批量写入的行数
+CHUNK_SIZE = 5000
+
+
+def vote_bucket(vote: int | None) -> int:
+    """
+    @brief 计算投票数所在分档
+    @param vote 投票数
+    @return 分档序号，从0开始
+    """
+    return max(bisect_right(VOTE_BUCKETS, vote or 0) - 1, 0)
+
+
+class RankingService(object):
+    """
+    @class RankingService
+    @brief 排名物化服务类
+    @details 负责生成、查询与清理 ranking 表中的每日排名
+    """
+
+    @staticmethod
+    def is_built(on_date: date | None) -> bool:
+        """
+        @brief 判断指定日期的排名是否已生成
+        @param on_date 评分日期
+        @return 是否已生成
+        """
+        if not on_date:
+            return False
+
+        return DB.session.query(
+            DB.session.query(Ranking.id).filter(Ranking.date == on_date).exists()
+        ).scalar()
+
+    @staticmethod
+    def _ensure_table():
+        """
+        @brief 创建ranking表
+        @details ranking表为派生数据，缺少scoreId列的旧表直接删除重建，随后由materialize重新写入
+        """
+        inspector = inspect(DB.engine)
+        if inspector.has_table(Ranking.__tablename__):
+            columns = {column['name'] for column in inspector.get_columns(Ranking.__tablename__)}
+            if 'scoreId' in columns:
+                return
+            logger.warning('ranking table has no scoreId column, recreating it')
+            Ranking.__table__.drop(DB.engine)
+
+        Ranking.__table__.create(DB.engine)
+
+    @staticmethod
+    def materialize(on_date: date, keep_days: int = 2) -> int:
+        """
+        @brief 生成指定日期的排名
+        @details 排名顺序与QueryService.order_by_score_desc一致；同一天重复抓取时与CurrentScoreService.refresh
+                 一样保留ID最大的Score行，并记录其ID供ranked_query按主键连接。重复执行会先删除当天已有的排名，
+                 并只保留最近keep_days个日期的排名
+        @param on_date 评分日期
+        @param keep_days 保留的日期数量
+        @return 写入的行数
+        """
+        RankingService._ensure_table()
+
+        query = QueryService.base_query()
+        query = QueryService.apply_filters(query, on_date=on_date)
+        query = QueryService.order_by_score_desc(query)
+        query = query.with_entities(Detail.id, Detail.year, Detail.season, Score.vote, Score.id)
+
+        DB.session.query(Ranking).filter(Ranking.date == on_date).delete(synchronize_session=False)
+
+        # 先取出全部行再写入，避免在同一连接上边读边写
+        rows = query.all()
+
+        # 同一天重复抓取时保留最后写入的一行
+        latest: dict[int, int] = {}
+        for aid, _, _, _, sid in rows:
+            if sid > latest.get(aid, 0):
+                latest[aid] = sid
+
+        count = 0
+        chunk = []
+        for aid, year, season, vote, sid in rows:
+            if sid != latest[aid]:
+                continue
+            count += 1
+            chunk.append({
+                'date': on_date,
+                'rank': count,
+                'detailId': aid,
+                'scoreId': sid,
+                'year': year,
+                'season': season,
+                'vote': vote or 0,
+                'voteBucket': vote_bucket(vote),
+            })
+            if len(chunk) >= CHUNK_SIZE:
+                DB.session.execute(insert(Ranking), chunk)
+                chunk = []
+
+        if chunk:
+            DB.session.execute(insert(Ranking), chunk)
+
+        # 清理过期的排名
+        kept = (
+            DB.session.query(Ranking.date)
+            .distinct()
+            .order_by(Ranking.date.desc())
+            .limit(keep_days)
+            .all()
+        )
+        if len(kept) >= keep_days:
+            DB.session.query(Ranking).filter(Ranking.date < kept[-1].date).delete(synchronize_session=False)
+
+        DB.session.commit()
+        logger.info('ranking materialized for %s with %d rows', on_date, count)
+
+        return count
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,313 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file search_index.py
+@brief 搜索索引模块，基于字符二元/三元组的倒排索引
+@details `NameMap.name LIKE '%kw%'` 无法利用索引，每次搜索都需要扫描整张 name_map 表。
+         NGramIndex 预先从 NameMap 与 Detail.all 中构建字符 bigram/trigram 倒排表，
+         查询时对倒排列表求交集，再用子串匹配校验候选，结果与 LIKE 语义保持一致。
+         增量刷新只按自增 ID 读取新增的行，已有 Detail.all 的修改以及 NameMap 行的修改、删除
+         不会被发现，直到下一次全量重建(进程重启)为止。
+"""
+
+import logging
+import unicodedata
+from array import array
+from bisect import bisect_left
+from datetime import date
+from threading import Lock, Thread
+from time import monotonic
+from typing import Iterable
+
+from flask import Flask
+
+from database.model import DB, Detail, NameMap
+
+logger = logging.getLogger(__name__)
+
+# 名称之间的分隔符，关键字中不会出现该字符
+SEPARATOR = '\x00'
+
+# 增量表超过该数量时合并进主表
+MERGE_THRESHOLD = 50000
+
+# 构建失败后，同一日期再次重试的间隔(秒)
+RETRY_INTERVAL = 30
+
+
+def normalize(text: str) -> str:
+    """
+    @brief 归一化文本，全角转半角并忽略大小写，近似 MySQL 默认排序规则下的 LIKE 行为
+    @param text 原始文本
+    @return 归一化后的文本
+    """
+    return unicodedata.normalize('NFKC', text).casefold()
+
+
+def ngrams(text: str) -> set[str]:
+    """
+    @brief 生成文本的全部 bigram 与 trigram
+    @param text 归一化后的文本
+    @return gram集合
+    """
+    grams = set()
+    for n in (2, 3):
+        for i in range(len(text) - n + 1):
+            grams.add(text[i:i + n])
+    return grams
+
+
+def query_grams(keyword: str) -> set[str]:
+    """
+    @brief 生成查询使用的 gram，长度不小于 3 时只使用选择性更好的 trigram
+    @param keyword 归一化后的关键字
+    @return gram集合
+    """
+    n = 3 if len(keyword) >= 3 else 2
+    return {keyword[i:i + n] for i in range(len(keyword) - n + 1)}
+
+
+def _contains(posting: array, value: int) -> bool:
+    i = bisect_left(posting, value)
+    return i < len(posting) and posting[i] == value
+
+
+class NGramIndex(object):
+    """
+    @class NGramIndex
+    @brief 名称 n-gram 倒排索引
+    @details 主表的倒排列表为有序 array，增量刷新写入的条目暂存在 set 中，
+             条目较多时再合并进主表。主表、增量表与名称表作为一个元组整体替换，
+             查询线程读取一次后即得到一致的视图，刷新时不修改正在被读取的容器
+    """
+
+    def __init__(self, retry_interval: float = RETRY_INTERVAL):
+        """
+        @brief 初始化
+        @param retry_interval 构建失败后再次重试的间隔(秒)
+        """
+        self.date: date | None = None
+        self.retry_interval = retry_interval
+
+        # (主表, 增量表, 名称表)，名称表为 Detail.id -> 以分隔符连接的归一化名称，用于校验候选
+        self._state: tuple[dict[str, array], dict[str, set[int]], dict[int, str]] = ({}, {}, {})
+        self._delta_size = 0
+
+        self._last_name_id = 0
+        self._last_detail_id = 0
+        # 最近一次构建失败的(日期, 时间)
+        self._failed: tuple[date | None, float] | None = None
+        self._lock = Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.date is not None
+
+    @staticmethod
+    def _add(aid: int, name: str | None, target: dict[str, set[int]], names: dict[int, str]) -> int:
+        """
+        @brief 将一个名称加入索引
+        @param aid Detail.id
+        @param name 名称
+        @param target 写入的倒排表
+        @param names 写入的名称表
+        @return 新增的倒排条目数
+        """
+        if not name:
+            return 0
+
+        name = normalize(name).replace(SEPARATOR, '')
+        joined = names.get(aid, '')
+        if name in joined.split(SEPARATOR):
+            return 0
+        names[aid] = f'{joined}{SEPARATOR}{name}' if joined else name
+
+        added = 0
+        for gram in ngrams(name):
+            posting = target.setdefault(gram, set())
+            if aid not in posting:
+                posting.add(aid)
+                added += 1
+        return added
+
+    @staticmethod
+    def _load(target: dict[str, set[int]], names: dict[int, str], last_name_id: int, last_detail_id: int):
+        """
+        @brief 读取水位之后新增的 NameMap 与 Detail 行
+        @param target 写入的倒排表
+        @param names 写入的名称表
+        @param last_name_id 已索引的最大 NameMap.id
+        @param last_detail_id 已索引的最大 Detail.id
+        @return tuple(新增条目数, 新的 NameMap 水位, 新的 Detail 水位)
+        """
+        added = 0
+
+        rows = (
+            DB.session.query(NameMap.id, NameMap.name, NameMap.detailId)
+            .filter(NameMap.id > last_name_id)
+            .order_by(NameMap.id)
+        )
+        for nid, name, aid in rows.yield_per(5000):
+            added += NGramIndex._add(aid, name, target, names)
+            last_name_id = nid
+
+        rows = (
+            DB.session.query(Detail.id, Detail.all)
+            .filter(Detail.id > last_detail_id)
+            .order_by(Detail.id)
+        )
+        for aid, all_names in rows.yield_per(5000):
+            for name in all_names or ():
+                if isinstance(name, str):
+                    added += NGramIndex._add(aid, name, target, names)
+            last_detail_id = aid
+
+        return added, last_name_id, last_detail_id
+
+    @staticmethod
+    def _freeze(postings: dict[str, Iterable[int]]) -> dict[str, array]:
+        return {gram: array('q', sorted(aids)) for gram, aids in postings.items()}
+
+    def rebuild(self, on_date: date | None = None):
+        """
+        @brief 全量重建索引
+        @details 在新的容器中构建完成后再整体替换，查询线程不会看到半成品
+        @param on_date 构建时的最新评分日期
+        """
+        with self._lock:
+            self._rebuild(on_date)
+
+    def _rebuild(self, on_date: date | None):
+        # 调用方持有锁
+        postings: dict[str, set[int]] = {}
+        names: dict[int, str] = {}
+        _, last_name_id, last_detail_id = self._load(postings, names, 0, 0)
+
+        self._state = (self._freeze(postings), {}, names)
+        self._delta_size = 0
+        self._last_name_id = last_name_id
+        self._last_detail_id = last_detail_id
+        self.date = on_date
+
+        logger.info('search index rebuilt: %d names, %d grams', len(names), len(self._state[0]))
+
+    def refresh(self, on_date: date | None = None):
+        """
+        @brief 增量刷新，只读取新增的 NameMap 与 Detail 行
+        @details 新条目写入增量表与名称表的副本，完成后与主表一起整体替换；增量表过大时合并进主表。
+                 已有行的修改不会被发现，见模块说明
+        @param on_date 刷新时的最新评分日期
+        """
+        with self._lock:
+            self._refresh(on_date)
+
+    def _refresh(self, on_date: date | None):
+        # 调用方持有锁
+        postings, delta, names = self._state
+        # 增量表的集合会被原地追加，需要逐个复制；名称表的值为不可变字符串，浅复制即可
+        delta = {gram: set(aids) for gram, aids in delta.items()}
+        names = dict(names)
+
+        added, last_name_id, last_detail_id = self._load(
+            delta, names, self._last_name_id, self._last_detail_id
+        )
+        delta_size = self._delta_size + added
+
+        if delta_size > MERGE_THRESHOLD:
+            merged = {gram: set(aids) for gram, aids in postings.items()}
+            for gram, aids in delta.items():
+                merged.setdefault(gram, set()).update(aids)
+            postings = self._freeze(merged)
+            delta = {}
+            delta_size = 0
+
+        self._state = (postings, delta, names)
+        self._delta_size = delta_size
+        self._last_name_id = last_name_id
+        self._last_detail_id = last_detail_id
+        self.date = on_date
+
+    def ensure(self, on_date: date | None, app: Flask | None = None):
+        """
+        @brief 保证索引与最新评分日期一致，首次调用时全量构建，日期变化时增量刷新
+        @details 其他线程正在构建、或同一日期刚刚构建失败时直接返回，查询使用旧索引或回退到 SQL；
+                 给出 app 时在后台线程中构建，本次请求不等待
+        @param on_date 当前最新评分日期
+        @param app Flask 应用，后台线程在其应用上下文中读取数据库
+        """
+        if self.ready and self.date == on_date:
+            return
+
+        failed = self._failed
+        if failed is not None and failed[0] == on_date and monotonic() - failed[1] < self.retry_interval:
+            return
+
+        if not self._lock.acquire(blocking=False):
+            return
+
+        if app is None:
+            self._update(on_date)
+            return
+
+        def run():
+            with app.app_context():
+                self._update(on_date)
+
+        try:
+            Thread(target=run, name='search-index', daemon=True).start()
+        except Exception:
+            self._lock.release()
+            raise
+
+    def _update(self, on_date: date | None):
+        """
+        @brief 在已持有的锁内构建或刷新索引，完成后释放锁
+        @param on_date 当前最新评分日期
+        """
+        try:
+            # 取得锁之前其他线程可能已经完成
+            if self.ready and self.date == on_date:
+                return
+            if self.ready:
+                self._refresh(on_date)
+            else:
+                self._rebuild(on_date)
+            self._failed = None
+        except Exception:
+            logger.exception('failed to build search index for %s', on_date)
+            self._failed = (on_date, monotonic())
+        finally:
+            self._lock.release()
+
+    def search(self, keyword: str) -> set[int]:
+        """
+        @brief 查询名称中包含关键字的 Detail.id
+        @details 按倒排列表长度从小到大求交集，最后用子串匹配去除误命中
+        @param keyword 关键字，长度至少为 2
+        @return Detail.id集合
+        """
+        keyword = normalize(keyword).replace(SEPARATOR, '')
+        grams = query_grams(keyword)
+        if not grams:
+            return set()
+
+        # 只读取一次，整个查询使用同一版本的索引
+        postings, delta, names = self._state
+        lists = sorted(
+            ((postings.get(gram, array('q')), delta.get(gram, set())) for gram in grams),
+            key=lambda item: len(item[0]) + len(item[1])
+        )
+
+        main, extra = lists[0]
+        candidates = set(main) | extra
+        for main, extra in lists[1:]:
+            if not candidates:
+                break
+            candidates = {aid for aid in candidates if aid in extra or _contains(main, aid)}
+
+        return {aid for aid in candidates if keyword in names.get(aid, '')}
+
+
+if __name__ == '__main__':
+    pass
@@ -7,15 +7,24 @@
 @details 包含QueryService和PaginationService两个主要服务类，用于处理数据库查询和分页操作
 """
 
+import json
+import sys
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from decimal import Decimal
 from typing import Iterable
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 
-from sqlalchemy import desc, and_
+from sqlalchemy import desc, and_, or_, select, func, Select
 
-from database.model import DB, Detail, Score, Web, NameMap
-from database.data import BriefInfo, DetailInfo, ScoreListItem, Pagination
+from database.model import DB, Detail, Score, Web, NameMap, Ranking, CurrentScore, ScoreRollup
+from database.data import BriefInfo, DetailInfo, ScoreListItem, Pagination, DetailScore, EMPTY_DETAIL_SCORE
+from database.downsample import aggregate, lttb, next_period_start
+from monitoring.profiler import measure_orm
 from constant import ENABLE_INNER_PICTURE
 
+# 列表卡片最多展示300字简介，多取一个字符用于判断是否需要省略号
+BRIEF_DESCRIPTION_LIMIT = 301
+
 
 class WebIDMap(object):
     """
@@ -46,8 +55,10 @@ class WebIDMap(object):
         @param web_items: Web对象的迭代器
         """
         for web in web_items:
-            self._name_to_id[web.name] = str(web.id)
-            self._id_to_name[str(web.id)] = web.name
+            # 平台名会作为每条评分的键，驻留后所有评分共享同一个字符串
+            name = sys.intern(web.name) if web.name else web.name
+            self._name_to_id[name] = str(web.id)
+            self._id_to_name[str(web.id)] = name
 
     def get_id_by_name(self, name: str) -> str | None:
         """
@@ -75,12 +86,24 @@ class QueryService(object):
     @details 提供基础的数据库三表联查、条件过滤、排序和结果转换功能
     """
     @staticmethod
-    def base_query():
+    def base_query(current_date: date | None = None):
         """
         @brief 基础三表联结查询
         @details 连接Detail、Score、Web三张表，返回查询对象
+        @param current_date 最新评分表已刷新到的日期；给出时从current_score表出发按主键连接Score，
+               结果只包含该日期的评分，调用方无需再以on_date过滤；score表按日期分区后，日期条件用于分区裁剪
         @return query(Detail, Score, Web) 查询对象
         """
+        if current_date:
+            return (
+                DB.session.query(Detail, Score, Web)
+                .select_from(CurrentScore)
+                .join(Detail, Detail.id == CurrentScore.detailId)
+                .join(Score, and_(Score.id == CurrentScore.scoreId, Score.date == CurrentScore.date))
+                .join(Web, Detail.web == Web.id)
+                .filter(CurrentScore.date == current_date)
+            )
+
         return (
             DB.session.query(Detail, Score, Web)
             .join(Score, Detail.id == Score.detailId)
@@ -88,7 +111,63 @@ class QueryService(object):
         )
 
     @staticmethod
-    def apply_filters(query, aid: int | None=None, year: int | None=None, season: str | None=None, min_vote: int | None=None, on_date: str | None=None, keyword: str | None=None):
+    def base_select(current_date: date | None = None):
+        """
+        @brief 基础三表联结语句
+        @details 与base_query相同的联结，但返回不绑定会话的select语句，供异步会话执行；
+                 apply_filters、order_by_score_desc同样适用于该语句
+        @param current_date 同base_query
+        @return select(Detail, Score, Web) 语句
+        """
+        if current_date:
+            return (
+                select(Detail, Score, Web)
+                .select_from(CurrentScore)
+                .join(Detail, Detail.id == CurrentScore.detailId)
+                .join(Score, and_(Score.id == CurrentScore.scoreId, Score.date == CurrentScore.date))
+                .join(Web, Detail.web == Web.id)
+                .where(CurrentScore.date == current_date)
+            )
+
+        return (
+            select(Detail, Score, Web)
+            .join(Score, Detail.id == Score.detailId)
+            .join(Web, Detail.web == Web.id)
+        )
+
+    @staticmethod
+    def brief_columns() -> tuple:
+        """
+        @brief 列表卡片所需的列
+        @details 简介在SQL中截断，不读取Detail.all、tag等JSON列与完整的description
+        @return 列元组，结果行可按列名访问
+        """
+        return (
+            Detail.id,
+            Detail.name,
+            Detail.translation,
+            func.substr(Detail.description, 1, BRIEF_DESCRIPTION_LIMIT).label('description'),
+            Detail.picture,
+            Score.score,
+            Score.vote,
+        )
+
+    @staticmethod
+    def project_brief(query, *extra):
+        """
+        @brief 将三表联结查询替换为只选取卡片所需的列
+        @details 联结与筛选条件保持不变，结果为普通的行元组，不经过ORM实体构造与标识映射
+        @param query base_query、ranked_query返回的查询对象或base_select返回的语句
+        @param extra 额外选取的列
+        @return 投影后的查询对象或语句
+        """
+        columns = QueryService.brief_columns() + extra
+        if isinstance(query, Select):
+            return query.with_only_columns(*columns)
+        return query.with_entities(*columns)
+
+    @staticmethod
+    def apply_filters(query, aid: int | None=None, year: int | None=None, season: str | None=None, min_vote: int | None=None, on_date: str | None=None, keyword: str | None=None, aids: Iterable[int] | None=None):
         """
         @brief 统一添加筛选条件
         @details 根据提供的参数对查询对象添加相应的过滤条件
@@ -99,6 +178,7 @@ class QueryService(object):
         @param min_vote 最小评分过滤条件
         @param on_date 日期过滤条件
         @param keyword 关键字搜索条件，在Detail.all JSON中搜索
+        @param aids Detail.id集合过滤条件，通常来自搜索索引
         @return 添加过滤条件后的查询对象
         """
         filters = []
@@ -119,25 +199,120 @@ class QueryService(object):
             filters.append(Score.date == on_date)
 
         if keyword:
-            name_map_query = DB.session.query(NameMap.detailId).filter(
-                NameMap.name.like(f'%{keyword}%')
-            )
-            filters.append(Detail.id.in_(name_map_query))
+            filters.append(Detail.id.in_(QueryService.keyword_query(keyword)))
+
+        if aids is not None:
+            filters.append(Detail.id.in_(list(aids)))
 
         if filters:
             query = query.filter(and_(*filters))
 
         return query
 
+    @staticmethod
+    def keyword_query(keyword: str):
+        """
+        @brief 构建关键字匹配的Detail.id子查询
+        @param keyword 关键字
+        @return select(NameMap.detailId) 语句
+        """
+        return select(NameMap.detailId).where(
+            NameMap.name.like(f'%{keyword}%')
+        )
+
+    @staticmethod
+    def keyword_detail_ids(keyword: str) -> set[int]:
+        """
+        @brief 查询关键字匹配的全部Detail.id
+        @param keyword 关键字
+        @return Detail.id集合
+        """
+        return set(DB.session.execute(QueryService.keyword_query(keyword)).scalars())
+
     @staticmethod
     def order_by_score_desc(query):
         """
         @brief 按评分降序排列
-        @details 对查询结果按Score.score字段进行降序排序
+        @details 对查询结果按Score.score、Score.vote降序排序，以Detail.id升序保证顺序稳定，
+                 与PaginationService.paginate_keyset的游标键一致
         @param query 查询对象
         @return 排序后的查询对象
         """
-        return query.order_by(desc(Score.score), desc(Score.vote))
+        return query.order_by(desc(Score.score), desc(Score.vote), Detail.id)
+
+    @staticmethod
+    def ranked_query(on_date: date):
+        """
+        @brief 基于物化排名的三表联结查询
+        @details 从ranking表出发连接Detail、Score、Web，返回结构与base_query相同的查询对象；
+                 按Ranking.scoreId连接Score，同一天重复抓取的评分不会产生重复行
+        @param on_date 评分日期
+        @return query(Detail, Score, Web) 查询对象
+        """
+        return (
+            DB.session.query(Detail, Score, Web)
+            .select_from(Ranking)
+            .join(Detail, Detail.id == Ranking.detailId)
+            .join(Score, and_(Score.id == Ranking.scoreId, Score.date == Ranking.date))
+            .join(Web, Detail.web == Web.id)
+            .filter(Ranking.date == on_date)
+        )
+
+    @staticmethod
+    def apply_ranked_filters(query, year: int | None=None, season: str | None=None, min_vote: int | None=None):
+        """
+        @brief 在排名表上添加筛选条件
+        @details 条件全部落在ranking表的冗余列上，可以直接使用其索引
+        @param query ranked_query返回的查询对象
+        @param year 年份过滤条件
+        @param season 季度过滤条件
+        @param min_vote 最小投票数过滤条件
+        @return 添加过滤条件后的查询对象
+        """
+        filters = []
+
+        if year:
+            filters.append(Ranking.year == year)
+
+        if season:
+            filters.append(Ranking.season == season)
+
+        if min_vote:
+            filters.append(Ranking.vote >= min_vote)
+
+        if filters:
+            query = query.filter(and_(*filters))
+
+        return query
+
+    @staticmethod
+    def order_by_rank(query):
+        """
+        @brief 按物化排名排序
+        @details 排名与order_by_score_desc的顺序一致，且位于索引末尾，无需filesort
+        @param query ranked_query返回的查询对象
+        @return 排序后的查询对象
+        """
+        return query.order_by(Ranking.rank)
+
+    @staticmethod
+    def count_ranked(on_date: date, year: int | None=None, season: str | None=None, min_vote: int | None=None) -> int:
+        """
+        @brief 仅在排名表上计数
+        @return int 结果总数
+        """
+        query = DB.session.query(DB.func.count(Ranking.id)).filter(Ranking.date == on_date)
+        query = QueryService.apply_ranked_filters(query, year=year, season=season, min_vote=min_vote)
+        return query.scalar()
+
+    @staticmethod
+    def count_select(statement):
+        """
+        @brief 构建select语句的计数语句
+        @param statement select语句
+        @return select(count) 语句
+        """
+        return select(func.count()).select_from(statement.order_by(None).subquery())
 
     @staticmethod
     def count(query):
@@ -151,7 +326,7 @@ class QueryService(object):
         return query.count()
 
     @staticmethod
-    def set_picture_url(detail: Detail) -> str:
+    def set_picture_url(detail) -> str:
         # 修正 picture 构造以避免 '//' + None 的问题
         picture = ''
 
@@ -169,36 +344,67 @@ class QueryService(object):
         return picture
 
     @staticmethod
-    def to_brief_list(rows: list[tuple[Detail, Score, Web]]) -> list[BriefInfo]:
+    def to_brief(detail: Detail, score: Score) -> BriefInfo:
         """
-        @brief 将查询结果转换为简要信息列表
-        @details 将(Detail, Score, Web)的结果集转换为BriefInfo对象列表
-        @param rows (Detail, Score, Web)元组列表
-        @return BriefInfo列表
+        @brief 将单行查询结果转换为简要信息
+        @param detail Detail对象
+        @param score Score对象
+        @return BriefInfo对象
         """
-        result = []
-        for detail, score, web in rows:
-            picture = QueryService.set_picture_url(detail)
+        picture = QueryService.set_picture_url(detail)
 
-            info = BriefInfo(
-                id=detail.id,
+        return BriefInfo(
+            id=detail.id,
 
-                name=detail.name,
-                translation=detail.translation,
+            name=detail.name,
+            translation=detail.translation,
 
-                description=detail.description,
+            description=detail.description,
 
-                detail_score=score.detailScore or {},
-                score=float(score.score) if score.score else 0.0,
-                vote=score.vote or 0,
+            detail_score=score.detailScore or {},
+            score=float(score.score) if score.score else 0.0,
+            vote=score.vote or 0,
 
-                url=f'/detail/{detail.id}',
-                picture=picture
-            )
-            result.append(info)
-        return result
+            url=f'/detail/{detail.id}',
+            picture=picture
+        )
 
     @staticmethod
+    def to_brief_row(row) -> BriefInfo:
+        """
+        @brief 将project_brief的单行结果转换为简要信息
+        @details 卡片不展示各平台评分，detail_score为空
+        @param row 含brief_columns各列的行
+        @return BriefInfo对象
+        """
+        return BriefInfo(
+            id=row.id,
+
+            name=row.name,
+            translation=row.translation,
+
+            description=row.description,
+
+            detail_score=EMPTY_DETAIL_SCORE,
+            score=float(row.score) if row.score else 0.0,
+            vote=row.vote or 0,
+
+            url=f'/detail/{row.id}',
+            picture=QueryService.set_picture_url(row)
+        )
+
+    @staticmethod
+    @measure_orm
+    def to_brief_list(rows: Iterable) -> list[BriefInfo]:
+        """
+        @brief 将投影查询结果转换为简要信息列表
+        @param rows project_brief查询的结果行
+        @return BriefInfo列表
+        """
+        return [QueryService.to_brief_row(row) for row in rows]
+
+    @staticmethod
+    @measure_orm
     def to_detail_object(detail: Detail, score: Score, web: Web, web_id_map: WebIDMap) -> DetailInfo:
         """
         @brief 将Detail、Score、Web三个对象转换为DetailInfo对象
@@ -211,19 +417,19 @@ class QueryService(object):
         """
         picture = QueryService.set_picture_url(detail)
 
-        detail_score: dict[str, dict[str, int | float]] = {}
-        for key,value in score.detailScore.items():
-            detail_score[web_id_map.get_name_by_id(key)] = value
+        detail_score = DetailScore.of(
+            (web_id_map.get_name_by_id(key), value) for key, value in (score.detailScore or {}).items()
+        )
 
         info = DetailInfo(
             id=detail.id,
 
             name=detail.name,
             translation=detail.translation,
-            all=detail.all,
+            all=tuple(detail.all) if detail.all is not None else None,
 
             time=detail.time,
-            tag=detail.tag,
+            tag=tuple(detail.tag) if detail.tag is not None else None,
             description=detail.description,
 
             url=f'https://{web.host}{web.format.format(detail.webId)}',
@@ -251,6 +457,15 @@ class ScoreListService(object):
             .filter(Score.detailId == detail_id)
         )
 
+    @staticmethod
+    def base_select(detail_id: int):
+        """
+        @brief 与base_query相同条件的select语句，供异步会话执行
+        @param detail_id Detail.id
+        @return select(Score) 语句
+        """
+        return select(Score).where(Score.detailId == detail_id)
+
     @staticmethod
     def order_by_date_desc(query):
         """
@@ -272,22 +487,101 @@ class ScoreListService(object):
         return query.order_by(Score.date)
 
     @staticmethod
-    def from_delay_days(query, detail_id: int, delay: int):
+    def from_delay_days(query, delay: int):
         """
+        @brief 限定为最新评分日期前delay天内的记录
+        @details 每部动画每天只有一条评分，按日期倒序取delay+1条即可覆盖该范围，
+                 最新日期在同一次查询中得出，无需额外查询；日期有缺失时会多取到范围外的记录，
+                 由trim_delay_days去除
+        @param query 查询对象
+        @param delay 天数
+        @return 按日期降序排列并限制数量的查询对象
         """
-        # 获取最新的日期
-        latest_score = (
-            DB.session.query(Score.date)
-            .filter(Score.detailId == detail_id)
-            .order_by(desc(Score.date))
-            .first()
+        return query.order_by(desc(Score.date)).limit(delay + 1)
+
+    @staticmethod
+    def trim_delay_days(score_list: list[ScoreListItem], delay: int) -> list[ScoreListItem]:
+        """
+        @brief 去除超出最新评分日期前delay天的记录
+        @param score_list 按日期降序排列的评分列表
+        @param delay 天数
+        @return 评分列表
+        """
+        if not score_list:
+            return score_list
+
+        delay_date = score_list[0].date - timedelta(days=delay)
+        return [item for item in score_list if item.date >= delay_date]
+
+    @staticmethod
+    def rollup_query(detail_id: int, granularity: str, delay: int):
+        """
+        @brief 最近delay天所需的周或月汇总
+        @details 沿idx_rollup_detail_period倒序读取，每周至少7天、每月至少28天，按此估算所需条数，
+                 范围外的记录由trim_delay_days去除
+        @param detail_id Detail.id
+        @param granularity 汇总粒度，'week' / 'month'
+        @param delay 天数
+        @return 按周期降序排列并限制数量的查询对象
+        """
+        return (
+            DB.session.query(ScoreRollup)
+            .filter(ScoreRollup.detailId == detail_id, ScoreRollup.granularity == granularity)
+            .order_by(desc(ScoreRollup.period))
+            .limit(delay // (7 if granularity == 'week' else 28) + 2)
         )
 
-        delay_date = latest_score.date - timedelta(days=delay)
+    @staticmethod
+    @measure_orm
+    def load_history(detail_id: int, delay: int, granularity: str, web_id_map: WebIDMap) -> list[ScoreListItem]:
+        """
+        @brief 按粒度选择代价最小的存储读取评分历史
+        @details 周、月粒度且已有汇总时，已结束的周期读取score_rollup，之后尚未汇总的日期读取score表，
+                 行数约为每日记录的1/7或1/30，结果再经downsample聚合后与全部读取每日记录一致；
+                 范围起点落在周期中间时，该周期按完整周期汇总。日粒度或尚无汇总时读取每日记录，
+                 score表的旧分区删除后只能返回保留期内的数据
+        @param detail_id Detail.id
+        @param delay 最新评分日期前的天数
+        @param granularity 聚合粒度，'day' / 'week' / 'month'
+        @param web_id_map WebIDMap对象，用于将Web ID转换为名称
+        @return 按日期降序排列的评分列表
+        """
+        rollups = []
+        if granularity in ('week', 'month'):
+            try:
+                rollups = ScoreListService.rollup_query(detail_id, granularity, delay).all()
+            except Exception:
+                # 汇总表尚未创建
+                DB.session.rollback()
+
+        if rollups:
+            tail_start = next_period_start(rollups[0].period, granularity)
+            query = ScoreListService.base_query(detail_id).filter(Score.date >= tail_start)
+            rows = ScoreListService.order_by_date_desc(query).all() + rollups
+        else:
+            query = ScoreListService.from_delay_days(ScoreListService.base_query(detail_id), delay)
+            rows = query.all()
+
+        score_list = ScoreListService.rows_to_score_list(rows, web_id_map)
+        return ScoreListService.trim_delay_days(score_list, delay)
 
-        return query.filter(Score.date >= delay_date)
+    @staticmethod
+    def downsample(score_list: list[ScoreListItem], granularity: str, points: int) -> list[ScoreListItem]:
+        """
+        @brief 对评分历史进行聚合与降采样
+        @param score_list 按日期降序排列的评分列表
+        @param granularity 聚合粒度，'day' / 'week' / 'month'
+        @param points 最多保留的点数，小于3时不做降采样
+        @return 按日期降序排列的评分列表
+        """
+        items = list(reversed(score_list))
+        items = aggregate(items, granularity)
+        items = lttb(items, points)
+        items.reverse()
+        return items
 
     @staticmethod
+    @measure_orm
     def to_score_list(query, web_id_map: WebIDMap):
         """
         @brief 将查询结果转换为评分列表
@@ -296,13 +590,22 @@ class ScoreListService(object):
         @param web_id_map WebIDMap对象，用于将Web ID转换为名称
         @return ScoreListItem列表
         """
-        results = query.all()
+        return ScoreListService.rows_to_score_list(query.all(), web_id_map)
 
+    @staticmethod
+    def rows_to_score_list(results: Iterable[Score], web_id_map: WebIDMap):
+        """
+        @brief 将Score对象转换为评分列表
+        @param results Score对象迭代器
+        @param web_id_map WebIDMap对象，用于将Web ID转换为名称
+        @return ScoreListItem列表
+        """
         score_list: list[ScoreListItem] = []
         for result in results:
-            detail_score = {}
-            for key, value in result.detailScore.items():
-                detail_score[web_id_map.get_name_by_id(key)] = value
+            # 相邻日期评分相同时共享同一个DetailScore实例
+            detail_score = DetailScore.of(
+                (web_id_map.get_name_by_id(key), value) for key, value in (result.detailScore or {}).items()
+            )
 
             score_list.append(ScoreListItem(
                 detail_score=detail_score,
@@ -321,6 +624,7 @@ class PaginationService(object):
     @details 提供数据分页和分页链接生成功能
     """
     @staticmethod
+    @measure_orm
     def paginate(query, page: int, per_page: int):
         """
         @brief 对查询结果进行分页
@@ -338,6 +642,143 @@ class PaginationService(object):
         total_pages = (total_count + per_page - 1) // per_page
         return items, total_count, total_pages
 
+    @staticmethod
+    def encode_cursor(on_date: date, scope: tuple, score: Decimal | float | None, vote: int | None, aid: int, rank: int | None = None) -> str:
+        """
+        @brief 生成不透明的分页游标
+        @details 游标记录上一页最后一行的(score, vote, id)、物化排名、评分日期以及适用的筛选条件与页码，
+                 使用URL安全的base64编码
+        @param on_date 评分日期
+        @param scope 游标适用的(year, season, min_vote, page)，page为游标所指向的页码
+        @param score 最后一行的评分
+        @param vote 最后一行的投票数
+        @param aid 最后一行的Detail.id
+        @param rank 最后一行的物化排名，未使用排名表时为None
+        @return 游标字符串
+        """
+        payload = [on_date.isoformat(), list(scope), None if score is None else str(score), vote, aid, rank]
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(token: str | None, on_date: date | None, scope: tuple):
+        """
+        @brief 解析分页游标
+        @details 游标只对生成时的筛选条件与下一页有效，修改URL中的筛选条件或页码后游标失效，回退到OFFSET定位
+        @param token 游标字符串
+        @param on_date 当前最新评分日期，日期不一致的游标视为失效
+        @param scope 当前请求的(year, season, min_vote, page)，与游标记录的不一致时视为失效
+        @return tuple(score, vote, id, rank) 或 None(游标缺失、非法或已失效)
+        """
+        if not token or not on_date:
+            return None
+
+        try:
+            raw = urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            cursor_date, cursor_scope, score, vote, aid, rank = json.loads(raw)
+            if cursor_date != on_date.isoformat() or cursor_scope != list(scope):
+                return None
+            return (
+                None if score is None else Decimal(score),
+                None if vote is None else int(vote),
+                int(aid),
+                None if rank is None else int(rank)
+            )
+        except (ValueError, TypeError, ArithmeticError):
+            # 非法的Decimal字符串抛出InvalidOperation，属于ArithmeticError
+            return None
+
+    @staticmethod
+    def _seek_desc(column, value, tail):
+        """
+        @brief 构造降序列上的游标条件
+        @details 与MySQL降序排序时NULL排在最后的规则一致
+        """
+        if value is None:
+            return and_(column.is_(None), tail)
+        return or_(column < value, column.is_(None), and_(column == value, tail))
+
+    @staticmethod
+    @measure_orm
+    def paginate_keyset(query, page: int, per_page: int, total_count: int, cursor=None):
+        """
+        @brief 基于游标的分页
+        @details 查询需经QueryService.project_brief投影并已按QueryService.order_by_score_desc排序；存在有效游标时直接定位到上一页末尾，
+                 避免深分页的OFFSET扫描，否则回退到OFFSET定位。总数由调用方从缓存中提供
+        @param query 已排序的查询对象
+        @param page 页码，从1开始
+        @param per_page 每页显示数量
+        @param total_count 结果总数
+        @param cursor decode_cursor返回的游标
+        @return tuple(items, total_count, total_pages, last_key) 分页结果元组，last_key为本页最后一行的(score, vote, id, rank)
+        """
+        if page < 1:
+            page = 1
+
+        if cursor:
+            score, vote, aid, _ = cursor
+            condition = PaginationService._seek_desc(
+                Score.score, score, PaginationService._seek_desc(Score.vote, vote, Detail.id > aid)
+            )
+            items = query.filter(condition).limit(per_page).all()
+        else:
+            items = query.offset((page - 1) * per_page).limit(per_page).all()
+
+        last_key = None
+        if items:
+            row = items[-1]
+            last_key = (row.score, row.vote, row.id, None)
+
+        total_pages = (total_count + per_page - 1) // per_page
+        return items, total_count, total_pages, last_key
+
+    @staticmethod
+    @measure_orm
+    def paginate_ranked(query, page: int, per_page: int, total_count: int, cursor=None):
+        """
+        @brief 基于物化排名的分页
+        @details 游标中带有排名时直接按rank定位，否则按排名OFFSET定位
+        @param query 经QueryService.project_brief投影并已按QueryService.order_by_rank排序的查询对象
+        @param page 页码，从1开始
+        @param per_page 每页显示数量
+        @param total_count 结果总数
+        @param cursor decode_cursor返回的游标
+        @return tuple(items, total_count, total_pages, last_key) 与paginate_keyset相同
+        """
+        if page < 1:
+            page = 1
+
+        query = query.add_columns(Ranking.rank)
+        if cursor and cursor[3] is not None:
+            items = query.filter(Ranking.rank > cursor[3]).limit(per_page).all()
+        else:
+            items = query.offset((page - 1) * per_page).limit(per_page).all()
+
+        last_key = None
+        if items:
+            row = items[-1]
+            last_key = (row.score, row.vote, row.id, row.rank)
+
+        total_pages = (total_count + per_page - 1) // per_page
+        return items, total_count, total_pages, last_key
+
+    @staticmethod
+    def paginate_list(items: list, page: int, per_page: int):
+        """
+        @brief 对内存中已筛选排序的结果进行分页
+        @details 与paginate返回相同的结构，用于快照查询，不产生数据库访问
+        @param items 已排序的结果列表
+        @param page 页码，从1开始
+        @param per_page 每页显示数量
+        @return tuple(items, total_count, total_pages) 分页结果元组
+        """
+        if page < 1:
+            page = 1
+        offset = (page - 1) * per_page
+        total_count = len(items)
+        total_pages = (total_count + per_page - 1) // per_page
+        return items[offset:offset + per_page], total_count, total_pages
+
     @staticmethod
     def build_pagination_links(total_pages: int, current_page: int, build_url):
         """
@@ -0,0 +1,210 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file snapshot.py
+@brief 最新评分日快照模块，将当天的三表联查结果常驻内存
+@details 爬虫每天只写入一次评分，因此最新一天的(Detail, Score, Web)联查结果在一天内不变。
+         LatestSnapshot 把这些行一次性加载为紧凑的列式结构，并预先计算好排序，
+         SnapshotHolder 负责在最新日期变化时原子地重建快照。
+"""
+
+import logging
+from array import array
+from datetime import date
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Iterable
+
+from database.model import Detail
+from database.data import BriefInfo
+from database.service import QueryService
+from monitoring.profiler import measure_orm
+
+logger = logging.getLogger(__name__)
+
+# 季度编码，-1 表示未知季度
+SEASON_CODE: dict[str | None, int] = {'spring': 0, 'summer': 1, 'autumn': 2, 'winter': 3}
+
+# 快照重建失败后，同一日期再次重试的间隔(秒)
+RETRY_INTERVAL = 30
+
+
+class LatestSnapshot(object):
+    """
+    @class LatestSnapshot
+    @brief 最新评分日的只读内存快照
+    @details 按 Detail.id 升序保存 BriefInfo，同时以 array 列存储 score、vote、year、season，
+             并为每个(年份, 季度)组合预先计算好按评分倒序的行号列表
+    """
+
+    def __init__(self, on_date: date, rows: Iterable[tuple[BriefInfo, int | None, str | None]]):
+        """
+        @brief 由转换后的行构建快照
+        @param on_date 快照对应的评分日期
+        @param rows (BriefInfo, year, season)元组迭代器，需按 Detail.id 升序
+        """
+        self.date = on_date
+
+        self.briefs: list[BriefInfo] = []
+        self.ids = array('q')
+        self.scores = array('d')
+        self.votes = array('q')
+        self.years = array('q')
+        self.seasons = array('b')
+
+        for brief, year, season in rows:
+            self.briefs.append(brief)
+            self.ids.append(brief.id)
+            self.scores.append(brief.score)
+            self.votes.append(brief.vote)
+            self.years.append(year or 0)
+            self.seasons.append(SEASON_CODE.get(season, -1))
+
+        self.positions: dict[int, int] = {aid: i for i, aid in enumerate(self.ids)}
+        self.orders: dict[tuple[int, int], array] = self._build_orders()
+
+    def __len__(self) -> int:
+        return len(self.briefs)
+
+    def _build_orders(self) -> dict[tuple[int, int], array]:
+        """
+        @brief 预计算排序
+        @details 全量行按(score DESC, vote DESC, id ASC)排序一次，再按年份、季度拆分，
+                 年份或季度为 0 / -1 的键表示“全部”，拆分后的子序列天然保持有序
+        @return {(year, season_code): 行号数组}
+        """
+        ranked = sorted(
+            range(len(self.briefs)),
+            key=lambda i: (-self.scores[i], -self.votes[i], self.ids[i])
+        )
+
+        orders: dict[tuple[int, int], array] = {(0, -1): array('q', ranked)}
+        for i in ranked:
+            year, season = self.years[i], self.seasons[i]
+            # 年份或季度为空时几个键会与“全部”重合，去重后每行在每个键下只出现一次
+            for key in {(year, season), (year, -1), (0, season)} - {(0, -1)}:
+                orders.setdefault(key, array('q')).append(i)
+
+        return orders
+
+    def select(self, year: int | None = None, season: str | None = None, min_vote: int | None = None,
+               aids: Iterable[int] | None = None) -> list[BriefInfo]:
+        """
+        @brief 在内存中筛选并排序
+        @details 与 QueryService.apply_filters 语义一致；指定 aids 时按 Detail.id 升序返回，
+                 否则按评分倒序返回
+        @param year 年份过滤条件
+        @param season 季度过滤条件
+        @param min_vote 最小投票数过滤条件
+        @param aids 限定的 Detail.id 集合，用于关键字搜索
+        @return BriefInfo列表
+        """
+        if aids is not None:
+            candidates = sorted(self.positions[aid] for aid in set(aids) if aid in self.positions)
+            year_code = year or 0
+            season_code = SEASON_CODE.get(season, -1)
+            candidates = [
+                i for i in candidates
+                if (not year_code or self.years[i] == year_code) and
+                   (season_code < 0 or self.seasons[i] == season_code)
+            ]
+        else:
+            candidates = self.orders.get((year or 0, SEASON_CODE.get(season, -1)), ())
+
+        if min_vote:
+            votes = self.votes
+            return [self.briefs[i] for i in candidates if votes[i] >= min_vote]
+
+        return [self.briefs[i] for i in candidates]
+
+    @classmethod
+    @measure_orm
+    def load(cls, on_date: date) -> 'LatestSnapshot':
+        """
+        @brief 从数据库加载指定日期的快照
+        @param on_date 评分日期
+        @return LatestSnapshot对象
+        """
+        query = QueryService.base_query()
+        query = QueryService.apply_filters(query, on_date=on_date)
+        query = QueryService.project_brief(query, Detail.year, Detail.season)
+        query = query.order_by(Detail.id)
+
+        def rows():
+            for row in query.yield_per(1000):
+                yield QueryService.to_brief_row(row), row.year, row.season
+
+        return cls(on_date, rows())
+
+
+class SnapshotHolder(object):
+    """
+    @class SnapshotHolder
+    @brief 快照持有者，负责在最新日期变化时原子替换快照
+    @details 同一时间只有一个线程负责重建，其余线程继续使用旧快照；
+             尚无可用快照时返回 None，调用方应回退到 SQL 查询。
+             重建失败后 retry_interval 秒内不再为同一日期重试，避免每个请求都重复一次失败的全量查询。
+             loader 可以替换为其他按日期构建、带有 date 属性的对象，例如分面计数
+    """
+
+    def __init__(self, loader: Callable[[date], Any] | None = None, retry_interval: float = RETRY_INTERVAL):
+        """
+        @brief 初始化
+        @param loader 以评分日期构建快照的函数，默认为 LatestSnapshot.load
+        @param retry_interval 重建失败后再次重试的间隔(秒)
+        """
+        self.loader = loader or LatestSnapshot.load
+        self.retry_interval = retry_interval
+        self._snapshot: LatestSnapshot | None = None
+        # 最近一次重建失败的(日期, 时间)
+        self._failed: tuple[date, float] | None = None
+        self._lock = Lock()
+
+    def get(self, on_date: date | None) -> LatestSnapshot | None:
+        """
+        @brief 获取与指定日期一致的快照，必要时重建
+        @param on_date 当前最新评分日期
+        @return 日期一致的快照；正在由其他线程重建、重建失败或处于失败后的等待期时返回 None
+        """
+        if not on_date:
+            return None
+
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.date == on_date:
+            return snapshot
+
+        # 同一日期刚刚重建失败，等待期内直接回退到 SQL
+        failed = self._failed
+        if failed is not None and failed[0] == on_date and monotonic() - failed[1] < self.retry_interval:
+            return None
+
+        # 其他线程正在重建，本次请求回退到 SQL
+        if not self._lock.acquire(blocking=False):
+            return None
+
+        try:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.date != on_date:
+                snapshot = self.loader(on_date)
+                self._snapshot = snapshot
+                self._failed = None
+                logger.info('%s rebuilt for %s with %d rows', type(snapshot).__name__, on_date, len(snapshot))
+            return snapshot
+        except Exception:
+            logger.exception('failed to build snapshot for %s', on_date)
+            self._failed = (on_date, monotonic())
+            return None
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        """
+        @brief 丢弃当前快照与失败记录
+        """
+        self._snapshot = None
+        self._failed = None
+
+
+if __name__ == '__main__':
+    pass
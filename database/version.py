@@ -0,0 +1,138 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file version.py
+@brief 数据版本模块，用于缓存键与缓存失效
+@details 数据只在爬虫写入新一天的评分或修改 Web 表时变化。DataVersion 以 MAX(Score.date)
+         和 Web 表内容摘要组成水位，每隔一段时间廉价地检查一次；所有缓存键都带上该水位，
+         数据不变时缓存可以一直使用，数据变化时所有缓存同时切换到新版本。
+"""
+
+import logging
+from datetime import date
+from hashlib import md5
+from threading import Lock
+from time import monotonic
+from typing import Callable
+
+from sqlalchemy import func, select
+
+from database.model import DB, Score, Web
+
+logger = logging.getLogger(__name__)
+
+
+class DataVersion(object):
+    """
+    @class DataVersion
+    @brief 数据版本水位
+    @details 版本号形如 '2025-05-01.3f2a9c1e'，前半部分为最新评分日期，后半部分为 Web 表摘要
+    """
+
+    def __init__(self, check_interval: float = 30):
+        """
+        @brief 初始化
+        @param check_interval 两次检查之间的最小间隔(秒)
+        """
+        self.check_interval = check_interval
+
+        self._token: str | None = None
+        self._latest_date: date | None = None
+        self._checked = 0.0
+        self._lock = Lock()
+        self._listeners: list[Callable[[str], None]] = []
+
+    @staticmethod
+    def statements():
+        """
+        @brief 计算水位所需的两条查询，同步与异步服务共用
+        @details MAX(Score.date) 可由 idx_score_date 直接得出，Web 表只有几行，两次查询都很廉价
+        @return tuple(最新评分日期的标量查询, Web 表内容的查询)
+        """
+        return (
+            select(func.max(Score.date)),
+            select(Web.id, Web.name, Web.host, Web.format, Web.priority).order_by(Web.id),
+        )
+
+    @staticmethod
+    def make_token(latest_date: date | None, webs) -> str:
+        """
+        @brief 由查询结果组成版本号
+        @param latest_date 最新评分日期
+        @param webs Web 表内容的查询结果行
+        @return 版本号
+        """
+        web_digest = md5(repr([tuple(web) for web in webs]).encode()).hexdigest()[:8]
+        return f'{latest_date.isoformat() if latest_date else "none"}.{web_digest}'
+
+    @staticmethod
+    def compute() -> tuple[date | None, str]:
+        """
+        @brief 从数据库计算当前水位
+        @return tuple(最新评分日期, 版本号)
+        """
+        latest_statement, web_statement = DataVersion.statements()
+        latest_date = DB.session.scalar(latest_statement)
+        webs = DB.session.execute(web_statement).all()
+        return latest_date, DataVersion.make_token(latest_date, webs)
+
+    def add_listener(self, listener: Callable[[str], None]):
+        """
+        @brief 注册版本变化的回调，首次得出版本号时也会调用
+        @details 回调在检查版本的请求线程中执行，应尽快返回，耗时的工作交给后台线程
+        @param listener 以新版本号调用的函数
+        """
+        self._listeners.append(listener)
+
+    def _refresh(self):
+        previous = self._token
+        self._latest_date, self._token = self.compute()
+        self._checked = monotonic()
+
+        if self._token != previous:
+            for listener in self._listeners:
+                try:
+                    listener(self._token)
+                except Exception:
+                    logger.exception('data version listener failed')
+
+    def get(self) -> str:
+        """
+        @brief 获取当前数据版本号，超过检查间隔时重新计算
+        @details 同一时间只有一个线程执行检查，其他线程直接使用上一次的结果
+        @return 版本号
+        """
+        if self._token is not None and monotonic() - self._checked < self.check_interval:
+            return self._token
+
+        if not self._lock.acquire(blocking=False):
+            if self._token is not None:
+                return self._token
+            # 首次计算尚未完成，等待其结果
+            self._lock.acquire()
+
+        try:
+            if self._token is None or monotonic() - self._checked >= self.check_interval:
+                self._refresh()
+            return self._token
+        finally:
+            self._lock.release()
+
+    @property
+    def latest_date(self) -> date | None:
+        """
+        @brief 当前版本对应的最新评分日期
+        """
+        self.get()
+        return self._latest_date
+
+    def invalidate(self):
+        """
+        @brief 使下一次 get 立即重新检查，例如手动导入数据之后
+        """
+        self._checked = 0.0
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,5 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,258 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file profiler.py
+@brief 请求级性能剖析
+@details 记录每个请求执行的 SQL 条数与耗时(SQLAlchemy 引擎事件)、ORM 结果转换耗时、
+         模板渲染耗时(Flask 信号)以及各缓存装饰器的命中情况，
+         通过 Server-Timing 响应头返回给浏览器，并按路由汇总到 /metrics (Prometheus 文本格式)。
+         每个请求只有数次计时与一次加锁汇总，可以在生产环境中常开。
+"""
+
+import functools
+from threading import Lock
+from time import perf_counter
+
+from flask import Flask, Response, g, has_app_context, request
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+
+# 请求耗时直方图的分桶上界(秒)
+BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RequestProfile(object):
+    """
+    @brief 单个请求的剖析数据，保存在 flask.g 上
+    """
+    __slots__ = ('started', 'sql_count', 'sql_time', 'orm_time', 'orm_depth', 'render_time', 'render_started',
+                 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.orm_time = 0.0
+        self.orm_depth = 0
+        self.render_time = 0.0
+        self.render_started = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def current_profile() -> RequestProfile | None:
+    """
+    @brief 获取当前请求的剖析数据
+    @return RequestProfile，不在请求中或未启用剖析时为 None
+    """
+    if not has_app_context():
+        return None
+    return g.get('profile')
+
+
+def measure_orm(f):
+    """
+    @brief 统计函数中 ORM 取数与结果转换的耗时
+    @details 耗时扣除期间执行的 SQL 耗时；嵌套调用只统计最外层，避免重复计算
+    """
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        profile = current_profile()
+        if profile is None:
+            return f(*args, **kwargs)
+
+        profile.orm_depth += 1
+        started, sql_time = perf_counter(), profile.sql_time
+        try:
+            return f(*args, **kwargs)
+        finally:
+            profile.orm_depth -= 1
+            if profile.orm_depth == 0:
+                profile.orm_time += perf_counter() - started - (profile.sql_time - sql_time)
+
+    return decorated_function
+
+
+class Metrics(object):
+    """
+    @class Metrics
+    @brief 进程内的指标汇总
+    @details 按路由累计请求数、耗时直方图以及 SQL / ORM / 渲染耗时，按缓存名累计命中与未命中次数
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        # endpoint -> [请求数, 总耗时, SQL条数, SQL耗时, ORM耗时, 渲染耗时, 直方图计数...]
+        self._routes: dict[str, list[float]] = {}
+        # (endpoint, status) -> 请求数
+        self._status: dict[tuple[str, int], int] = {}
+        # (缓存名, 'hit' | 'miss') -> 次数
+        self._cache: dict[tuple[str, str], int] = {}
+
+    def observe_request(self, endpoint: str, status: int, duration: float, profile: RequestProfile):
+        with self._lock:
+            row = self._routes.get(endpoint)
+            if row is None:
+                row = self._routes[endpoint] = [0.0] * (6 + len(BUCKETS))
+            row[0] += 1
+            row[1] += duration
+            row[2] += profile.sql_count
+            row[3] += profile.sql_time
+            row[4] += profile.orm_time
+            row[5] += profile.render_time
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    row[6 + i] += 1
+
+            key = (endpoint, status)
+            self._status[key] = self._status.get(key, 0) + 1
+
+    def observe_cache(self, name: str, hit: bool):
+        key = (name, 'hit' if hit else 'miss')
+        with self._lock:
+            self._cache[key] = self._cache.get(key, 0) + 1
+
+    def render(self, prefix: str = 'anime') -> str:
+        """
+        @brief 输出 Prometheus 文本格式
+        @param prefix 指标名前缀
+        @return 文本
+        """
+        with self._lock:
+            routes = {endpoint: list(row) for endpoint, row in self._routes.items()}
+            status = dict(self._status)
+            cache = dict(self._cache)
+
+        lines = [f'# TYPE {prefix}_requests_total counter']
+        for (endpoint, code), count in sorted(status.items()):
+            lines.append(f'{prefix}_requests_total{{endpoint="{endpoint}",status="{code}"}} {count}')
+
+        lines.append(f'# TYPE {prefix}_request_duration_seconds histogram')
+        for endpoint, row in sorted(routes.items()):
+            for i, bound in enumerate(BUCKETS):
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {int(row[6 + i])}')
+            lines.append(f'{prefix}_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {int(row[0])}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{{endpoint="{endpoint}"}} {row[1]:.6f}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{endpoint="{endpoint}"}} {int(row[0])}')
+
+        for name, index, kind in (
+            ('sql_statements_total', 2, 'counter'),
+            ('sql_duration_seconds_total', 3, 'counter'),
+            ('orm_duration_seconds_total', 4, 'counter'),
+            ('render_duration_seconds_total', 5, 'counter'),
+        ):
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            for endpoint, row in sorted(routes.items()):
+                value = int(row[index]) if index == 2 else f'{row[index]:.6f}'
+                lines.append(f'{prefix}_{name}{{endpoint="{endpoint}"}} {value}')
+
+        lines.append(f'# TYPE {prefix}_cache_requests_total counter')
+        for (name, result), count in sorted(cache.items()):
+            lines.append(f'{prefix}_cache_requests_total{{cache="{name}",result="{result}"}} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class Profiler(object):
+    """
+    @class Profiler
+    @brief 请求剖析扩展
+    @details 用法与其他 Flask 扩展相同: profiler = Profiler(app, DB)
+    """
+
+    def __init__(self, app: Flask | None = None, db=None, metrics_path: str = '/metrics'):
+        self.metrics = Metrics()
+        self.metrics_path = metrics_path
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app: Flask, db=None):
+        """
+        @brief 注册请求钩子、模板信号与引擎事件
+        @param app Flask 应用
+        @param db Flask-SQLAlchemy 对象，为 None 时不统计 SQL
+        """
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+        if db is not None:
+            with app.app_context():
+                event.listen(db.engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(db.engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        app.add_url_rule(self.metrics_path, 'metrics', self.metrics_view)
+
+    @staticmethod
+    def _before_request():
+        g.profile = RequestProfile()
+
+    def _after_request(self, response: Response) -> Response:
+        profile = current_profile()
+        if profile is None:
+            return response
+
+        duration = perf_counter() - profile.started
+        self.metrics.observe_request(request.endpoint or 'unknown', response.status_code, duration, profile)
+
+        timings = [
+            f'sql;dur={profile.sql_time * 1000:.1f};desc="{profile.sql_count} queries"',
+            f'orm;dur={profile.orm_time * 1000:.1f}',
+            f'render;dur={profile.render_time * 1000:.1f}',
+        ]
+        if profile.cache_hits or profile.cache_misses:
+            timings.append(f'cache;desc="{profile.cache_hits} hit {profile.cache_misses} miss"')
+        timings.append(f'total;dur={duration * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(timings)
+
+        return response
+
+    @staticmethod
+    def _before_render(sender, template, context, **extra):
+        profile = current_profile()
+        if profile is not None:
+            profile.render_started = perf_counter()
+
+    @staticmethod
+    def _after_render(sender, template, context, **extra):
+        profile = current_profile()
+        if profile is not None and profile.render_started:
+            profile.render_time += perf_counter() - profile.render_started
+            profile.render_started = 0.0
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # 同一连接上的语句不会嵌套执行，只需记录最近一次的开始时间
+        conn.info['profile_started'] = perf_counter()
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('profile_started', None)
+        profile = current_profile()
+        if profile is not None and started is not None:
+            profile.sql_count += 1
+            profile.sql_time += perf_counter() - started
+
+    def record_cache(self, name: str, hit: bool):
+        """
+        @brief 记录一次缓存读取，供 CoalescingCache 回调
+        @param name 被缓存的视图或函数名
+        @param hit 是否命中
+        """
+        self.metrics.observe_cache(name, hit)
+
+        profile = current_profile()
+        if profile is not None:
+            if hit:
+                profile.cache_hits += 1
+            else:
+                profile.cache_misses += 1
+
+    def metrics_view(self):
+        return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,156 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file assets.py
+@brief 带内容哈希的预压缩静态资源
+@details build 在构建镜像时把 static 下的 CSS / JS 复制为带内容哈希的文件名，同时写入 gzip / brotli 预压缩版本，
+         并生成 manifest.json 记录原文件名到哈希文件名的映射。文件名随内容变化，因此这些文件可以设置
+         一年的 immutable 缓存；模板通过 asset_url 引用资源，未构建时回退到普通的 static 地址。
+"""
+
+import gzip
+import json
+import os
+from hashlib import md5
+
+from flask import Flask, abort, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 需要哈希与预压缩的资源类型
+EXTENSIONS = ('.css', '.js')
+
+# 预压缩版本，按优先级排列
+ENCODINGS: tuple[tuple[str, str], ...] = (('br', '.br'), ('gzip', '.gz'))
+
+MANIFEST = 'manifest.json'
+
+
+class StaticAssets(object):
+    """
+    @class StaticAssets
+    @brief 静态资源扩展
+    @details 用法与其他 Flask 扩展相同: StaticAssets(app)；构建: python -m route.assets
+    """
+
+    def __init__(self, app: Flask | None = None, source: str = 'static', root: str = 'static/dist',
+                 max_age: int = 365 * 24 * 3600):
+        """
+        @brief 初始化
+        @param app Flask 应用
+        @param source 源文件目录
+        @param root 构建输出目录
+        @param max_age 哈希文件的缓存时间(秒)
+        """
+        self.source = source
+        self.root = root
+        self.max_age = max_age
+        self.manifest: dict[str, str] = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        # 相对路径以应用目录为准，与工作目录无关
+        self.source = os.path.join(app.root_path, self.source)
+        self.root = os.path.join(app.root_path, self.root)
+        self.load()
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.add_template_global(self.asset_url, 'asset_url')
+
+    def load(self):
+        """
+        @brief 读取构建生成的 manifest，不存在时所有资源使用普通的 static 地址
+        """
+        try:
+            with open(os.path.join(self.root, MANIFEST), encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+
+    def asset_url(self, filename: str) -> str:
+        """
+        @brief 模板中引用静态资源
+        @param filename static 下的相对路径，例如 'css/base.css'
+        @return 已构建时为哈希文件的地址，否则为普通的 static 地址
+        """
+        hashed = self.manifest.get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=hashed)
+
+    def serve(self, filename: str):
+        """
+        @brief 返回哈希文件，按 Accept-Encoding 选择预压缩版本
+        @param filename 哈希文件的相对路径
+        """
+        if not filename.endswith(EXTENSIONS):
+            abort(404)
+
+        encoding, name = None, filename
+        for candidate, suffix in ENCODINGS:
+            if request.accept_encodings.quality(candidate) > 0 and os.path.isfile(os.path.join(self.root, filename + suffix)):
+                encoding, name = candidate, filename + suffix
+                break
+
+        # 以原文件名推断 MIME 类型，而不是 .gz / .br
+        response = send_from_directory(self.root, name, max_age=self.max_age,
+                                       mimetype='text/css' if filename.endswith('.css') else 'text/javascript')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    def build(self) -> int:
+        """
+        @brief 生成哈希文件、预压缩版本与 manifest
+        @details 旧的哈希文件保留不删，已缓存旧页面的客户端仍能取得对应的资源；manifest 最后写入
+        @return 处理的文件数
+        """
+        manifest = {}
+        for directory, _, files in os.walk(self.source):
+            if os.path.abspath(directory).startswith(os.path.abspath(self.root)):
+                continue
+
+            for file in files:
+                if not file.endswith(EXTENSIONS):
+                    continue
+
+                path = os.path.join(directory, file)
+                with open(path, 'rb') as f:
+                    body = f.read()
+
+                relative = os.path.relpath(path, self.source).replace(os.sep, '/')
+                stem, ext = os.path.splitext(relative)
+                hashed = f'{stem}.{md5(body).hexdigest()[:10]}{ext}'
+                manifest[relative] = hashed
+
+                target = os.path.join(self.root, hashed)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as f:
+                    f.write(body)
+                with open(target + '.gz', 'wb') as f:
+                    f.write(gzip.compress(body, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target + '.br', 'wb') as f:
+                        f.write(brotli.compress(body, quality=11))
+
+        os.makedirs(self.root, exist_ok=True)
+        temporary = os.path.join(self.root, f'.{MANIFEST}.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(temporary, os.path.join(self.root, MANIFEST))
+
+        self.manifest = manifest
+        return len(manifest)
+
+
+if __name__ == '__main__':
+    # 构建镜像时执行，不依赖数据库等运行配置
+    count = StaticAssets().build()
+    print(f'{count} assets built')
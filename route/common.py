@@ -0,0 +1,77 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file common.py
+@brief app.py 与 asgi.py 共用的请求辅助函数
+@details 两个入口的请求对象都提供 headers 与 remote_addr，默认季度与限流使用的客户端地址在此统一计算；
+         请求参数的解析也放在这里，便于脱离应用单独测试。
+"""
+
+from datetime import datetime
+
+
+def current_season(now: datetime | None = None) -> tuple[int, str]:
+    """
+    @brief 默认季度的动漫库取决于当前时间
+    @param now 当前时间，默认为 datetime.now()
+    @return tuple(年份, 季度)，不属于任何季度的月份为 'all'
+    """
+    time_object: datetime = now or datetime.now()
+    year: int = time_object.year
+
+    season: str = 'all'
+    if 1 < time_object.month < 4:
+        season = 'winter'
+    elif 4 <= time_object.month < 7:
+        season = 'spring'
+    elif 7 <= time_object.month < 10:
+        season = 'summer'
+    elif 10 <= time_object.month < 12:
+        season = 'autumn'
+
+    return year, season
+
+
+def real_user_ip(request) -> str:
+    """
+    @brief 反向代理之后的真实客户端地址
+    @param request Flask 或 Quart 的请求对象
+    @return 客户端 IP
+    """
+    if request.headers.get('X-Forwarded-For'):
+        # X-Forwarded-For 可能包含多个 IP，第一个是真实客户端 IP
+        return request.headers.get('X-Forwarded-For').split(',')[0].strip()
+    elif request.headers.get('X-Real-IP'):
+        return request.headers.get('X-Real-IP')
+    else:
+        return request.remote_addr
+
+
+def parse_ids(value: str, limit: int = 100) -> list[int]:
+    """
+    @brief 解析以逗号分隔的 Detail.id 列表
+    @details 忽略空白项，重复的 id 只保留第一次出现的位置
+    @param value 查询参数，例如 '1,2, 3'
+    @param limit id 数量上限
+    @return 去重后的 id 列表
+    @exception ValueError 含有非十进制数字的项，或去重后的数量不在 1~limit 之间
+    """
+    ids = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        # int() 还接受 '1_000' 与全角数字，这里只允许 ASCII 数字
+        if not (item.isascii() and item.isdigit()):
+            raise ValueError(f'invalid id: {item!r}')
+        ids.append(int(item))
+
+    ids = list(dict.fromkeys(ids))
+    if not 1 <= len(ids) <= limit:
+        raise ValueError(f'expected 1 to {limit} ids, got {len(ids)}')
+    return ids
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,124 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file conditional.py
+@brief 页面的条件请求支持
+@details 同一次部署中，页面内容只取决于数据版本与请求参数。ConditionalGet 以二者及构建标识计算 ETag，
+         在请求钩子中比较 If-None-Match，命中时直接返回 304，不会执行任何查询或模板渲染。
+         构建标识由模板与静态资源 manifest 的内容得出，部署修改模板或资源后旧的 ETag 全部失效。
+         Last-Modified 取最新评分日期的零点，只供参考：Web 表或部署的变化不会改变它，
+         因此只带 If-Modified-Since 的请求不返回 304。
+"""
+
+import os
+from datetime import date, datetime, time, timezone
+from hashlib import md5
+from typing import Callable, Iterable
+
+from flask import Flask, Response, g, request
+
+
+def source_digest(*paths: str) -> str:
+    """
+    @brief 计算文件与目录内容的摘要，用作构建标识
+    @param paths 文件或目录路径，不存在的路径忽略
+    @return 摘要字符串
+    """
+    digest = md5()
+    for path in paths:
+        files = [path] if os.path.isfile(path) else sorted(
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(path)
+            for name in names
+        )
+        for file in files:
+            digest.update(os.path.relpath(file, path).encode())
+            with open(file, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+class ConditionalGet(object):
+    """
+    @class ConditionalGet
+    @brief 条件请求扩展
+    @details 用法与其他 Flask 扩展相同: ConditionalGet(app, version=..., latest_date=..., endpoints=...)
+    """
+
+    def __init__(self, app: Flask | None = None, version: Callable[[], str] | None = None,
+                 latest_date: Callable[[], date | None] | None = None, endpoints: Iterable[str] = (),
+                 build_paths: Iterable[str] = ()):
+        """
+        @brief 初始化
+        @param app Flask 应用
+        @param version 返回当前数据版本号的函数
+        @param latest_date 返回最新评分日期的函数
+        @param endpoints 启用条件请求的端点，其内容必须只取决于数据版本、请求参数与构建
+        @param build_paths 除模板目录外参与构建标识的文件或目录，相对于应用目录
+        """
+        self.version = version
+        self.latest_date = latest_date
+        self.endpoints = frozenset(endpoints)
+        self.build_paths = tuple(build_paths)
+        self.build = ''
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        self.build = source_digest(
+            os.path.join(app.root_path, app.template_folder),
+            *(os.path.join(app.root_path, path) for path in self.build_paths)
+        )
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _validators(self) -> tuple[str, datetime | None]:
+        """
+        @brief 计算当前请求的 ETag 与 Last-Modified
+        @return tuple(ETag, Last-Modified)
+        """
+        args = sorted(request.args.items(multi=True))
+        etag = md5(f'{self.build}:{self.version()}:{request.path}:{args}'.encode()).hexdigest()[:16]
+
+        # 最新评分日期只增不减，以其零点作为修改时间，仅供参考
+        latest_date = self.latest_date() if self.latest_date else None
+        last_modified = datetime.combine(latest_date, time(), timezone.utc) if latest_date else None
+
+        return etag, last_modified
+
+    def _applies(self) -> bool:
+        return request.method in ('GET', 'HEAD') and request.endpoint in self.endpoints
+
+    def _before_request(self) -> Response | None:
+        if not self._applies():
+            return None
+
+        etag, last_modified = g.validators = self._validators()
+
+        # Last-Modified 不随 Web 表与部署变化，只带 If-Modified-Since 的请求总是返回完整内容
+        if not request.if_none_match or not request.if_none_match.contains_weak(etag):
+            return None
+
+        response = Response(status=304)
+        self._set_validators(response, etag, last_modified)
+        return response
+
+    def _after_request(self, response: Response) -> Response:
+        validators = g.get('validators')
+        if validators is not None and response.status_code == 200:
+            self._set_validators(response, *validators)
+        return response
+
+    @staticmethod
+    def _set_validators(response: Response, etag: str, last_modified: datetime | None):
+        # 同一版本在压缩前后内容等价，使用弱 ETag
+        response.set_etag(etag, weak=True)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        # 允许浏览器与 CDN 缓存，但每次使用前都要重新验证
+        response.cache_control.no_cache = True
+
+
+if __name__ == '__main__':
+    pass
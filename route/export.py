@@ -0,0 +1,97 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file export.py
+@brief 批量导出接口
+@details /export/catalog.<fmt> 导出最新评分日的全部动画，/export/scores.<fmt> 导出评分历史，
+         fmt 为 ndjson 或 csv。响应由生成器逐行输出，一次导出只需一次顺序扫描。
+"""
+
+import csv
+import json
+from datetime import date
+from io import StringIO
+from typing import Iterable, Iterator
+
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context
+
+from database.export import ExportService, CATALOG_FIELDS, SCORE_FIELDS
+
+# 创建导出蓝图
+export_bp = Blueprint('export', __name__, url_prefix='/export')
+
+MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _ndjson(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=str) + '\n'
+
+
+def _csv(rows: Iterable[dict], fields: tuple[str, ...], chunk: int = 500) -> Iterator[str]:
+    # 每 chunk 行输出一次，列表与字典列以 JSON 字符串写入
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow({
+            key: json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+            for key, value in row.items()
+        })
+        if count % chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def _stream(rows: Iterable[dict], fields: tuple[str, ...], fmt: str, filename: str) -> Response:
+    if fmt not in MIMETYPES:
+        abort(404)
+
+    body = _ndjson(rows) if fmt == 'ndjson' else _csv(rows, fields)
+    response = Response(stream_with_context(body), mimetype=MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+    return response
+
+
+def _service() -> ExportService:
+    return current_app.extensions['export_service']
+
+
+@export_bp.route('/catalog.<fmt>')
+def catalog(fmt: str):
+    service = _service()
+    latest_date = service.latest_date()
+    if not latest_date:
+        abort(404, description='No score data')
+
+    rows = ExportService.catalog_rows(latest_date, service.web_id_map())
+    return _stream(rows, CATALOG_FIELDS, fmt, f'catalog-{latest_date.isoformat()}')
+
+
+@export_bp.route('/scores.<fmt>')
+def scores(fmt: str):
+    aid: int | None = request.args.get('aid', None, type=int)
+    if aid is None and request.args.get('aid'):
+        abort(400, description='Invalid aid parameter')
+
+    since: date | None = None
+    if request.args.get('since'):
+        try:
+            since = date.fromisoformat(request.args['since'])
+        except ValueError:
+            abort(400, description='Invalid since parameter')
+
+    rows = ExportService.score_rows(_service().web_id_map(), aid=aid, since=since)
+    return _stream(rows, SCORE_FIELDS, fmt, f'scores-{aid}' if aid else 'scores')
+
+
+if __name__ == '__main__':
+    pass
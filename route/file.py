@@ -1,21 +1,53 @@
 # -*- coding:utf-8 -*-
 # AUTHOR: Sun
 
-from flask import Blueprint, abort
-from flask import send_from_directory, send_file
+from flask import Blueprint, abort, request
+from flask import send_file
 
-from constant import ENABLE_INNER_PICTURE, PICTURE_PATH
+from constant import ENABLE_INNER_PICTURE, PICTURE_PATH, PICTURE_CACHE_DIR, PICTURE_HOT_BYTES
+from route.picture import PictureStore, SIZES, FORMATS
 
 # 创建错误处理蓝图
 file_bp = Blueprint('file', __name__)
 
+picture_store = PictureStore(PICTURE_PATH, PICTURE_CACHE_DIR, hot_bytes=PICTURE_HOT_BYTES)
+
+
+@file_bp.app_template_global()
+def picture_formats() -> tuple[str, ...]:
+    """
+    @brief 模板中可使用的缩略图格式，未启用内部图片或未安装 Pillow 时为空
+    """
+    return picture_store.formats if ENABLE_INNER_PICTURE else ()
+
+
+@file_bp.app_template_global()
+def thumbnail_url(src: str, size: str, fmt: str) -> str:
+    """
+    @brief 模板中的缩略图链接，带有原图版本，封面替换后链接随之变化
+    @param src 原图链接，形如 /picture/<id>
+    @param size 尺寸名
+    @param fmt 格式
+    """
+    url = f'{src}/{size}.{fmt}'
+    version = picture_store.version(int(src.rsplit('/', 1)[-1]))
+    return f'{url}?v={version}' if version else url
+
 
 @file_bp.route('/picture/<int:pid>')
 def picture(pid: int):
     if not ENABLE_INNER_PICTURE:
         abort(404)
 
-    return send_from_directory(PICTURE_PATH, str(pid) + '.jpg')
+    return picture_store.send(pid) or abort(404)
+
+
+@file_bp.route('/picture/<int:pid>/<size>.<fmt>')
+def thumbnail(pid: int, size: str, fmt: str):
+    if not ENABLE_INNER_PICTURE or size not in SIZES or fmt not in FORMATS:
+        abort(404)
+
+    return picture_store.send(pid, size, fmt, request.args.get('v')) or abort(404)
 
 @file_bp.route('/robots.txt')
 def robot():
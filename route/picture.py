@@ -0,0 +1,269 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file picture.py
+@brief 封面图片的缩略图生成与服务
+@details 列表页的卡片只需要小尺寸封面。PictureStore 在首次访问或批量预热时用 Pillow 生成各尺寸的 JPEG / WebP
+         缩略图并写入磁盘，之后直接以文件响应(gunicorn 下经 sendfile 零拷贝发送)；首页等最常访问的小图
+         另外保存在进程内的热点 LRU 中，不再读取磁盘。
+         爬虫可能替换同一 id 的封面：缩略图早于原图时重新生成，页面中的缩略图链接带有原图修改时间 v，
+         只有 v 与当前原图一致的缩略图响应带有长期 immutable 缓存头，原图与回退的原图只短期缓存并以 ETag 重新验证。
+         未安装 Pillow 时不生成缩略图，所有尺寸回退到原图。
+"""
+
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import md5
+from importlib.util import find_spec
+from threading import Lock, get_ident
+
+from flask import Response, request, send_file
+
+# Pillow 导入较慢且只在生成缩略图时需要，首次使用时再导入
+HAS_PILLOW = find_spec('PIL') is not None
+
+logger = logging.getLogger(__name__)
+
+# 缩略图尺寸名 -> 边界框(宽, 高)，按 2 倍像素密度取值；卡片图片最高显示 250px
+SIZES: dict[str, tuple[int, int]] = {
+    'card': (400, 500),
+    'detail': (800, 1000),
+}
+
+# 输出格式 -> (Pillow 格式名, MIME 类型, 保存参数)
+FORMATS: dict[str, tuple[str, str, dict]] = {
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 6}),
+}
+
+
+class PictureStore(object):
+    """
+    @class PictureStore
+    @brief 封面图片仓库
+    @details 原图位于 root/<id>.jpg，缩略图位于 cache_dir/<尺寸>/<id>.<格式>
+    """
+
+    def __init__(self, root: str, cache_dir: str, hot_bytes: int = 32 * 1024 * 1024,
+                 hot_item_bytes: int = 256 * 1024, max_age: int = 365 * 24 * 3600, short_max_age: int = 600):
+        """
+        @brief 初始化
+        @param root 原图目录
+        @param cache_dir 缩略图目录
+        @param hot_bytes 热点 LRU 的字节上限，为 0 时不使用
+        @param hot_item_bytes 可进入热点 LRU 的单张图片上限
+        @param max_age 带版本的缩略图响应的缓存时间(秒)
+        @param short_max_age 原图、回退原图以及不带当前版本的缩略图响应的缓存时间(秒)
+        """
+        self.root = root
+        self.cache_dir = cache_dir
+        self.hot_bytes = hot_bytes
+        self.hot_item_bytes = hot_item_bytes
+        self.max_age = max_age
+        self.short_max_age = short_max_age
+
+        # (id, 尺寸, 格式) -> (图片字节, ETag, 修改时间, 原图版本)
+        self._hot: OrderedDict[tuple[int, str, str], tuple[bytes, str, float, str]] = OrderedDict()
+        self._hot_size = 0
+        self._lock = Lock()
+        self._formats: tuple[str, ...] | None = None
+
+    @property
+    def formats(self) -> tuple[str, ...]:
+        """
+        @brief 可生成的缩略图格式
+        @return 未安装 Pillow 时为空
+        """
+        if self._formats is None:
+            if not HAS_PILLOW:
+                self._formats = ()
+            else:
+                from PIL import features
+                self._formats = ('webp', 'jpg') if features.check('webp') else ('jpg',)
+        return self._formats
+
+    def original_path(self, pid: int) -> str:
+        return os.path.join(self.root, f'{pid}.jpg')
+
+    def variant_path(self, pid: int, size: str, fmt: str) -> str:
+        return os.path.join(self.cache_dir, size, f'{pid}.{fmt}')
+
+    def version(self, pid: int) -> str | None:
+        """
+        @brief 原图版本，由修改时间得出，用于缩略图链接的 v 参数
+        @param pid 动画 id
+        @return 版本字符串；原图不存在时返回 None
+        """
+        try:
+            return f'{os.stat(self.original_path(pid)).st_mtime_ns:x}'
+        except OSError:
+            return None
+
+    def generate(self, pid: int, size: str, fmt: str) -> str | None:
+        """
+        @brief 生成一张缩略图
+        @details 先写入临时文件再改名，并发生成同一张图时不会读到半成品；已有缩略图早于原图时重新生成
+        @param pid 动画 id
+        @param size 尺寸名
+        @param fmt 格式
+        @return 缩略图路径；原图不存在或无法生成时返回 None
+        """
+        path = self.variant_path(pid, size, fmt)
+        original = self.original_path(pid)
+        try:
+            original_mtime = os.stat(original).st_mtime_ns
+        except OSError:
+            return None
+
+        try:
+            if os.stat(path).st_mtime_ns >= original_mtime:
+                return path
+        except OSError:
+            pass
+
+        if fmt not in self.formats:
+            return None
+
+        from PIL import Image
+
+        pil_format, _, options = FORMATS[fmt]
+        temporary = f'{path}.{os.getpid()}.{get_ident()}.tmp'
+        try:
+            with Image.open(original) as image:
+                image.thumbnail(SIZES[size])
+                if image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                image.save(temporary, pil_format, **options)
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.warning('thumbnail %s/%s.%s failed: %s', size, pid, fmt, e)
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return None
+
+        return path
+
+    def prewarm(self, sizes=None, fmts=None, workers: int = 4) -> int:
+        """
+        @brief 为原图目录中的全部图片生成缩略图
+        @details Pillow 编解码时释放 GIL，使用线程池并行生成
+        @param sizes 尺寸名列表，默认全部
+        @param fmts 格式列表，默认全部可用格式
+        @param workers 线程数
+        @return 生成或已存在的缩略图数量
+        """
+        tasks = [
+            (int(stem), size, fmt)
+            for stem, ext in (os.path.splitext(entry.name) for entry in os.scandir(self.root))
+            if ext == '.jpg' and stem.isdigit()
+            for size in sizes or SIZES
+            for fmt in fmts or self.formats
+        ]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return sum(1 for path in executor.map(lambda task: self.generate(*task), tasks) if path)
+
+    def _hot_get(self, key, version: str) -> tuple[bytes, str, float, str] | None:
+        with self._lock:
+            entry = self._hot.get(key)
+            if entry is None:
+                return None
+            if entry[3] != version:
+                # 原图已被替换
+                self._hot_pop(key)
+                return None
+            self._hot.move_to_end(key)
+            return entry
+
+    def _hot_put(self, key, path: str, etag: str, mtime: float, version: str):
+        if self.hot_bytes <= 0 or os.path.getsize(path) > self.hot_item_bytes:
+            return
+
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        with self._lock:
+            self._hot_pop(key)
+            self._hot[key] = (data, etag, mtime, version)
+            self._hot_size += len(data)
+            while self._hot_size > self.hot_bytes:
+                _, (evicted, _, _, _) = self._hot.popitem(last=False)
+                self._hot_size -= len(evicted)
+
+    def _hot_pop(self, key):
+        entry = self._hot.pop(key, None)
+        if entry is not None:
+            self._hot_size -= len(entry[0])
+
+    def _cache_headers(self, response: Response, immutable: bool) -> Response:
+        response.cache_control.public = True
+        if immutable:
+            response.cache_control.max_age = self.max_age
+            response.cache_control.immutable = True
+        else:
+            # 封面可能被替换，短期缓存后以 ETag 重新验证
+            response.cache_control.max_age = self.short_max_age
+            response.cache_control.immutable = False
+        return response
+
+    def send(self, pid: int, size: str | None = None, fmt: str = 'jpg', version: str | None = None) -> Response | None:
+        """
+        @brief 返回图片响应
+        @details 缩略图且 version 与当前原图版本一致时带有长期 immutable 缓存头，其余响应只短期缓存
+        @param pid 动画 id
+        @param size 尺寸名，为 None 时返回原图
+        @param fmt 格式
+        @param version 链接中的原图版本
+        @return 图片响应；图片不存在时返回 None
+        """
+        current = self.version(pid)
+        if current is None:
+            return None
+
+        mimetype = FORMATS[fmt][1]
+        entry = self._hot_get((pid, size or '', fmt), current)
+        if entry is None:
+            path = self.generate(pid, size, fmt) if size else None
+            if path is None:
+                # 原图只有 JPEG；未安装 Pillow 或生成失败时以原图代替缩略图，按原图的键缓存与计算缓存头
+                if fmt != 'jpg':
+                    return None
+                size = None
+                entry = self._hot_get((pid, '', fmt), current)
+        else:
+            path = None
+
+        key = (pid, size or '', fmt)
+        immutable = size is not None and version == current
+
+        if entry is not None:
+            data, etag, mtime, _ = entry
+            response = Response(data, mimetype=mimetype)
+            response.set_etag(etag)
+            response.last_modified = mtime
+            return self._cache_headers(response.make_conditional(request), immutable)
+
+        if path is None:
+            path = self.original_path(pid)
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        etag = md5(f'{path}:{stat.st_mtime_ns}:{stat.st_size}'.encode()).hexdigest()[:16]
+        self._hot_put(key, path, etag, stat.st_mtime, current)
+
+        response = send_file(path, mimetype=mimetype, etag=etag, conditional=True,
+                             max_age=self.max_age if immutable else self.short_max_age)
+        return self._cache_headers(response, immutable)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,196 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file prerender.py
+@brief 预生成页面的导出与服务
+@details 常用的首页、动漫库组合与热门详情页只在每日评分写入后变化。export 将这些页面渲染为静态 HTML，
+         并同时写入 gzip / brotli 预压缩版本，目录以数据版本号命名；服务时按当前数据版本查找文件，
+         根据 Accept-Encoding 选择压缩版本并支持 ETag / Last-Modified 条件请求，
+         不常见的组合与尚未导出的版本回退到动态渲染。
+"""
+
+import gzip
+import logging
+import os
+import re
+import shutil
+from hashlib import md5
+from typing import Callable, Iterable
+
+from flask import Flask, Response, request, send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+_LIBRARY = re.compile(r'^/library/(\d{4}|all)/(spring|summer|autumn|winter|all)/(\d+)$')
+_DETAIL = re.compile(r'^/detail/(\d+)$')
+
+# 预压缩版本，按优先级排列
+ENCODINGS: tuple[tuple[str, str], ...] = (('br', '.br'), ('gzip', '.gz'))
+
+
+def page_file(path: str, args) -> str | None:
+    """
+    @brief 将请求映射为导出目录中的相对文件名
+    @details 动漫库只接受 page 参数，cursor 只影响查询方式，不影响页面内容
+    @param path 请求路径
+    @param args 查询参数
+    @return 相对文件名；不属于预生成范围时返回 None
+    """
+    if path == '/':
+        return None if args else 'index.html'
+
+    match = _DETAIL.match(path)
+    if match:
+        return None if args else f'detail/{int(match.group(1))}.html'
+
+    match = _LIBRARY.match(path)
+    if match:
+        if set(args.keys()) - {'page', 'cursor'}:
+            return None
+        page = args.get('page', '1')
+        if not page.isdigit() or int(page) < 1:
+            return None
+        year, season, vote = match.groups()
+        return f'library/{year}/{season}/{int(vote)}/{int(page)}.html'
+
+    return None
+
+
+class PrerenderedPages(object):
+    """
+    @class PrerenderedPages
+    @brief 预生成页面扩展
+    @details 用法与其他 Flask 扩展相同: pages = PrerenderedPages(app, root, version=data_version.get)
+    """
+
+    def __init__(self, app: Flask | None = None, root: str = 'export', version: Callable[[], str] | None = None,
+                 keep: int = 2):
+        """
+        @brief 初始化
+        @param app Flask 应用
+        @param root 导出根目录
+        @param version 返回当前数据版本号的函数
+        @param keep 保留的版本目录数量
+        """
+        self.root = root
+        self.version = version
+        self.keep = keep
+        self.serving = True
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.before_request(self.serve)
+
+    def serve(self) -> Response | None:
+        """
+        @brief 请求钩子：存在当前版本的预生成文件时直接返回
+        @return 文件响应；不存在时返回 None，继续动态渲染
+        """
+        if not self.serving or self.version is None or request.method not in ('GET', 'HEAD'):
+            return None
+
+        relative = page_file(request.path, request.args)
+        if relative is None:
+            return None
+
+        version = self.version()
+        path = os.path.join(self.root, version, relative)
+
+        encoding, filename = None, path
+        for name, suffix in ENCODINGS:
+            if request.accept_encodings.quality(name) > 0 and os.path.isfile(path + suffix):
+                encoding, filename = name, path + suffix
+                break
+
+        if encoding is None and not os.path.isfile(path):
+            return None
+
+        # 内容完全由数据版本与路径决定，不同编码使用不同的强 ETag
+        etag = md5(f'{version}:{relative}'.encode()).hexdigest()[:16]
+        if encoding:
+            etag = f'{etag}-{encoding}'
+
+        response = send_file(filename, mimetype='text/html', etag=etag, conditional=True, max_age=0)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    @staticmethod
+    def write(directory: str, relative: str, body: bytes):
+        """
+        @brief 写入一个页面及其预压缩版本
+        @param directory 版本目录
+        @param relative 相对文件名
+        @param body 页面内容
+        """
+        path = os.path.join(directory, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, 'wb') as f:
+            f.write(body)
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(body, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(body, quality=11))
+
+    def export(self, client, urls: Iterable[str]) -> tuple[str, int]:
+        """
+        @brief 渲染并导出页面
+        @details 先写入临时目录，完成后整体改名为版本目录，服务中的请求不会看到半成品；
+                 最后只保留最近 keep 个版本目录
+        @param client 应用的测试客户端
+        @param urls 需要导出的地址
+        @return tuple(版本号, 导出的页面数)
+        """
+        version = self.version()
+        directory = os.path.join(self.root, version)
+        temporary = os.path.join(self.root, f'.{version}.tmp')
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+
+        serving, self.serving = self.serving, False
+        count = 0
+        try:
+            for url in urls:
+                path, _, query = url.partition('?')
+                args = dict(item.split('=', 1) for item in query.split('&') if item)
+                relative = page_file(path, args)
+                if relative is None:
+                    continue
+
+                response = client.get(url)
+                if response.status_code != 200:
+                    logger.warning('skip %s: %d', url, response.status_code)
+                    continue
+
+                self.write(temporary, relative, response.get_data())
+                count += 1
+        finally:
+            self.serving = serving
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.rename(temporary, directory)
+
+        # 清理旧版本
+        versions = sorted(
+            (entry for entry in os.scandir(self.root) if entry.is_dir() and not entry.name.startswith('.')),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True
+        )
+        for entry in versions[self.keep:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+        return version, count
+
+
+if __name__ == '__main__':
+    pass
@@ -85,6 +85,9 @@ function constructPlatformSeries(platformOrder, raws) {
     return platformSeries;
 }
 
+// 当前图表实例，切换时间范围时需先销毁
+let trendChart = null;
+
 function constructChart(rawList) {
     const labels = constructLabels(rawList);
     const platformOrder = constructPlatformOrder(rawList);
@@ -111,7 +114,11 @@ function constructChart(rawList) {
     const ctx = document.getElementById('scoreTrendChart');
     if (!ctx) return;
 
-    new Chart(ctx, {
+    if (trendChart) {
+        trendChart.destroy();
+    }
+
+    trendChart = new Chart(ctx, {
         type: 'line',
         data: {
             labels,
@@ -174,4 +181,34 @@ function constructChart(rawList) {
             }
         }
     });
-}
\ No newline at end of file
+}
+
+// 时间范围切换：首次切换到某个范围时才向后端请求，长范围由后端聚合并降采样
+function bindRangeButtons(initialList) {
+    const container = document.querySelector('.chart-ranges');
+    if (!container) return;
+
+    const aid = container.dataset.aid;
+    const loaded = {7: initialList};
+
+    container.querySelectorAll('.chart-range').forEach(button => {
+        button.addEventListener('click', async () => {
+            const delay = Number(button.dataset.delay);
+
+            container.querySelectorAll('.chart-range').forEach(b => b.classList.remove('active'));
+            button.classList.add('active');
+
+            if (!loaded[delay]) {
+                try {
+                    const response = await fetch(`/score/${aid}/${delay}?granularity=auto&points=200`);
+                    if (!response.ok) return;
+                    loaded[delay] = await response.json();
+                } catch (e) {
+                    return;
+                }
+            }
+
+            constructChart(loaded[delay]);
+        });
+    });
+}
@@ -0,0 +1,36 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file support.py
+@brief 测试使用的内存 SQLite 应用
+"""
+
+from flask import Flask
+
+import benchmark.seed  # 注册 SQLite 下 YEAR / TINYINT 的建表映射
+from database.model import DB
+
+
+class SQLiteTestCase(object):
+    """
+    @class SQLiteTestCase
+    @brief 混入类：每个用例使用一个新建全部表的内存数据库，并推入应用上下文
+    """
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        DB.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        DB.create_all()
+
+    def tearDown(self):
+        DB.session.remove()
+        DB.drop_all()
+        self.context.pop()
+
+
+if __name__ == '__main__':
+    pass
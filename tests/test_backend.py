@@ -0,0 +1,62 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_backend.py
+@brief 文件系统共享缓存的租约语义
+"""
+
+import struct
+import tempfile
+import unittest
+from threading import Barrier, Thread
+
+from caching.backend import LeaseFileSystemCache
+
+
+class LeaseFileSystemCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LeaseFileSystemCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_add_is_exclusive(self):
+        self.assertTrue(self.cache.add('lock:a', 1, timeout=30))
+        self.assertFalse(self.cache.add('lock:a', 1, timeout=30))
+        self.assertEqual(self.cache.get('lock:a'), 1)
+
+        self.cache.delete('lock:a')
+        self.assertTrue(self.cache.add('lock:a', 2, timeout=30))
+
+    def test_expired_lease_is_reclaimed(self):
+        self.assertTrue(self.cache.add('lock:a', 1, timeout=30))
+        # 将过期时间改写为很早以前
+        with open(self.cache._get_filename('lock:a'), 'r+b') as f:
+            f.write(struct.pack('I', 1))
+
+        self.assertTrue(self.cache.add('lock:a', 2, timeout=30))
+        self.assertEqual(self.cache.get('lock:a'), 2)
+
+    def test_concurrent_add(self):
+        workers = 16
+        barrier = Barrier(workers)
+        results = []
+
+        def contend():
+            barrier.wait()
+            results.append(self.cache.add('lock:b', 1, timeout=30))
+
+        threads = [Thread(target=contend) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
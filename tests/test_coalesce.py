@@ -0,0 +1,76 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_coalesce.py
+@brief 按条目批量缓存：不存在的条目以 False 记录，不再回源
+"""
+
+import unittest
+from unittest import mock
+
+from flask import Flask
+from flask_caching import Cache
+
+from caching.coalesce import CoalescingCache
+
+
+class GetOrSetManyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.cache = Cache(self.app, config={'CACHE_TYPE': 'caching.backend.LRUCache', 'CACHE_THRESHOLD': 1000})
+        self.context = self.app.app_context()
+        self.context.push()
+        self.addCleanup(self.context.pop)
+
+        self.version = 'v1'
+        self.coalesced = CoalescingCache(self.cache, version=lambda: self.version)
+        self.calls = []
+
+    def load(self, ids: list) -> dict:
+        # 偶数 id 存在，值为 0 的条目用于确认假值不会与 False 标记混淆
+        self.calls.append(list(ids))
+        return {aid: aid * 10 for aid in ids if aid % 2 == 0}
+
+    def get(self, ids):
+        return self.coalesced.get_or_set_many('detail', ids, self.load)
+
+    def test_missing_ids_are_cached_as_false(self):
+        self.assertEqual(self.get([1, 2, 3, 4]), {2: 20, 4: 40})
+        self.assertIs(self.cache.get('v1:item:detail:1'), False)
+        self.assertEqual(self.cache.get('v1:item:detail:2'), 20)
+
+        # 再次请求时存在与不存在的 id 都命中缓存
+        self.assertEqual(self.get([4, 3, 2, 1]), {4: 40, 2: 20})
+        self.assertEqual(self.calls, [[1, 2, 3, 4]])
+
+    def test_only_missing_ids_are_loaded(self):
+        self.get([1, 2])
+        self.assertEqual(self.get([1, 2, 5, 6]), {2: 20, 6: 60})
+        self.assertEqual(self.calls, [[1, 2], [5, 6]])
+
+    def test_falsy_values_are_kept(self):
+        self.assertEqual(self.get([0]), {0: 0})
+        self.assertEqual(self.get([0]), {0: 0})
+        self.assertEqual(self.calls, [[0]])
+
+    def test_version_change_reloads(self):
+        self.get([1, 2])
+        self.version = 'v2'
+        self.get([1, 2])
+        self.assertEqual(self.calls, [[1, 2], [1, 2]])
+
+    def test_cache_failure_falls_back_to_load(self):
+        with mock.patch.object(self.cache, 'get_many', side_effect=RuntimeError('cache down')):
+            with self.assertLogs('caching.coalesce', level='ERROR'):
+                self.assertEqual(self.get([1, 2]), {2: 20})
+        self.assertEqual(self.calls, [[1, 2]])
+
+    def test_empty_ids(self):
+        self.assertEqual(self.get([]), {})
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_common.py
+@brief app.py 与 asgi.py 共用的请求辅助函数
+"""
+
+import unittest
+from datetime import datetime
+
+from flask import Flask, request
+
+from route.common import current_season, real_user_ip, parse_ids
+
+
+class CommonTest(unittest.TestCase):
+
+    def test_current_season(self):
+        cases = {1: 'all', 2: 'winter', 4: 'spring', 6: 'spring', 7: 'summer', 10: 'autumn', 12: 'all'}
+        for month, season in cases.items():
+            self.assertEqual(current_season(datetime(2025, month, 15)), (2025, season), month)
+
+    def test_real_user_ip(self):
+        app = Flask(__name__)
+        cases = (
+            ({'X-Forwarded-For': '1.2.3.4, 10.0.0.1'}, '1.2.3.4'),
+            ({'X-Real-IP': '5.6.7.8'}, '5.6.7.8'),
+            ({}, '9.9.9.9'),
+        )
+        for headers, expected in cases:
+            with app.test_request_context(headers=headers, environ_base={'REMOTE_ADDR': '9.9.9.9'}):
+                self.assertEqual(real_user_ip(request), expected)
+
+    def test_parse_ids(self):
+        self.assertEqual(parse_ids('3,1,2'), [3, 1, 2])
+        # 空白项忽略，重复项保留第一次出现的位置
+        self.assertEqual(parse_ids(' 5, ,2,5,,'), [5, 2])
+        self.assertEqual(parse_ids(','.join(['7'] * 200)), [7])
+        self.assertEqual(parse_ids(','.join(map(str, range(1, 101)))), list(range(1, 101)))
+
+    def test_parse_ids_rejects(self):
+        for value in ('', ' , ', 'a', '1,x', '-1', '1.5', '1_000', '１２', ','.join(map(str, range(101)))):
+            with self.assertRaises(ValueError, msg=value):
+                parse_ids(value)
+        with self.assertRaises(ValueError):
+            parse_ids('1,2,3', limit=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
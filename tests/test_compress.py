@@ -0,0 +1,60 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_compress.py
+@brief 页面缓存填充时的预压缩
+"""
+
+import gzip
+import unittest
+
+from flask import Flask, Response
+
+from caching.compress import Compression, CompressedPage
+
+
+class CompressionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.compression = Compression(self.app, min_size=64)
+
+    def test_json_view_result_is_compressed(self):
+        value = [{'date': f'2025-05-{day:02d}', 'score': 7.5} for day in range(1, 31)]
+        with self.app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+            expected = self.app.json.response(value).get_data()
+            page = self.compression.encode(value)
+            self.assertIsInstance(page, CompressedPage)
+            self.assertEqual(page.mimetype, 'application/json')
+
+            response = self.compression.decode(page)
+            self.assertEqual(response.mimetype, 'application/json')
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertEqual(gzip.decompress(response.get_data()), expected)
+
+        with self.app.test_request_context():
+            self.assertEqual(self.compression.decode(page).get_data(), expected)
+
+    def test_html_view_result_is_compressed(self):
+        value = '<p>anime</p>' * 20
+        with self.app.test_request_context():
+            page = self.compression.encode(value)
+        self.assertIsInstance(page, CompressedPage)
+        self.assertEqual(page.mimetype, 'text/html')
+        self.assertEqual(page.body, value.encode())
+
+    def test_small_values_are_unchanged(self):
+        with self.app.test_request_context():
+            self.assertEqual(self.compression.encode([1, 2]), [1, 2])
+            self.assertEqual(self.compression.encode('ok'), 'ok')
+            self.assertIsNone(self.compression.encode(None))
+
+    def test_response_is_rejected(self):
+        with self.app.test_request_context():
+            with self.assertRaises(TypeError):
+                self.compression.encode(Response('x'))
+
+
+if __name__ == '__main__':
+    unittest.main()
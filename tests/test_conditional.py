@@ -0,0 +1,81 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_conditional.py
+@brief 页面条件请求的 ETag 与 304 判定
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from flask import Flask
+
+from route.conditional import ConditionalGet
+
+
+class ConditionalGetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.tmp.name, 'templates'))
+        self.write('templates/page.html', 'v1')
+
+        self.version = 'data-1'
+        self.renders = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, text: str):
+        with open(os.path.join(self.tmp.name, name), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def client(self):
+        app = Flask(__name__, root_path=self.tmp.name)
+
+        @app.route('/page')
+        def page():
+            self.renders += 1
+            return 'page'
+
+        ConditionalGet(app, version=lambda: self.version, latest_date=lambda: date(2025, 5, 1),
+                       endpoints=('page',), build_paths=('manifest.json',))
+        return app.test_client()
+
+    def test_if_none_match(self):
+        client = self.client()
+        response = client.get('/page')
+        etag = response.headers['ETag']
+        self.assertIn('Last-Modified', response.headers)
+
+        self.assertEqual(client.get('/page', headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.renders, 1)
+
+        # 数据版本变化
+        self.version = 'data-2'
+        self.assertEqual(client.get('/page', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_if_modified_since_alone_is_not_answered(self):
+        client = self.client()
+        last_modified = client.get('/page').headers['Last-Modified']
+        response = client.get('/page', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.renders, 2)
+
+    def test_deploy_changes_etag(self):
+        etag = self.client().get('/page').headers['ETag']
+        self.assertEqual(self.client().get('/page').headers['ETag'], etag)
+
+        self.write('templates/page.html', 'v2')
+        changed = self.client().get('/page').headers['ETag']
+        self.assertNotEqual(changed, etag)
+
+        self.write('manifest.json', '{"css/base.css": "css/base.0123abcd.css"}')
+        self.assertNotEqual(self.client().get('/page').headers['ETag'], changed)
+
+
+if __name__ == '__main__':
+    unittest.main()
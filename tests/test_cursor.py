@@ -0,0 +1,44 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_cursor.py
+@brief 动漫库分页游标的编码与校验
+"""
+
+import json
+import unittest
+from base64 import urlsafe_b64encode
+from datetime import date
+from decimal import Decimal
+
+from database.service import PaginationService
+
+ON_DATE = date(2025, 5, 1)
+SCOPE = (2024, 'spring', 0, 2)
+
+
+class CursorTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        token = PaginationService.encode_cursor(ON_DATE, SCOPE, Decimal('8.50'), 120, 7, 20)
+        self.assertEqual(PaginationService.decode_cursor(token, ON_DATE, SCOPE), (Decimal('8.50'), 120, 7, 20))
+
+    def test_scope_mismatch(self):
+        token = PaginationService.encode_cursor(ON_DATE, SCOPE, Decimal('8.50'), 120, 7)
+        self.assertIsNone(PaginationService.decode_cursor(token, ON_DATE, (2024, 'spring', 0, 5)))
+        self.assertIsNone(PaginationService.decode_cursor(token, ON_DATE, (None, 'spring', 0, 2)))
+        self.assertIsNone(PaginationService.decode_cursor(token, ON_DATE, (2024, 'spring', 100, 2)))
+        self.assertIsNone(PaginationService.decode_cursor(token, date(2025, 5, 2), SCOPE))
+
+    def test_malformed(self):
+        def forge(payload) -> str:
+            return urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        for token in ('!!!', 'e30', forge([ON_DATE.isoformat(), list(SCOPE), 'abc', 1, 1, None]),
+                      forge([ON_DATE.isoformat(), list(SCOPE), '1', 1, None, None])):
+            self.assertIsNone(PaginationService.decode_cursor(token, ON_DATE, SCOPE))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_detail.py
+@brief 详情数据的两次查询加载：单个 id 的倒序读取与多个 id 的 ROW_NUMBER 截取
+"""
+
+import unittest
+from datetime import date, timedelta
+
+from database.detail import DetailService
+from database.model import DB, Detail, Score, Web
+from database.service import WebIDMap
+from tests.support import SQLiteTestCase
+
+LATEST = date(2025, 5, 10)
+
+
+class DetailServiceTest(SQLiteTestCase, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        DB.session.add(Web(id=1, name='Bangumi', host='bgm.tv', format='/subject/{}', priority=1))
+        for aid in (1, 2, 3):
+            DB.session.add(Detail(id=aid, name=f'anime {aid}', all=[f'anime {aid}'], web=1, webId=100 + aid))
+
+        # 1: 连续 10 天；2: 中间缺了几天；3: 没有评分
+        for days_ago in range(10):
+            self.score(1, days_ago, 7.0 + days_ago / 10)
+        for days_ago in (0, 1, 5, 6):
+            self.score(2, days_ago, 8.0 - days_ago / 10)
+        DB.session.commit()
+
+        self.web_id_map = WebIDMap(DB.session.query(Web).all())
+
+    @staticmethod
+    def score(aid: int, days_ago: int, value: float):
+        DB.session.add(Score(
+            detailId=aid, detailScore={'1': [value, 100]}, score=value, vote=100 - days_ago,
+            date=LATEST - timedelta(days=days_ago),
+        ))
+
+    def history(self, ids: list[int], delay: int) -> dict[int, list[date]]:
+        result: dict[int, list[date]] = {}
+        for row in DB.session.execute(DetailService.history_select(ids, delay)):
+            result.setdefault(row.detailId, []).append(row.date)
+        return result
+
+    def test_single_id_path_matches_row_number_path(self):
+        single = DetailService.history_select([1], 3)
+        batch = DetailService.history_select([1, 2], 3)
+        self.assertNotIn('row_number', str(single).lower())
+        self.assertIn('row_number', str(batch).lower())
+
+        batch_rows = self.history([1, 2], 3)
+        for aid in (1, 2):
+            self.assertEqual(self.history([aid], 3)[aid], batch_rows[aid])
+        # 每部动画最多 delay + 1 条，按日期倒序
+        self.assertEqual(batch_rows[1], [LATEST - timedelta(days=d) for d in range(4)])
+        self.assertEqual(batch_rows[2], [LATEST - timedelta(days=d) for d in (0, 1, 5, 6)])
+
+    def test_load_uses_latest_score(self):
+        info, score_list = DetailService.load(1, 3, self.web_id_map)
+
+        self.assertEqual(info.id, 1)
+        self.assertEqual(info.url, 'https://bgm.tv/subject/101')
+        self.assertEqual(info.score, 7.0)
+        self.assertEqual(info.vote, 100)
+        self.assertEqual(dict(info.detail_score), {'Bangumi': (7.0, 100)})
+        self.assertEqual([item.date for item in score_list], [LATEST - timedelta(days=d) for d in range(4)])
+
+    def test_assemble_trims_by_date(self):
+        # 按条数截取的 4 条记录中，超出最新日期前 3 天的记录被去除
+        _, score_list = DetailService.load(2, 3, self.web_id_map)
+        self.assertEqual([item.date for item in score_list], [LATEST, LATEST - timedelta(days=1)])
+
+    def test_load_many_matches_load(self):
+        loaded = DetailService.load_many([2, 3, 1, 2, 404], 7, self.web_id_map)
+
+        # 不存在或没有评分的 id 不在结果中
+        self.assertEqual(set(loaded), {1, 2})
+        for aid in (1, 2):
+            self.assertEqual(loaded[aid], DetailService.load(aid, 7, self.web_id_map))
+        self.assertIsNone(DetailService.load(3, 7, self.web_id_map))
+        self.assertEqual(DetailService.load_many([], 7, self.web_id_map), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
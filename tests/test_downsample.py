@@ -0,0 +1,106 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_downsample.py
+@brief 评分历史的周期聚合与 LTTB 降采样
+"""
+
+import unittest
+from datetime import date, timedelta
+
+from database.data import ScoreListItem, DetailScore
+from database.downsample import aggregate, lttb
+
+START = date(2025, 1, 6)  # 周一
+
+
+def item(day: int, score: float | None, vote: int = 100) -> ScoreListItem:
+    detail_score = DetailScore.of([('Bangumi', (score, vote))] if score is not None else [])
+    return ScoreListItem(detail_score=detail_score, score=score, vote=vote, date=START + timedelta(days=day))
+
+
+def series(days: int) -> list[ScoreListItem]:
+    # 带有起伏的走势，使 LTTB 的选点有意义
+    return [item(day, round(7 + (day % 10) / 10 - (day % 7) / 20, 2), 100 + day) for day in range(days)]
+
+
+class AggregateTest(unittest.TestCase):
+
+    def test_day_returns_copy(self):
+        items = series(5)
+        result = aggregate(items, 'day')
+        self.assertEqual(result, items)
+        self.assertIsNot(result, items)
+
+    def test_week_buckets(self):
+        # 3 周加 2 天共 4 个周期，每个点取周期内最后一天的日期与投票数
+        items = series(23)
+        result = aggregate(items, 'week')
+        self.assertEqual([point.date for point in result], [START + timedelta(days=d) for d in (6, 13, 20, 22)])
+        self.assertEqual([point.vote for point in result], [106, 113, 120, 122])
+        self.assertEqual(result[0].score, round(sum(point.score for point in items[:7]) / 7, 2))
+
+    def test_month_buckets(self):
+        items = series(60)
+        result = aggregate(items, 'month')
+        self.assertEqual([point.date for point in result], [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 6)])
+
+    def test_none_scores(self):
+        items = [item(0, None), item(1, 8.0), item(2, None), item(7, None)]
+        result = aggregate(items, 'week')
+        self.assertEqual(len(result), 2)
+        # None 不参与平均，整周都为 None 时结果为 None
+        self.assertEqual(result[0].score, 8.0)
+        self.assertEqual(result[0].date, items[2].date)
+        self.assertIsNone(result[1].score)
+
+
+class LTTBTest(unittest.TestCase):
+
+    def test_keeps_first_and_last(self):
+        items = series(200)
+        result = lttb(items, 20)
+        self.assertEqual(len(result), 20)
+        self.assertIs(result[0], items[0])
+        self.assertIs(result[-1], items[-1])
+        self.assertEqual([point.date for point in result], sorted(point.date for point in result))
+
+    def test_bucket_count(self):
+        items = series(100)
+        for threshold in (3, 10, 50, 99):
+            self.assertEqual(len(lttb(items, threshold)), threshold)
+            self.assertEqual(len({point.date for point in lttb(items, threshold)}), threshold)
+
+    def test_no_downsampling(self):
+        items = series(10)
+        self.assertEqual(lttb(items, 0), items)
+        self.assertEqual(lttb(items, 2), items)
+        self.assertEqual(lttb(items, 10), items)
+        self.assertEqual(lttb(items, 500), items)
+
+    def test_none_rows_kept_without_downsampling(self):
+        # 无论 threshold 是否生效，不需要降采样时 None 行都原样保留
+        items = [item(0, 7.0), item(1, None), item(2, 7.5), item(3, None)]
+        self.assertEqual(lttb(items, 0), items)
+        self.assertEqual(lttb(items, 4), items)
+        self.assertEqual(lttb(items, 100), items)
+
+    def test_none_rows_dropped_when_downsampling(self):
+        items = series(50)
+        items[0:3] = [item(day, None) for day in range(3)]
+        items[20] = item(20, None)
+
+        result = lttb(items, 10)
+        self.assertEqual(len(result), 10)
+        self.assertTrue(all(point.score is not None for point in result))
+        self.assertIs(result[0], items[3])
+        self.assertIs(result[-1], items[-1])
+
+        # 去掉 None 行后点数已不超过 threshold 时返回全部有评分的行
+        result = lttb(items, 47)
+        self.assertEqual(result, [point for point in items if point.score is not None])
+
+
+if __name__ == '__main__':
+    unittest.main()
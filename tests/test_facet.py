@@ -0,0 +1,91 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_facet.py
+@brief 分面计数的投票数分档边界与 COUNT 查询一致
+"""
+
+import unittest
+from datetime import date
+
+from database.facet import FacetCounts, SEASONS
+from database.model import DB, Detail, Score, Web
+from database.ranking import VOTE_BUCKETS, vote_bucket
+from database.service import QueryService
+from tests.support import SQLiteTestCase
+
+DAY = date(2025, 5, 1)
+
+# 每个分档下界、下界减一，以及没有投票数的评分
+VOTES: tuple[int | None, ...] = (None, *sorted({max(low - 1, 0) for low in VOTE_BUCKETS} | set(VOTE_BUCKETS)))
+
+
+class FacetCountsTest(SQLiteTestCase, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        DB.session.add(Web(id=1, name='Bangumi', host='bgm.tv', format='/subject/{}', priority=1))
+
+        aid = 0
+        for year in (2024, 2025, None):
+            for season in (*SEASONS, None):
+                for vote in VOTES:
+                    aid += 1
+                    DB.session.add(Detail(id=aid, name=f'anime {aid}', year=year, season=season, web=1))
+                    DB.session.add(Score(detailId=aid, score=7.0, vote=vote, date=DAY))
+        # 其他日期的评分不计入
+        DB.session.add(Score(detailId=1, score=7.0, vote=100, date=date(2025, 4, 30)))
+        DB.session.commit()
+
+        self.facets = FacetCounts.load(DAY)
+
+    @staticmethod
+    def expected(year=None, season=None, min_vote=None) -> int:
+        query = QueryService.apply_filters(
+            QueryService.base_query(), year=year, season=season, min_vote=min_vote, on_date=DAY
+        )
+        return query.count()
+
+    def test_bucket_edges_match_count_query(self):
+        for low in VOTE_BUCKETS:
+            self.assertEqual(self.facets.count(min_vote=low), self.expected(min_vote=low), low)
+            self.assertEqual(self.facets.count(2025, 'spring', low), self.expected(2025, 'spring', low), low)
+        self.assertEqual(self.facets.count(), len(VOTES) * 3 * 5)
+
+    def test_sql_bucket_matches_vote_bucket(self):
+        # 每部动画所在的分档与 RankingService 使用的 vote_bucket 一致
+        counted: dict[int, int] = {}
+        for (_, _, bucket), count in self.facets.counts.items():
+            counted[bucket] = counted.get(bucket, 0) + count
+
+        expected: dict[int, int] = {}
+        for vote in VOTES:
+            bucket = vote_bucket(vote)
+            expected[bucket] = expected.get(bucket, 0) + 3 * 5
+        self.assertEqual(counted, expected)
+
+    def test_non_bucket_min_vote(self):
+        self.assertIsNone(self.facets.count(min_vote=150))
+
+        view = self.facets.view(min_vote=150)
+        self.assertEqual(view.years, {})
+        self.assertEqual(view.seasons, {})
+        self.assertEqual(view.votes, {low: self.expected(min_vote=low) for low in VOTE_BUCKETS})
+
+    def test_view(self):
+        view = self.facets.view(year=2025, min_vote=1000)
+
+        self.assertEqual(view.years, {
+            None: self.expected(min_vote=1000),
+            2024: self.expected(2024, min_vote=1000),
+            2025: self.expected(2025, min_vote=1000),
+        })
+        self.assertEqual(view.seasons, {
+            season: self.expected(2025, season, 1000) for season in (None, *SEASONS)
+        })
+        self.assertEqual(view.votes[100], self.expected(2025, min_vote=100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_fragment.py
+@brief 卡片片段缓存的复用、淘汰与版本切换
+"""
+
+import unittest
+from types import SimpleNamespace
+
+from markupsafe import Markup
+
+from caching.fragment import FragmentCache
+
+
+class FragmentCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.version = 'v1'
+        self.rendered = []
+        self.cache = FragmentCache(
+            render=self.render,
+            key=lambda anime: anime.id,
+            version=lambda: self.version,
+            max_entries=3,
+        )
+
+    def render(self, anime) -> Markup:
+        self.rendered.append(anime.id)
+        return Markup('<li>{}@{}</li>').format(anime.name, self.version)
+
+    @staticmethod
+    def anime(aid: int, name: str | None = None):
+        return SimpleNamespace(id=aid, name=name or f'anime {aid}')
+
+    def test_reuses_fragments(self):
+        first = self.cache.join([self.anime(1), self.anime(2)])
+        second = self.cache.join([self.anime(2), self.anime(1)])
+
+        self.assertIsInstance(first, Markup)
+        self.assertEqual(first, '<li>anime 1@v1</li><li>anime 2@v1</li>')
+        self.assertEqual(second, '<li>anime 2@v1</li><li>anime 1@v1</li>')
+        self.assertEqual(self.rendered, [1, 2])
+
+    def test_escapes_once(self):
+        html = self.cache.join([self.anime(1, '<b>&</b>')])
+        self.assertEqual(html, '<li>&lt;b&gt;&amp;&lt;/b&gt;@v1</li>')
+        # 命中时不再转义
+        self.assertEqual(self.cache.join([self.anime(1, '<b>&</b>')]), html)
+
+    def test_version_rollover(self):
+        self.cache.join([self.anime(1), self.anime(2)])
+        self.assertEqual(len(self.cache), 2)
+
+        self.version = 'v2'
+        html = self.cache.join([self.anime(1)])
+
+        # 版本变化时旧片段整体清空，重新渲染
+        self.assertEqual(html, '<li>anime 1@v2</li>')
+        self.assertEqual(self.rendered, [1, 2, 1])
+        self.assertEqual(len(self.cache), 1)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.join([self.anime(1), self.anime(2), self.anime(3)])
+        self.cache.join([self.anime(1)])
+        self.cache.join([self.anime(4)])
+
+        self.assertEqual(len(self.cache), 3)
+        self.rendered.clear()
+        self.cache.join([self.anime(1), self.anime(3), self.anime(4), self.anime(2)])
+        self.assertEqual(self.rendered, [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
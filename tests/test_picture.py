@@ -0,0 +1,104 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_picture.py
+@brief 封面图片的缓存头与缩略图失效
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from route.picture import PictureStore
+
+
+class PictureStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'original')
+        os.makedirs(self.root)
+        self.store = PictureStore(self.root, os.path.join(self.tmp.name, 'cache'))
+        self.app = Flask(__name__)
+
+        self.write(self.store.original_path(1), b'original-v1', 1_000_000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @staticmethod
+    def write(path: str, data: bytes, mtime: int):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        os.utime(path, (mtime, mtime))
+
+    def send(self, *args, **kwargs):
+        with self.app.test_request_context():
+            response = self.store.send(*args, **kwargs)
+            response.direct_passthrough = False
+            return response
+
+    def test_original_is_revalidated(self):
+        response = self.send(1, version=self.store.version(1))
+        self.assertFalse(response.cache_control.immutable)
+        self.assertFalse(response.cache_control.no_cache)
+        self.assertEqual(response.cache_control.max_age, self.store.short_max_age)
+
+    def test_versioned_variant_is_immutable(self):
+        self.write(self.store.variant_path(1, 'card', 'jpg'), b'card', 1_000_100)
+
+        response = self.send(1, 'card', 'jpg', self.store.version(1))
+        self.assertEqual(response.get_data(), b'card')
+        self.assertTrue(response.cache_control.immutable)
+        self.assertEqual(response.cache_control.max_age, self.store.max_age)
+
+        # 不带版本或版本过期的链接只短期缓存
+        self.assertFalse(self.send(1, 'card', 'jpg').cache_control.immutable)
+        self.assertFalse(self.send(1, 'card', 'jpg', 'stale').cache_control.immutable)
+
+    def test_replaced_original_invalidates_variant(self):
+        self.write(self.store.variant_path(1, 'card', 'jpg'), b'card', 1_000_100)
+        old = self.store.version(1)
+        self.assertEqual(self.send(1, 'card', 'jpg', old).get_data(), b'card')
+
+        # 封面被替换，旧缩略图早于原图，无法重新生成时回退到新的原图
+        self.write(self.store.original_path(1), b'original-v2', 1_000_200)
+        with mock.patch.object(PictureStore, 'formats', new_callable=mock.PropertyMock, return_value=()):
+            response = self.send(1, 'card', 'jpg', old)
+        self.assertEqual(response.get_data(), b'original-v2')
+        self.assertFalse(response.cache_control.immutable)
+        self.assertNotIn((1, 'card', 'jpg'), self.store._hot)
+
+    def test_failed_generation_removes_temporary(self):
+        class Image(object):
+            mode = 'RGB'
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def thumbnail(self, size):
+                pass
+
+            def save(self, path, *args, **kwargs):
+                # 写入一部分后失败
+                with open(path, 'wb') as f:
+                    f.write(b'partial')
+                raise OSError('disk full')
+
+        with mock.patch.object(PictureStore, 'formats', new_callable=mock.PropertyMock, return_value=('jpg',)), \
+                mock.patch.dict('sys.modules', {'PIL': mock.Mock(Image=mock.Mock(open=lambda path: Image()))}):
+            self.assertIsNone(self.store.generate(1, 'card', 'jpg'))
+
+        directory = os.path.dirname(self.store.variant_path(1, 'card', 'jpg'))
+        self.assertEqual(os.listdir(directory), [])
+
+if __name__ == '__main__':
+    unittest.main()
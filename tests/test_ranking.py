@@ -0,0 +1,62 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_ranking.py
+@brief 物化排名与同一天重复抓取的评分
+"""
+
+import unittest
+from datetime import date
+
+from database.model import DB, Detail, Score, Web, Ranking
+from database.ranking import RankingService
+from database.service import QueryService
+from tests.support import SQLiteTestCase
+
+DAY = date(2025, 5, 1)
+
+
+class RankingServiceTest(SQLiteTestCase, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        DB.session.add(Web(id=1, name='Bangumi', host='bgm.tv', format='/subject/{}', priority=1))
+        for aid in (1, 2, 3):
+            DB.session.add(Detail(id=aid, name=f'anime {aid}', year=2025, season='spring', web=1))
+        DB.session.add_all([
+            Score(id=1, detailId=1, score=8.0, vote=100, date=DAY),
+            Score(id=2, detailId=2, score=7.0, vote=100, date=DAY),
+            # 同一天重复抓取，ID较大的一行为准
+            Score(id=3, detailId=2, score=9.0, vote=120, date=DAY),
+            Score(id=4, detailId=3, score=6.0, vote=100, date=DAY),
+        ])
+        DB.session.commit()
+
+    def ranked(self) -> list[tuple[int, int]]:
+        query = QueryService.order_by_rank(QueryService.ranked_query(DAY))
+        return [(detail.id, score.id) for detail, score, _ in query.all()]
+
+    def test_keeps_latest_duplicate(self):
+        self.assertEqual(RankingService.materialize(DAY), 3)
+
+        rows = DB.session.query(Ranking.rank, Ranking.detailId, Ranking.scoreId).order_by(Ranking.rank).all()
+        self.assertEqual([tuple(row) for row in rows], [(1, 2, 3), (2, 1, 1), (3, 3, 4)])
+
+    def test_ranked_query_has_no_duplicates(self):
+        RankingService.materialize(DAY)
+
+        self.assertEqual(self.ranked(), [(2, 3), (1, 1), (3, 4)])
+        self.assertEqual(QueryService.count_ranked(DAY), 3)
+
+    def test_recreates_table_without_score_id(self):
+        Ranking.__table__.drop(DB.engine)
+        DB.session.execute(DB.text('CREATE TABLE ranking (id INTEGER PRIMARY KEY, date DATE, "rank" INTEGER)'))
+        DB.session.commit()
+
+        RankingService.materialize(DAY)
+        self.assertEqual(self.ranked(), [(2, 3), (1, 1), (3, 4)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_search_index.py
+@brief n-gram 搜索索引与 LIKE 查询的结果一致性
+"""
+
+import unittest
+from datetime import date
+from unittest import mock
+
+from database.model import DB, Detail, NameMap
+from database.search_index import NGramIndex
+from database.service import QueryService
+from tests.support import SQLiteTestCase
+
+KEYWORDS = ('巨人', '进击的巨人', 'attack', 'ATTACK on', 'titan', 'n t', '物语', 'Gate', 'zz')
+
+
+class NGramIndexTest(SQLiteTestCase, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.add(1, ['进击的巨人', 'Attack on Titan'])
+        self.add(2, ['巨人之星', 'Kyojin no Hoshi'])
+        self.add(3, ['物语系列', 'Monogatari'])
+
+    @staticmethod
+    def add(aid: int, names: list[str]):
+        # 与爬虫写入方式一致：全部名称写入 Detail.all，并逐个写入 name_map
+        DB.session.add(Detail(id=aid, name=names[0], all=names))
+        DB.session.add_all(NameMap(name=name, detailId=aid) for name in names)
+        DB.session.commit()
+
+    def assert_consistent(self, index: NGramIndex):
+        for keyword in KEYWORDS:
+            self.assertEqual(index.search(keyword), QueryService.keyword_detail_ids(keyword), keyword)
+
+    def test_matches_like_query(self):
+        index = NGramIndex()
+        index.ensure(date(2025, 5, 1))
+        self.assertTrue(index.ready)
+        self.assert_consistent(index)
+
+    def test_matches_like_query_after_refresh(self):
+        index = NGramIndex()
+        index.ensure(date(2025, 5, 1))
+        state = index._state
+
+        self.add(4, ['进击的巨人 第二季', 'Attack on Titan Season 2'])
+        self.add(5, ['Steins;Gate'])
+        index.ensure(date(2025, 5, 2))
+
+        self.assertEqual(index.date, date(2025, 5, 2))
+        self.assert_consistent(index)
+        # 刷新替换整个状态，旧状态保持不变
+        self.assertNotIn(4, state[2])
+
+    def test_failed_build_backs_off(self):
+        index = NGramIndex()
+        with mock.patch.object(NGramIndex, '_load', side_effect=RuntimeError('database unavailable')) as load:
+            index.ensure(date(2025, 5, 1))
+            index.ensure(date(2025, 5, 1))
+        self.assertEqual(load.call_count, 1)
+        self.assertFalse(index.ready)
+        self.assertFalse(index._lock.locked())
+
+    def test_background_build(self):
+        index = NGramIndex()
+        index.ensure(date(2025, 5, 1), self.app)
+
+        # 等待后台线程完成
+        with index._lock:
+            pass
+        self.assertTrue(index.ready)
+        self.assert_consistent(index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_snapshot.py
+@brief LatestSnapshot 的筛选与排序
+"""
+
+import unittest
+from datetime import date
+
+from database.data import BriefInfo, EMPTY_DETAIL_SCORE
+from database.snapshot import LatestSnapshot, SnapshotHolder
+
+
+def brief(aid: int, score: float, vote: int = 100) -> BriefInfo:
+    return BriefInfo(
+        id=aid, name=f'anime{aid}', translation=None, description=None,
+        detail_score=EMPTY_DETAIL_SCORE, score=score, vote=vote,
+        url=f'/detail/{aid}', picture=''
+    )
+
+
+class LatestSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        # 按 Detail.id 升序，评分与 id 顺序一致
+        self.snapshot = LatestSnapshot(date(2025, 5, 1), [
+            (brief(1, 9.0), 2024, 'spring'),
+            (brief(2, 8.0), None, 'spring'),
+            (brief(3, 7.0), 2024, None),
+            (brief(4, 6.0, vote=10), None, None),
+        ])
+
+    def ids(self, **kwargs) -> list[int]:
+        return [item.id for item in self.snapshot.select(**kwargs)]
+
+    def test_null_year_and_season_are_listed_once(self):
+        self.assertEqual(self.ids(), [1, 2, 3, 4])
+        self.assertEqual(self.ids(season='spring'), [1, 2])
+        self.assertEqual(self.ids(year=2024), [1, 3])
+        self.assertEqual(self.ids(year=2024, season='spring'), [1])
+
+    def test_min_vote(self):
+        self.assertEqual(self.ids(min_vote=100), [1, 2, 3])
+
+    def test_aids(self):
+        self.assertEqual(self.ids(aids=[4, 2, 2, 99]), [2, 4])
+        self.assertEqual(self.ids(aids=[1, 2, 3], season='spring'), [1, 2])
+
+
+class SnapshotHolderTest(unittest.TestCase):
+
+    def test_failed_build_backs_off(self):
+        calls = []
+
+        def loader(on_date: date):
+            calls.append(on_date)
+            raise RuntimeError('database unavailable')
+
+        holder = SnapshotHolder(loader)
+        self.assertIsNone(holder.get(date(2025, 5, 1)))
+        self.assertIsNone(holder.get(date(2025, 5, 1)))
+        self.assertEqual(len(calls), 1)
+
+        # 新的日期不受上一次失败影响
+        self.assertIsNone(holder.get(date(2025, 5, 2)))
+        self.assertEqual(len(calls), 2)
+
+    def test_retry_after_interval(self):
+        results = [RuntimeError('database unavailable'), LatestSnapshot(date(2025, 5, 1), [])]
+
+        def loader(on_date: date):
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        holder = SnapshotHolder(loader, retry_interval=0)
+        self.assertIsNone(holder.get(date(2025, 5, 1)))
+        self.assertEqual(holder.get(date(2025, 5, 1)).date, date(2025, 5, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# -*- coding:utf-8 -*-
+# AUTHOR: Sun
+
+"""
+@file test_version.py
+@brief 数据版本水位的检查间隔与变化回调
+"""
+
+import unittest
+from datetime import date
+from unittest import mock
+
+from database.model import DB, Score, Web
+from database.version import DataVersion
+from tests.support import SQLiteTestCase
+
+
+class DataVersionListenerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.versions = [(date(2025, 5, 1), 'v1')]
+        patcher = mock.patch.object(DataVersion, 'compute', side_effect=lambda: self.versions[-1])
+        self.compute = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.version = DataVersion(check_interval=30)
+        self.calls = []
+        self.version.add_listener(self.calls.append)
+
+    def test_first_token_notifies(self):
+        self.assertEqual(self.version.get(), 'v1')
+        self.assertEqual(self.calls, ['v1'])
+        self.assertEqual(self.version.latest_date, date(2025, 5, 1))
+
+    def test_checks_once_per_interval(self):
+        self.version.get()
+        self.versions.append((date(2025, 5, 2), 'v2'))
+
+        # 检查间隔内不重新计算，也不回调
+        self.assertEqual(self.version.get(), 'v1')
+        self.assertEqual(self.compute.call_count, 1)
+        self.assertEqual(self.calls, ['v1'])
+
+    def test_unchanged_token_does_not_notify(self):
+        self.version.get()
+        self.version.invalidate()
+        self.assertEqual(self.version.get(), 'v1')
+        self.assertEqual(self.compute.call_count, 2)
+        self.assertEqual(self.calls, ['v1'])
+
+    def test_changed_token_notifies(self):
+        self.version.get()
+        self.versions.append((date(2025, 5, 2), 'v2'))
+        self.version.invalidate()
+
+        self.assertEqual(self.version.get(), 'v2')
+        self.assertEqual(self.version.latest_date, date(2025, 5, 2))
+        self.assertEqual(self.calls, ['v1', 'v2'])
+
+    def test_failing_listener_does_not_block_others(self):
+        version = DataVersion()
+        calls = []
+        version.add_listener(mock.Mock(side_effect=RuntimeError('listener failed')))
+        version.add_listener(calls.append)
+
+        with self.assertLogs('database.version', level='ERROR'):
+            self.assertEqual(version.get(), 'v1')
+        self.assertEqual(calls, ['v1'])
+
+
+class DataVersionComputeTest(SQLiteTestCase, unittest.TestCase):
+
+    def test_token_follows_latest_date_and_web_table(self):
+        self.assertEqual(DataVersion.compute()[0], None)
+
+        DB.session.add(Web(id=1, name='Bangumi', host='bgm.tv', format='/subject/{}', priority=1))
+        DB.session.add(Score(detailId=1, score=7.0, vote=10, date=date(2025, 5, 1)))
+        DB.session.commit()
+        latest_date, token = DataVersion.compute()
+        self.assertEqual(latest_date, date(2025, 5, 1))
+        self.assertTrue(token.startswith('2025-05-01.'))
+
+        # Web 表变化时日期不变，摘要变化
+        DB.session.get(Web, 1).priority = 2
+        DB.session.commit()
+        self.assertNotEqual(DataVersion.compute()[1], token)
+        self.assertTrue(DataVersion.compute()[1].startswith('2025-05-01.'))
+
+
+if __name__ == '__main__':
+    unittest.main()